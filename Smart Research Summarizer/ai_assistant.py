@@ -1,138 +1,246 @@
-import streamlit as st
 from typing import List, Dict, Tuple, Optional
 import re
-import random
+import threading
+import weakref
+import metrics
+from document_index import DocumentIndex, query_terms
+from document_tokens import DocumentTokens
+
+# Sentence lookup methods for answers and grading
+RETRIEVAL_METHODS = ('keyword', 'dense')
+
+# Extra words ignored when picking evaluation keywords from a question
+EVALUATION_STOP_WORDS = {'are', 'the', 'and', 'this', 'that'}
+
+# Words ignored when comparing an answer with the expected content
+COMMON_WORDS = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
+
+_QUESTION_PREFIX = re.compile(r'^(question:|q:|generate|create|make)', re.IGNORECASE)
+
+def _answer_words(text: str) -> set:
+    """Keywords of an answer or expected text for overlap scoring."""
+    return set(word.strip('.,!?') for word in text.split() if len(word) > 3) - COMMON_WORDS
+
+def _cited_span(index, sentence_id: int) -> str:
+    """Offsets of a sentence for a citation, e.g. 'characters 120-245' (bytes in a MappedDocument)."""
+    start, end = index.span(sentence_id)
+    return f"{getattr(index, 'span_unit', 'characters')} {start}-{end}"
 
 class AIAssistant:
     """Simple text-based assistant for document analysis and interaction."""
     
-    def __init__(self):
-        """Initialize the assistant."""
-        pass
+    def __init__(self, lsh_min_sentences: Optional[int] = None, lsh_bands: int = 32, lsh_rows: int = 2,
+                 retrieval: str = 'keyword', dense_dim: int = 256):
+        """
+        Initialize the assistant.
+        
+        Args:
+            lsh_min_sentences: Answer and grade documents with at least this many
+                sentences through an approximate MinHash/LSH lookup instead of the
+                exact BM25 scan; None always uses BM25
+            lsh_bands: LSH bands; more bands raise recall at the cost of precision
+            lsh_rows: LSH rows per band; more rows raise precision at the cost of recall
+            retrieval: 'keyword' matches the question's words (BM25, or LSH for
+                long documents); 'dense' compares random-indexing sentence vectors,
+                which also finds sentences phrased with different words
+            dense_dim: Vector dimensions for dense retrieval
+        """
+        if retrieval not in RETRIEVAL_METHODS:
+            raise ValueError(f"Unknown retrieval method: {retrieval}")
+        self.lsh_min_sentences = lsh_min_sentences
+        self.lsh_bands = lsh_bands
+        self.lsh_rows = lsh_rows
+        self.retrieval = retrieval
+        self.dense_dim = dense_dim
+        # index -> SentenceLSH or DenseIndex, built once per document and dropped with it;
+        # they wrap a weakref.proxy of their key, as a strong reference would keep it alive
+        self._retrieval_indexes = weakref.WeakKeyDictionary()
+        self._retrieval_lock = threading.Lock()
     
-    def generate_summary(self, text: str) -> str:
+    @metrics.timed('generate_summary')
+    def generate_summary(self, text: str, index: Optional[DocumentIndex] = None,
+                         method: str = 'centroid') -> str:
         """
-        Generate a concise summary of the document using simple text processing.
+        Generate a concise extractive summary of the document.
+        
+        Sentences are ranked by TF-IDF similarity to the document centroid
+        (or by TextRank) and the best ones are returned in document order.
         
         Args:
             text: Document text
+            index: Prebuilt index for the text; built on the fly if omitted
+            method: 'centroid' or 'textrank'
             
         Returns:
             Summary text (≤150 words)
         """
         try:
-            # Simple extractive summarization
-            sentences = text.split('. ')
-            if len(sentences) < 3:
+            if index is None:
+                index = self.build_index(text)
+            
+            if len(index) < 3:
                 return text[:150] + "..." if len(text) > 150 else text
             
-            # Take first few sentences and key sentences with important keywords
-            important_keywords = ['conclusion', 'result', 'finding', 'important', 'main', 'key', 'summary']
+            # numpy is only loaded once the first summary is needed
+            from summarizer import summarize
             
-            summary_sentences = []
-            # Add first 2 sentences
-            summary_sentences.extend(sentences[:2])
+            return summarize(index, method=method)
+        except Exception as e:
+            return f"Error generating summary: {str(e)}"
+    
+    @metrics.timed('build_index')
+    def build_index(self, text: str) -> DocumentIndex:
+        """
+        Build the sentence index used for question answering and evaluation.
+        
+        Args:
+            text: Document text
             
-            # Add sentences with important keywords
-            for sentence in sentences[2:]:
-                if any(keyword in sentence.lower() for keyword in important_keywords):
-                    summary_sentences.append(sentence)
-                    if len(summary_sentences) >= 5:
-                        break
+        Returns:
+            DocumentIndex over the document sentences
+        """
+        return DocumentIndex(text)
+    
+    def retrieval_index(self, index):
+        """
+        Index used to look up answer sentences for a document.
+        
+        With dense retrieval every document gets a DenseIndex; otherwise long
+        documents (see ``lsh_min_sentences``) get a SentenceLSH over the index.
+        Either is built on first use and reused for later questions.
+        
+        Args:
+            index: Sentence index of the document
             
-            summary = '. '.join(summary_sentences)
+        Returns:
+            The index itself, its DenseIndex or its SentenceLSH
+        """
+        if self.retrieval == 'dense':
+            from dense_index import DenseIndex
+            
+            return self._wrapped_index(index, 'build_dense',
+                                       lambda: DenseIndex(weakref.proxy(index), self.dense_dim))
+        if self.lsh_min_sentences is None or len(index) < self.lsh_min_sentences:
+            return index
+        from sentence_lsh import SentenceLSH
+        
+        return self._wrapped_index(index, 'build_lsh',
+                                   lambda: SentenceLSH(weakref.proxy(index), self.lsh_bands, self.lsh_rows))
+    
+    def _wrapped_index(self, index, stage: str, build):
+        """The retrieval index built for an index, built under the stage timer if missing."""
+        with self._retrieval_lock:
+            wrapped = self._retrieval_indexes.get(index)
+            if wrapped is None:
+                with metrics.stage(stage):
+                    wrapped = self._retrieval_indexes[index] = build()
+            elif len(wrapped) < len(index):
+                # A streamed document grew since the last question
+                wrapped.update()
+            return wrapped
+    
+    @metrics.timed('tokenize')
+    def tokenize(self, text: str) -> DocumentTokens:
+        """
+        Map the document once to interned token ids for keyword analytics.
+        
+        Args:
+            text: Document text
             
-            # Ensure it's under 150 words
-            words = summary.split()
-            if len(words) > 150:
-                summary = ' '.join(words[:150]) + "..."
+        Returns:
+            DocumentTokens for the text
+        """
+        return DocumentTokens(text)
+    
+    def analyze_document(self, text: str, index: Optional[DocumentIndex] = None) -> Dict:
+        """
+        Run the per-document analysis done at processing time.
+        
+        Args:
+            text: Document text
+            index: Index already built for the text, e.g. while streaming
             
-            return summary
-        except Exception as e:
-            return f"Error generating summary: {str(e)}"
+        Returns:
+            Dictionary with summary, sentence index and key concepts
+        """
+        if index is None:
+            index = self.build_index(text)
+        metrics.count('sentences_total', len(index))
+        return {
+            'summary': self.generate_summary(text, index=index),
+            'index': index,
+            'key_concepts': self._extract_key_concepts(text, tokens=self.tokenize(text))
+        }
     
-    def answer_question(self, context: str, question: str) -> Tuple[str, str]:
+    @metrics.timed('answer_question')
+    def answer_question(self, context: str, question: str,
+                        index: Optional[DocumentIndex] = None) -> Tuple[str, str]:
         """
-        Answer a question based on the document context using simple text matching.
+        Answer a question based on the document context using the sentence index.
         
         Args:
             context: Document text
             question: User's question
+            index: Prebuilt index for the context (a DocumentIndex, or a
+                MappedDocument with an empty context); built on the fly if omitted
             
         Returns:
             Tuple of (answer, justification)
         """
         try:
-            # Simple keyword-based question answering
-            question_lower = question.lower()
-            context_lower = context.lower()
+            if index is None:
+                index = self.build_index(context)
             
             # Extract key question words
-            question_words = [word.strip('?.,!') for word in question_lower.split() 
-                            if len(word) > 3 and word not in ['what', 'where', 'when', 'why', 'how', 'which', 'who']]
-            
-            # Find relevant sentences
-            sentences = context.split('. ')
-            relevant_sentences = []
+            question_words = query_terms(question)
             
-            for sentence in sentences:
-                sentence_lower = sentence.lower()
-                # Score sentence based on keyword matches
-                score = sum(1 for word in question_words if word in sentence_lower)
-                if score > 0:
-                    relevant_sentences.append((sentence, score))
+            # Rank only the sentences found in the posting lists (or LSH buckets), or by vector similarity
+            answer_ids = self.retrieval_index(index).top_sentences(question_words, top_k=2)
             
-            # Sort by relevance and get best matches
-            relevant_sentences.sort(key=lambda x: x[1], reverse=True)
-            
-            if relevant_sentences:
-                # Take the most relevant sentences
-                answer_sentences = [sent[0] for sent in relevant_sentences[:2]]
-                answer = '. '.join(answer_sentences)
+            if answer_ids:
+                answer = ' '.join(index.sentence(sentence_id) for sentence_id in answer_ids)
                 
-                # Create justification
-                justification = f"This answer is based on relevant sentences from the document that contain keywords: {', '.join(question_words[:3])}. Supporting text: '{answer_sentences[0][:100]}...'"
+                # Create justification citing the exact span of the best sentence
+                justification = f"This answer is based on relevant sentences from the document that contain keywords: {', '.join(question_words[:3])}. Supporting text ({_cited_span(index, answer_ids[0])}): '{index.sentence(answer_ids[0])[:100]}...'"
             else:
-                # Fallback: return first few sentences mentioning any question word
                 answer = "I couldn't find a specific answer to your question in the document."
                 justification = "No relevant content found in the document for the given question."
             
-            # Store in session state for history
-            if 'qa_history' not in st.session_state:
-                st.session_state.qa_history = []
-            
-            st.session_state.qa_history.append({
-                'question': question,
-                'answer': answer,
-                'justification': justification
-            })
-            
             return answer, justification
         except Exception as e:
             return f"Error answering question: {str(e)}", "Could not process the question."
     
-    def generate_questions(self, text: str) -> List[str]:
+    @metrics.timed('generate_questions')
+    def generate_questions(self, text: str, key_concepts: Optional[List[str]] = None,
+                           index: Optional[DocumentIndex] = None) -> List[str]:
         """
         Generate comprehension questions based on the document using simple text analysis.
         
         Args:
             text: Document text
+            key_concepts: Precomputed key concepts; extracted from the text if omitted
+            index: Prebuilt index for the text; built on the fly if omitted
             
         Returns:
             List of generated questions
         """
         try:
-            # Extract key information from text
-            sentences = [s.strip() for s in text.split('.') if len(s.strip()) > 20]
+            if index is None:
+                index = self.build_index(text)
+            
+            # Count substantial sentences
+            substantial_sentences = sum(
+                1 for start, end in map(index.span, range(len(index))) if end - start > 20
+            )
             
             # Find important concepts and entities
-            important_words = self._extract_key_concepts(text)
+            important_words = key_concepts if key_concepts is not None else self._extract_key_concepts(text)
             
             # Generate different types of questions
             questions = []
             
             # 1. Main topic question
-            if sentences:
+            if substantial_sentences:
                 questions.append("What is the main topic or central theme discussed in this document?")
             
             # 2. Detail-based question
@@ -141,7 +249,7 @@ class AIAssistant:
                 questions.append(f"What information is provided about {key_concept} in the document?")
             
             # 3. Analysis question
-            if len(sentences) > 3:
+            if substantial_sentences > 3:
                 questions.append("What are the key findings or conclusions presented in this document?")
             
             return questions
@@ -149,28 +257,19 @@ class AIAssistant:
             # Return template questions as fallback
             return self._generate_template_questions(text)
     
-    def _extract_key_concepts(self, text: str) -> List[str]:
-        """Extract key concepts from the text."""
-        # Simple approach: find frequently mentioned meaningful words
-        words = text.lower().split()
-        word_freq = {}
-        
-        # Count meaningful words (length > 4, not common words)
-        stop_words = {'this', 'that', 'with', 'have', 'will', 'from', 'they', 'been', 'said', 'each', 'which', 'their', 'time', 'than', 'many', 'some', 'very', 'what', 'know', 'just', 'first', 'into', 'over', 'think', 'also', 'back', 'after', 'work', 'life', 'only', 'way', 'even', 'new', 'want', 'because', 'any', 'these', 'give', 'day', 'most', 'us'}
-        
-        for word in words:
-            word = re.sub(r'[^a-zA-Z]', '', word)
-            if len(word) > 4 and word not in stop_words:
-                word_freq[word] = word_freq.get(word, 0) + 1
+    @metrics.timed('key_concepts')
+    def _extract_key_concepts(self, text: str, tokens: Optional[DocumentTokens] = None) -> List[str]:
+        """Extract key concepts from the text (or its precomputed tokens)."""
+        if tokens is None:
+            tokens = self.tokenize(text)
         
-        # Return top 3 most frequent meaningful words
-        sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-        return [word for word, freq in sorted_words[:3] if freq > 1]
+        # Top 3 meaningful words (longer than 4 letters) mentioned more than once
+        return tokens.top_terms(3, min_length=5, min_count=2)
     
     def _clean_generated_question(self, question: str) -> str:
         """Clean and format generated questions."""
         # Remove common prefixes
-        question = re.sub(r'^(question:|q:|generate|create|make)', '', question, flags=re.IGNORECASE)
+        question = _QUESTION_PREFIX.sub('', question)
         question = question.strip()
         
         # Ensure it ends with a question mark
@@ -185,9 +284,6 @@ class AIAssistant:
     
     def _generate_template_questions(self, text: str) -> List[str]:
         """Generate template questions as fallback."""
-        # Extract key information
-        sentences = text.split('.')[:10]  # First 10 sentences
-        
         questions = [
             "What is the main topic or theme discussed in this document?",
             "What are the key points or arguments presented in the text?",
@@ -206,7 +302,34 @@ class AIAssistant:
         
         return templates[index % len(templates)]
     
-    def evaluate_answer(self, context: str, question: str, user_answer: str) -> Dict:
+    def expected_content(self, context: str, question: str, index: DocumentIndex) -> Tuple[List[int], set]:
+        """
+        Look up the document content an answer to a question is graded against.
+        
+        Args:
+            context: Document text
+            question: The question asked
+            index: Index for the context
+            
+        Returns:
+            Tuple of (ids of the most relevant sentences, their keywords)
+        """
+        # Extract key terms from question
+        question_keywords = query_terms(question, EVALUATION_STOP_WORDS)
+        
+        # Find sentences in context that relate to the question
+        relevant_ids = self.retrieval_index(index).top_sentences(question_keywords, top_k=2)
+        
+        # Extract expected answer content from most relevant sentences
+        if relevant_ids:
+            expected_text = ' '.join(index.sentence(sentence_id) for sentence_id in relevant_ids).lower()
+        else:
+            expected_text = context[:500].lower()  # fallback to first part of document
+        return relevant_ids, _answer_words(expected_text)
+    
+    def evaluate_answer(self, context: str, question: str, user_answer: str,
+                        index: Optional[DocumentIndex] = None,
+                        expected: Optional[Tuple[List[int], set]] = None) -> Dict:
         """
         Evaluate user's answer to a generated question using simple text analysis.
         
@@ -214,85 +337,107 @@ class AIAssistant:
             context: Document text
             question: The question asked
             user_answer: User's response
+            index: Prebuilt index for the context; built on the fly if omitted
+            expected: Precomputed expected_content for the question
             
         Returns:
             Dictionary with evaluation results
         """
-        try:
-            # Find relevant content in context for the question
-            question_lower = question.lower()
-            context_lower = context.lower()
-            user_answer_lower = user_answer.lower().strip()
-            
-            # Extract key terms from question
-            question_keywords = [word.strip('?.,!') for word in question_lower.split() 
-                               if len(word) > 3 and word not in ['what', 'where', 'when', 'why', 'how', 'which', 'who', 'are', 'the', 'and', 'this', 'that']]
-            
-            # Find sentences in context that relate to the question
-            sentences = context.split('. ')
-            relevant_sentences = []
-            
-            for sentence in sentences:
-                sentence_lower = sentence.lower()
-                score = sum(1 for word in question_keywords if word in sentence_lower)
-                if score > 0:
-                    relevant_sentences.append((sentence, score))
-            
-            relevant_sentences.sort(key=lambda x: x[1], reverse=True)
-            
-            # Extract expected answer content from most relevant sentences
-            expected_content = []
-            if relevant_sentences:
-                expected_content = [sent[0] for sent in relevant_sentences[:2]]
-                expected_text = '. '.join(expected_content).lower()
-            else:
-                expected_text = context_lower[:500]  # fallback to first part of document
-            
-            # Evaluate user answer
-            is_correct = False
-            feedback = ""
-            
-            # Check if user answer contains relevant keywords from expected content
-            expected_words = set(word.strip('.,!?') for word in expected_text.split() if len(word) > 3)
-            user_words = set(word.strip('.,!?') for word in user_answer_lower.split() if len(word) > 3)
-            
-            # Remove common words
-            common_words = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-            expected_words -= common_words
-            user_words -= common_words
+        return self.evaluate_answers(context, [question], [user_answer], index=index,
+                                     expected=[expected] if expected is not None else None)[0]
+    
+    @metrics.timed('evaluate_answers')
+    def evaluate_answers(self, context: str, questions: List[str], answers: List[str],
+                         index: Optional[DocumentIndex] = None,
+                         expected: Optional[List[Tuple[List[int], set]]] = None) -> List[Dict]:
+        """
+        Evaluate a batch of answers against one shared sentence index.
+        
+        Expected content is looked up for every question first, then keyword
+        overlap for all answers is computed together with NumPy set operations
+        on (word id, question id) keys.
+        
+        Args:
+            context: Document text
+            questions: The questions asked
+            answers: User's responses, one per question
+            index: Prebuilt index for the context; built on the fly if omitted
+            expected: Precomputed expected_content per question, e.g. from
+                the challenge precomputed at ingest; looked up if omitted
             
-            if expected_words and user_words:
-                overlap = len(expected_words.intersection(user_words))
-                overlap_ratio = overlap / len(expected_words) if expected_words else 0
-                
-                if overlap_ratio >= 0.3:  # 30% keyword overlap
-                    is_correct = True
-                    feedback = "Good job! Your answer captures key points from the document."
-                elif overlap_ratio >= 0.1:
-                    is_correct = False
-                    feedback = "Your answer is partially correct but could include more specific details from the document."
+        Returns:
+            List of evaluation result dictionaries, one per question
+        """
+        if not questions:
+            return []
+        try:
+            if index is None:
+                index = self.build_index(context)
+            n_questions = len(questions)
+            
+            vocabulary: Dict[str, int] = {}
+            expected_keys: List[int] = []
+            user_keys: List[int] = []
+            relevant = []
+            
+            for question_id, (question, user_answer) in enumerate(zip(questions, answers)):
+                if expected is not None:
+                    relevant_ids, expected_words = expected[question_id]
                 else:
-                    is_correct = False
-                    feedback = "Your answer needs improvement. Try to focus more on the specific information provided in the document."
-            else:
+                    relevant_ids, expected_words = self.expected_content(context, question, index)
+                user_words = _answer_words(user_answer.lower().strip())
+                relevant.append((relevant_ids, expected_words))
+                
+                # Encode each word as word_id * n_questions + question_id
+                for words, keys in ((expected_words, expected_keys), (user_words, user_keys)):
+                    for word in words:
+                        word_id = vocabulary.setdefault(word, len(vocabulary))
+                        keys.append(word_id * n_questions + question_id)
+            
+            # Overlap of expected and user keywords for every question at once
+            import numpy as np
+            
+            expected_keys = np.array(expected_keys, dtype=np.int64)
+            user_keys = np.array(user_keys, dtype=np.int64)
+            shared_keys = np.intersect1d(expected_keys, user_keys, assume_unique=True)
+            overlap = np.bincount(shared_keys % n_questions, minlength=n_questions)
+            expected_counts = np.bincount(expected_keys % n_questions, minlength=n_questions)
+            user_counts = np.bincount(user_keys % n_questions, minlength=n_questions)
+            overlap_ratio = overlap / np.maximum(expected_counts, 1)
+            
+            evaluations = []
+            for question_id, (relevant_ids, expected_words) in enumerate(relevant):
+                # Evaluate user answer
                 is_correct = False
-                feedback = "Please provide a more detailed answer based on the document content."
-            
-            # Create justification from the most relevant sentence
-            if relevant_sentences:
-                justification = f"Based on the document: '{relevant_sentences[0][0][:150]}...'"
-            else:
-                justification = "Based on the overall document content."
-            
-            return {
-                'is_correct': is_correct,
-                'feedback': feedback,
-                'justification': justification,
-                'expected_keywords': list(expected_words)[:5]  # Show some expected keywords
-            }
+                if expected_counts[question_id] and user_counts[question_id]:
+                    if overlap_ratio[question_id] >= 0.3:  # 30% keyword overlap
+                        is_correct = True
+                        feedback = "Good job! Your answer captures key points from the document."
+                    elif overlap_ratio[question_id] >= 0.1:
+                        feedback = "Your answer is partially correct but could include more specific details from the document."
+                    else:
+                        feedback = "Your answer needs improvement. Try to focus more on the specific information provided in the document."
+                else:
+                    feedback = "Please provide a more detailed answer based on the document content."
+                
+                # Create justification from the most relevant sentence
+                evidence_spans = [index.span(sentence_id) for sentence_id in relevant_ids]
+                if relevant_ids:
+                    justification = f"Based on the document ({_cited_span(index, relevant_ids[0])}): '{index.sentence(relevant_ids[0])[:150]}...'"
+                else:
+                    justification = "Based on the overall document content."
+                
+                evaluations.append({
+                    'is_correct': is_correct,
+                    'feedback': feedback,
+                    'justification': justification,
+                    'expected_keywords': list(expected_words)[:5],  # Show some expected keywords
+                    'evidence_spans': evidence_spans
+                })
+            return evaluations
         except Exception as e:
-            return {
+            return [{
                 'is_correct': False,
                 'feedback': f'Error evaluating answer: {str(e)}',
                 'justification': 'Could not complete evaluation.'
-            }
+            } for _ in questions]
@@ -1,8 +1,14 @@
 import streamlit as st
 import os
-from document_processor import DocumentProcessor
+from contextlib import contextmanager
+import metrics
 from ai_assistant import AIAssistant
-from utils import initialize_session_state
+from corpus import DEFAULT_TOP_K, Corpus
+from document_cache import AnswerCache, DocumentCache, answer_key, content_hash
+from document_pipeline import DocumentStream
+from document_service import DONE, QUEUED, ServiceBusy, get_service_client
+from document_store import get_document_store
+from utils import get_session_state_summary, initialize_session_state
 
 # Page configuration
 st.set_page_config(
@@ -12,6 +18,30 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# How long to wait for an answer from the document service
+ASK_TIMEOUT_SECONDS = 60
+
+# How long to wait for a batch of corpus uploads to be indexed
+CORPUS_TIMEOUT_SECONDS = 600
+
+# Previous questions shown per page in Ask Anything mode
+HISTORY_PAGE_SIZE = 5
+
+@st.cache_resource
+def get_assistant() -> AIAssistant:
+    """Assistant shared by every session instead of one per rerun."""
+    return AIAssistant()
+
+@st.cache_resource
+def get_document_cache() -> DocumentCache:
+    """Open the on-disk cache once per process."""
+    return DocumentCache()
+
+@st.cache_resource
+def get_answer_cache() -> AnswerCache:
+    """Answers memoized across sessions by document and question."""
+    return AnswerCache()
+
 def main():
     # Initialize session state
     initialize_session_state()
@@ -31,37 +61,107 @@ def main():
         
         if uploaded_file is not None:
             if st.button("Process Document", type="primary"):
-                with st.spinner("Processing document..."):
-                    try:
-                        # Process the document
-                        processor = DocumentProcessor()
-                        text = processor.extract_text(uploaded_file)
-                        
-                        if text:
-                            st.session_state.document_text = text
-                            st.session_state.document_name = uploaded_file.name
-                            st.session_state.document_processed = True
-                            
-                            # Generate summary
-                            assistant = AIAssistant()
-                            summary = assistant.generate_summary(text)
-                            st.session_state.document_summary = summary
-                            
-                            st.success("Document processed successfully!")
-                            st.rerun()
-                        else:
-                            st.error("Could not extract text from the document.")
-                    except Exception as e:
-                        st.error(f"Error processing document: {str(e)}")
+                try:
+                    # Reuse earlier results for identical uploads, in memory or on disk
+                    data = uploaded_file.getvalue()
+                    cache_key = content_hash(data)
+                    store = get_document_store()
+                    handle = store.acquire(cache_key)
+                    if handle is None:
+                        cached = get_document_cache().get(cache_key)
+                        handle = store.add(cache_key, cached) if cached else None
+                    reset_document()
+                    
+                    if handle is not None:
+                        load_document(uploaded_file.name, handle)
+                        st.success("Document processed successfully!")
+                    else:
+                        # Extract and index on the document service, page by page
+                        st.session_state.document_job = get_service_client().submit(
+                            st.session_state.session_id,
+                            'extract',
+                            {
+                                'stream': DocumentStream(uploaded_file.name, uploaded_file.type),
+                                'data': data,
+                                'cache_key': cache_key
+                            }
+                        )
+                        st.session_state.document_cache_key = cache_key
+                        st.session_state.document_name = uploaded_file.name
+                        st.session_state.document_processed = True
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error processing document: {str(e)}")
+        
+        # Many documents indexed together for cross-document questions
+        st.header("Corpus")
+        corpus_files = st.file_uploader(
+            "Add PDF or TXT files to the corpus",
+            type=['pdf', 'txt'],
+            accept_multiple_files=True,
+            key="corpus_uploader",
+            help="Documents are indexed incrementally; adding more never rebuilds the existing index."
+        )
+        
+        if corpus_files and st.button("Add to Corpus"):
+            with st.spinner("Indexing documents..."):
+                try:
+                    if st.session_state.corpus is None:
+                        st.session_state.corpus = Corpus()
+                    result = get_service_client().run(
+                        st.session_state.session_id,
+                        'corpus_add',
+                        {
+                            'corpus': st.session_state.corpus,
+                            'files': [(file.name, file.type, file.getvalue()) for file in corpus_files]
+                        },
+                        timeout=CORPUS_TIMEOUT_SECONDS
+                    )
+                    if result['added']:
+                        st.success(f"Added {len(result['added'])} documents to the corpus.")
+                    for error in result['errors']:
+                        st.error(error)
+                except Exception as e:
+                    st.error(f"Error adding documents: {str(e)}")
+        
+        if st.session_state.corpus is not None and st.session_state.corpus.documents:
+            stats = st.session_state.corpus.stats()
+            st.caption(f"{stats['documents']} documents, {stats['sentences']} sentences indexed")
+            if st.button("📚 Search Corpus", use_container_width=True):
+                st.session_state.mode = "corpus_search"
+                st.rerun()
+        
+        # Per-stage timings and cache hit rates for this process
+        if st.checkbox("Show diagnostics", key="show_diagnostics"):
+            st.json(get_session_state_summary(), expanded=False)
+            st.download_button(
+                "Download metrics (Prometheus)",
+                metrics.REGISTRY.to_prometheus(),
+                file_name="metrics.prom",
+                mime="text/plain"
+            )
+            st.download_button(
+                "Download metrics (JSON)",
+                metrics.REGISTRY.to_json(),
+                file_name="metrics.json",
+                mime="application/json"
+            )
     
     # Main content area
-    if st.session_state.document_processed:
+    if st.session_state.mode == "corpus_search" and st.session_state.corpus is not None:
+        corpus_search_mode()
+    
+    elif st.session_state.document_processed:
         # Display document info and summary
         st.header(f"📄 {st.session_state.document_name}")
         
-        # Summary section
-        st.subheader("📝 Document Summary")
-        st.info(st.session_state.document_summary)
+        if st.session_state.document_job is not None:
+            # Progress and partial summary while the document streams in
+            ingestion_progress()
+        else:
+            # Summary section
+            st.subheader("📝 Document Summary")
+            st.info(current_document().summary)
         
         # Mode selection
         st.subheader("🎯 Choose Interaction Mode")
@@ -101,6 +201,98 @@ def main():
         3. Choose your interaction mode
         """)
 
+def load_document(name: str, handle):
+    """Attach a document from the shared document store to this session."""
+    st.session_state.document_handle = handle
+    st.session_state.document_name = name
+    st.session_state.document_processed = True
+    st.session_state.document_job = None
+    
+    # Prepare Challenge Me in the background so switching modes does not wait
+    if handle.document.challenge is None:
+        try:
+            st.session_state.challenge_job = get_service_client().submit(
+                st.session_state.session_id, 'prepare_challenge', {'document': handle.document}
+            )
+        except ServiceBusy:
+            # Questions are then generated on demand
+            st.session_state.challenge_job = None
+
+def reset_document():
+    """Forget the current document and anything derived from it; the Q&A history is kept."""
+    if st.session_state.document_handle is not None:
+        st.session_state.document_handle.release()
+    if st.session_state.challenge_job is not None:
+        get_service_client().cancel(st.session_state.challenge_job)
+    for key in ('document_handle', 'document_job', 'challenge_job', 'challenge_questions', 'challenge_expected'):
+        st.session_state[key] = None
+
+def current_document():
+    """The session's fully processed document, or None while it is still streaming."""
+    handle = st.session_state.document_handle
+    return handle.document if handle is not None else None
+
+def document_stream():
+    """The DocumentStream of the extract job still in flight, if any."""
+    job_id = st.session_state.document_job
+    job = get_service_client().job(job_id) if job_id else None
+    return job.progress if job is not None and not job.finished else None
+
+@contextmanager
+def document_context():
+    """Yield (text, index) for the current document, even while it is still streaming."""
+    stream = document_stream()
+    if stream is None:
+        document = current_document()
+        yield document.text, document.index
+    else:
+        with stream.snapshot() as (text, index):
+            yield text, index
+
+def prepared_challenge():
+    """
+    The precomputed Challenge Me questions and expected content of the current
+    document, waiting for the background job if it is still running; None if
+    the document is still streaming or the job did not complete.
+    """
+    document = current_document()
+    if document is None:
+        return None
+    job_id = st.session_state.challenge_job
+    if document.challenge is None and job_id is not None:
+        try:
+            get_service_client().wait(job_id, timeout=ASK_TIMEOUT_SECONDS)
+        except (KeyError, TimeoutError):
+            pass
+    return document.challenge
+
+@st.fragment(run_every=1)
+def ingestion_progress():
+    """Show ingestion progress and the partial summary, then finalize the document."""
+    job = get_service_client().job(st.session_state.document_job)
+    
+    if job is None or job.finished:
+        st.session_state.document_job = None
+        if job is None or job.status != DONE:
+            st.session_state.document_processed = False
+            st.error(job.error if job else "The processing job expired. Please process the document again.")
+            return
+        handle = get_document_store().add(st.session_state.document_cache_key, job.result)
+        load_document(job.progress.name, handle)
+        st.rerun()
+    
+    if job.status == QUEUED:
+        st.info("Waiting for a free worker...")
+        return
+    
+    stream = job.progress
+    total = max(stream.total_pages, 1)
+    done = min(stream.pages_processed, total)
+    st.progress(done / total, text=f"Pages processed: {done} / {total}")
+    
+    st.subheader("📝 Document Summary (partial)")
+    st.info(stream.summary or "The summary will appear as soon as the first pages are processed.")
+
 def ask_anything_mode():
     st.subheader("❓ Ask Anything Mode")
     st.markdown("Ask any question about your document. The AI will answer based on the document content.")
@@ -114,11 +306,26 @@ def ask_anything_mode():
     if st.button("Get Answer", type="primary") and question:
         with st.spinner("Finding answer..."):
             try:
-                assistant = AIAssistant()
-                answer, justification = assistant.answer_question(
-                    st.session_state.document_text, 
-                    question
-                )
+                # Answers about a fully processed document are memoized by question
+                stream = document_stream()
+                document = current_document() if stream is None else None
+                key = answer_key(document.key, question) if document is not None else None
+                result = get_answer_cache().get(key) if key else None
+                if result is None:
+                    # Answered on the document service, which locks a streaming document itself
+                    if stream is not None:
+                        payload = {'question': question, 'stream': stream}
+                    else:
+                        payload = {'question': question, 'text': document.text, 'index': document.index}
+                    result = get_service_client().run(
+                        st.session_state.session_id, 'ask', payload, timeout=ASK_TIMEOUT_SECONDS
+                    )
+                    if key:
+                        get_answer_cache().put(key, result)
+                answer, justification = result['answer'], result['justification']
+                
+                # Store in session state for history
+                st.session_state.qa_history.append(question, answer, justification)
                 
                 # Display answer
                 st.success("**Answer:**")
@@ -130,15 +337,66 @@ def ask_anything_mode():
             except Exception as e:
                 st.error(f"Error answering question: {str(e)}")
     
-    # Display previous Q&A if any
-    if 'qa_history' in st.session_state and st.session_state.qa_history:
+    # Display previous Q&A a page at a time; older pages are read from disk on demand
+    history = st.session_state.qa_history
+    if len(history):
         st.subheader("📋 Previous Questions & Answers")
-        for i, qa in enumerate(reversed(st.session_state.qa_history)):
-            with st.expander(f"Q{len(st.session_state.qa_history)-i}: {qa['question'][:50]}..."):
+        pages = history.page_count(HISTORY_PAGE_SIZE)
+        page = 0
+        if pages > 1:
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) - 1
+        for qa in history.page(page, HISTORY_PAGE_SIZE):
+            with st.expander(f"Q{qa['number']}: {qa['question'][:50]}..."):
                 st.write(f"**Q:** {qa['question']}")
                 st.write(f"**A:** {qa['answer']}")
                 st.write(f"**Justification:** {qa['justification']}")
 
+def corpus_search_mode():
+    st.header("📚 Corpus Search")
+    st.markdown(f"Ask a question across all {len(st.session_state.corpus.documents)} documents in the corpus.")
+    
+    if st.session_state.document_processed:
+        if st.button("⬅️ Back to Document", type="secondary"):
+            st.session_state.mode = None
+            st.rerun()
+    
+    question = st.text_input(
+        "What would you like to know?",
+        placeholder="Enter your question here...",
+        key="corpus_question"
+    )
+    top_k = st.slider("Citations", min_value=1, max_value=20, value=DEFAULT_TOP_K)
+    
+    if st.button("Search", type="primary") and question:
+        with st.spinner("Searching corpus..."):
+            try:
+                result = get_service_client().run(
+                    st.session_state.session_id,
+                    'corpus_ask',
+                    {'corpus': st.session_state.corpus, 'question': question, 'top_k': top_k},
+                    timeout=ASK_TIMEOUT_SECONDS
+                )
+                
+                st.success("**Answer:**")
+                st.write(result['answer'])
+                
+                st.info("**Justification:**")
+                st.write(result['justification'])
+                
+                # Document and sentence for every retrieved passage
+                if result['citations']:
+                    st.subheader("📎 Citations")
+                    for rank, citation in enumerate(result['citations'], 1):
+                        start, end = citation['span']
+                        st.markdown(
+                            f"**{rank}. {citation['document']}**, sentence {citation['sentence_id'] + 1} "
+                            f"(characters {start}-{end}, score {citation['score']})"
+                        )
+                        st.caption(citation['text'])
+                
+            except Exception as e:
+                st.error(f"Error searching corpus: {str(e)}")
+
 def challenge_me_mode():
     st.subheader("🧠 Challenge Me Mode")
     st.markdown("Test your understanding with AI-generated questions based on the document.")
@@ -148,8 +406,21 @@ def challenge_me_mode():
         if st.button("Generate Questions", type="primary"):
             with st.spinner("Generating questions..."):
                 try:
-                    assistant = AIAssistant()
-                    questions = assistant.generate_questions(st.session_state.document_text)
+                    challenge = prepared_challenge()
+                    if challenge is not None:
+                        questions = challenge['questions']
+                        st.session_state.challenge_expected = challenge['expected']
+                    else:
+                        # Still streaming (or the precompute failed): generate from the current text
+                        assistant = get_assistant()
+                        document = current_document()
+                        with document_context() as (text, index):
+                            questions = assistant.generate_questions(
+                                text,
+                                key_concepts=document.key_concepts if document else None,
+                                index=index
+                            )
+                        st.session_state.challenge_expected = None
                     st.session_state.challenge_questions = questions
                     st.session_state.user_answers = [""] * len(questions)
                     st.session_state.evaluations = [None] * len(questions)
@@ -176,12 +447,16 @@ def challenge_me_mode():
                 if user_answer.strip():
                     with st.spinner(f"Evaluating answer {i+1}..."):
                         try:
-                            assistant = AIAssistant()
-                            evaluation = assistant.evaluate_answer(
-                                st.session_state.document_text,
-                                question,
-                                user_answer.strip()
-                            )
+                            assistant = get_assistant()
+                            expected = st.session_state.challenge_expected
+                            with document_context() as (text, index):
+                                evaluation = assistant.evaluate_answer(
+                                    text,
+                                    question,
+                                    user_answer.strip(),
+                                    index=index,
+                                    expected=expected[i] if expected else None
+                                )
                             st.session_state.evaluations[i] = evaluation
                             st.rerun()
                         except Exception as e:
@@ -200,9 +475,34 @@ def challenge_me_mode():
             
             st.divider()
         
+        # Grade every answered question in one batch
+        if st.button("Evaluate All", type="primary"):
+            answered = [i for i, answer in enumerate(st.session_state.user_answers) if answer.strip()]
+            if answered:
+                with st.spinner("Evaluating answers..."):
+                    try:
+                        assistant = get_assistant()
+                        expected = st.session_state.challenge_expected
+                        with document_context() as (text, index):
+                            evaluations = assistant.evaluate_answers(
+                                text,
+                                [st.session_state.challenge_questions[i] for i in answered],
+                                [st.session_state.user_answers[i].strip() for i in answered],
+                                index=index,
+                                expected=[expected[i] for i in answered] if expected else None
+                            )
+                        for i, evaluation in zip(answered, evaluations):
+                            st.session_state.evaluations[i] = evaluation
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error evaluating answers: {str(e)}")
+            else:
+                st.warning("Answer at least one question before evaluating.")
+        
         # Reset questions button
         if st.button("Generate New Questions", type="secondary"):
             del st.session_state.challenge_questions
+            del st.session_state.challenge_expected
             del st.session_state.user_answers
             del st.session_state.evaluations
             st.rerun()
@@ -0,0 +1,143 @@
+"""
+Benchmark dense (random indexing) sentence lookup on paraphrased questions.
+
+Builds a document from topics of concepts, where every concept has two
+interchangeable words followed by the same collocate, as synonyms share
+their neighbours in real text ("reduce cost", "lower cost"). Questions
+are made from a random sentence: a few of its concept words, some
+replaced by their synonym that the sentence does not use.
+Each question is answered by
+
+- the BM25 inverted index, the default keyword scorer,
+- DenseIndex for each --dims setting, one question at a time and all
+  questions in one batch.
+
+Reports hit@2 (the source sentence among the two answer sentences) and
+the mean lookup time per question, plus the embedding throughput and the
+memory of the int8 sentence matrix next to its float32 size.
+
+Usage:
+    python benchmarks/bench_dense.py [--size 4MB] [--questions 200] [--dims 128 256]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dense_index import DenseIndex
+from document_index import DocumentIndex, query_terms, tokenize
+from synthetic import format_size, parse_size
+
+SYLLABLES = ["ba", "cor", "den", "fi", "gal", "hem", "ix", "jun", "kar", "lo", "mer", "nov",
+             "pra", "qui", "rok", "sul", "tem", "ul", "ver", "zan"]
+STOP_WORDS = ["the", "of", "and", "in", "to", "a", "with", "for", "is", "by"]
+
+
+def make_vocabulary(concepts: int, rng: random.Random) -> List[Tuple[str, str, str]]:
+    """Two distinct synonym words and their collocate, one triple per concept."""
+    words = set()
+    while len(words) < 3 * concepts:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return [tuple(words[3 * i:3 * i + 3]) for i in range(concepts)]
+
+
+def synthetic_document(size: int, seed: int, topics: int = 400,
+                       concepts_per_topic: int = 15) -> Tuple[str, Dict[str, str]]:
+    """
+    Sentences drawn from one topic's concepts each, every concept written as either synonym.
+
+    Returns:
+        The document and a map from every word to its synonym
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(topics * concepts_per_topic, rng)
+    synonyms = {}
+    for first, second, _ in vocabulary:
+        synonyms[first], synonyms[second] = second, first
+    topic_concepts = [vocabulary[i:i + concepts_per_topic] for i in range(0, len(vocabulary), concepts_per_topic)]
+    parts, total = [], 0
+    while total < size:
+        words = []
+        for first, second, collocate in rng.sample(rng.choice(topic_concepts), rng.randint(3, 5)):
+            words += [rng.choice((first, second)), collocate]
+            if rng.random() < 0.4:
+                words.append(rng.choice(STOP_WORDS))
+        sentence = ' '.join(words).capitalize() + '.'
+        parts.append(sentence)
+        total += len(sentence) + 1
+    return ' '.join(parts), synonyms
+
+
+def make_questions(index: DocumentIndex, synonyms: Dict[str, str], count: int,
+                   seed: int) -> List[Tuple[str, int]]:
+    """(question, source sentence id) pairs with two of four words replaced by synonyms."""
+    rng = random.Random(seed)
+    questions = []
+    while len(questions) < count:
+        sentence_id = rng.randrange(len(index))
+        words = list(dict.fromkeys(word for word in tokenize(index.sentence(sentence_id)) if word in synonyms))
+        if len(words) < 4:
+            continue
+        chosen = rng.sample(words, 4)
+        for i in rng.sample(range(4), 2):
+            if synonyms[chosen[i]] not in words:
+                chosen[i] = synonyms[chosen[i]]
+        questions.append(("What about " + ' '.join(chosen) + "?", sentence_id))
+    return questions
+
+
+def hit_rate(results: List[List[int]], questions: List[Tuple[str, int]]) -> float:
+    return sum(source in answer_ids for answer_ids, (_, source) in zip(results, questions)) / len(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', default='4MB', help='Size of the benchmark document')
+    parser.add_argument('--questions', type=int, default=200, help='Questions asked')
+    parser.add_argument('--dims', nargs='+', type=int, default=[128, 256], help='DenseIndex dimensions')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    text, synonyms = synthetic_document(size, args.seed)
+    index = DocumentIndex(text)
+    questions = make_questions(index, synonyms, args.questions, args.seed)
+    terms = [query_terms(question) for question, _ in questions]
+    print(f"{format_size(size)} document, {len(index)} sentences, {len(questions)} questions\n")
+
+    print(f"{'method':<16} {'hit@2':>6} {'per question':>13} {'batched':>10} "
+          f"{'embed':>14} {'int8':>9} {'float32':>9}")
+    start = time.perf_counter()
+    results = [index.top_sentences(question_terms) for question_terms in terms]
+    single = (time.perf_counter() - start) / len(questions)
+    print(f"{'BM25 postings':<16} {hit_rate(results, questions):>6.0%} {single * 1000:>10.2f} ms")
+
+    for dim in args.dims:
+        start = time.perf_counter()
+        dense = DenseIndex(index, dim)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = [dense.top_sentences(question_terms) for question_terms in terms]
+        single = (time.perf_counter() - start) / len(questions)
+
+        start = time.perf_counter()
+        batched_results = dense.search_many(terms, top_k=2)
+        batched = (time.perf_counter() - start) / len(questions)
+        if [[sentence_id for sentence_id, _ in ranked] for ranked in batched_results] != results:
+            raise SystemExit("batched and single-question rankings differ")
+
+        matrix_bytes = dense.vectors.nbytes + dense.scales.nbytes
+        print(f"{f'dense {dim}':<16} {hit_rate(results, questions):>6.0%} {single * 1000:>10.2f} ms "
+              f"{batched * 1000:>7.2f} ms {len(dense) / build:>8.0f} sent/s "
+              f"{matrix_bytes / 1e6:>6.1f} MB {dense.vectors.size * 4 / 1e6:>6.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
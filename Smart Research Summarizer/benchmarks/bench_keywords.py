@@ -0,0 +1,105 @@
+"""
+Benchmark keyword and key concept extraction on interned token ids
+against the original per-word string counting.
+
+The original implementations re-split the document for every call and
+count Python strings into dicts. The new path tokenizes once into
+DocumentTokens and answers both calls from one bincount. Reports the time
+for one document analysis (keywords plus key concepts) and the memory
+held by the token representation versus a list of word strings.
+
+Usage:
+    python benchmarks/bench_keywords.py [--size 8MB] [--repeat 3]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_assistant import AIAssistant
+from document_tokens import DocumentTokens
+from synthetic import format_size, parse_size, synthetic_text
+from utils import extract_keywords
+
+LEGACY_KEYWORD_STOP_WORDS = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those'}
+LEGACY_CONCEPT_STOP_WORDS = {'this', 'that', 'with', 'have', 'will', 'from', 'they', 'been', 'said', 'each', 'which', 'their', 'time', 'than', 'many', 'some', 'very', 'what', 'know', 'just', 'first', 'into', 'over', 'think', 'also', 'back', 'after', 'work', 'life', 'only', 'way', 'even', 'new', 'want', 'because', 'any', 'these', 'give', 'day', 'most', 'us'}
+
+
+def legacy_extract_keywords(text: str, max_keywords: int = 5) -> list:
+    """The original utils.extract_keywords, kept as the reference."""
+    word_count = {}
+    for word in text.lower().split():
+        word = word.strip('.,!?;:"()[]{}')
+        if len(word) > 3 and word not in LEGACY_KEYWORD_STOP_WORDS:
+            word_count[word] = word_count.get(word, 0) + 1
+    sorted_words = sorted(word_count.items(), key=lambda x: x[1], reverse=True)
+    return [word for word, count in sorted_words[:max_keywords]]
+
+
+def legacy_key_concepts(text: str) -> list:
+    """The original AIAssistant._extract_key_concepts, kept as the reference."""
+    word_freq = {}
+    for word in text.lower().split():
+        word = re.sub(r'[^a-zA-Z]', '', word)
+        if len(word) > 4 and word not in LEGACY_CONCEPT_STOP_WORDS:
+            word_freq[word] = word_freq.get(word, 0) + 1
+    sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
+    return [word for word, freq in sorted_words[:3] if freq > 1]
+
+
+def legacy_analysis(text: str):
+    return legacy_extract_keywords(text), legacy_key_concepts(text)
+
+
+def new_analysis(assistant: AIAssistant, text: str):
+    tokens = DocumentTokens(text)
+    return extract_keywords(text, tokens=tokens), assistant._extract_key_concepts(text, tokens=tokens)
+
+
+def best_time(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def word_list_bytes(text: str) -> int:
+    """Memory held by the document as a list of lowercase word strings."""
+    words = text.lower().split()
+    return sys.getsizeof(words) + sum(sys.getsizeof(word) for word in words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', default='8MB', help='Size of the benchmark document')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    text = synthetic_text(size, args.seed)
+    assistant = AIAssistant()
+
+    old_keywords, old_concepts = legacy_analysis(text)
+    new_keywords, new_concepts = new_analysis(assistant, text)
+    print(f"keywords:     original {old_keywords}\n              new      {new_keywords}")
+    print(f"key concepts: original {old_concepts}\n              new      {new_concepts}\n")
+
+    old = best_time(lambda: legacy_analysis(text), args.repeat)
+    new = best_time(lambda: new_analysis(assistant, text), args.repeat)
+    print(f"{format_size(size)} document: original {old * 1000:.1f} ms, new {new * 1000:.1f} ms "
+          f"({old / new:.1f}x)")
+
+    tokens = DocumentTokens(text)
+    print(f"memory: word list {word_list_bytes(text) / 1e6:.1f} MB, "
+          f"interned tokens {tokens.nbytes() / 1e6:.1f} MB ({len(tokens)} tokens, "
+          f"{len(tokens.vocabulary)} terms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark approximate MinHash/LSH sentence lookup against the exact scans.
+
+Builds a document from a large Zipf-distributed vocabulary of inflected
+words (the templated synthetic papers reuse a few dozen words, so every
+sentence would share an LSH bucket). Questions are made from a random
+sentence: a few of its content words, some with a different inflection
+("measured" for "measures") to stand in for paraphrase. Each question is
+answered by
+
+- the original linear scan counting question words contained in every sentence,
+- the BM25 inverted index (exact, visits every sentence in the posting lists),
+- SentenceLSH for each --configs bands x rows setting.
+
+Reports hit@2 (the source sentence among the two answer sentences),
+sentences visited per question, and the mean lookup time, plus the LSH
+build time and memory.
+
+Usage:
+    python benchmarks/bench_lsh.py [--size 8MB] [--questions 200] [--configs 16x2 32x2 64x2 24x3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_index import DocumentIndex, query_terms, tokenize
+from sentence_lsh import SentenceLSH
+from synthetic import format_size, parse_size
+
+SYLLABLES = ["ba", "cor", "den", "fi", "gal", "hem", "ix", "jun", "kar", "lo", "mer", "nov",
+             "pra", "qui", "rok", "sul", "tem", "ul", "ver", "zan"]
+SUFFIXES = ["", "s", "ed", "ing", "ation"]
+STOP_WORDS = ["the", "of", "and", "in", "to", "a", "with", "for", "is", "by"]
+
+
+def synthetic_document(size: int, seed: int, vocabulary_size: int = 20000) -> str:
+    """Paragraphs of sentences drawn from a Zipf-distributed vocabulary of inflected stems."""
+    rng = random.Random(seed)
+    stems = sorted({''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 4)))
+                    for _ in range(vocabulary_size)})
+    rng.shuffle(stems)
+    weights = [1 / (rank + 1) for rank in range(len(stems))]
+    parts, total = [], 0
+    while total < size:
+        words = []
+        for stem in rng.choices(stems, weights, k=rng.randint(8, 24)):
+            words.append(stem + rng.choice(SUFFIXES))
+            if rng.random() < 0.4:
+                words.append(rng.choice(STOP_WORDS))
+        sentence = ' '.join(words).capitalize() + '.'
+        parts.append(sentence)
+        total += len(sentence) + 1
+    return ' '.join(parts)
+
+
+def reinflect(word: str, rng: random.Random) -> str:
+    """The same stem with a different suffix."""
+    suffix = next((suffix for suffix in sorted(SUFFIXES, key=len, reverse=True)
+                   if suffix and word.endswith(suffix)), '')
+    stem = word[:len(word) - len(suffix)]
+    return stem + rng.choice([other for other in SUFFIXES if other != suffix])
+
+
+def make_questions(index: DocumentIndex, count: int, seed: int) -> List[Tuple[str, int]]:
+    """(question, source sentence id) pairs with some words re-inflected."""
+    rng = random.Random(seed)
+    questions = []
+    while len(questions) < count:
+        sentence_id = rng.randrange(len(index))
+        words = list(dict.fromkeys(word for word in tokenize(index.sentence(sentence_id)) if len(word) > 5))
+        if len(words) < 4:
+            continue
+        chosen = rng.sample(words, 4)
+        for i in rng.sample(range(4), 2):
+            chosen[i] = reinflect(chosen[i], rng)
+        questions.append(("What about " + ' '.join(chosen) + "?", sentence_id))
+    return questions
+
+
+def linear_scan(index: DocumentIndex, question: str) -> Tuple[List[int], int]:
+    """The original answer_question scoring: question words contained in each sentence."""
+    words = [word.strip('?.,!') for word in question.lower().split()
+             if len(word) > 3 and word not in ['what', 'where', 'when', 'why', 'how', 'which', 'who']]
+    scored = []
+    for sentence_id, sentence in enumerate(index.sentences()):
+        sentence = sentence.lower()
+        score = sum(1 for word in words if word in sentence)
+        if score > 0:
+            scored.append((sentence_id, score))
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return [sentence_id for sentence_id, _ in scored[:2]], len(index)
+
+
+def measure(lookup: Callable, questions: List[Tuple[str, int]]) -> Tuple[float, float, float]:
+    """hit@2, sentences visited per question and mean seconds per question."""
+    hits = visited = 0
+    start = time.perf_counter()
+    for question, source in questions:
+        answer_ids, candidates = lookup(question)
+        hits += source in answer_ids
+        visited += candidates
+    elapsed = time.perf_counter() - start
+    return hits / len(questions), visited / len(questions), elapsed / len(questions)
+
+
+def ranked_lookup(index) -> Callable:
+    def lookup(question: str):
+        ranked = index.search(query_terms(question))
+        return [sentence_id for sentence_id, _ in ranked[:2]], len(ranked)
+    return lookup
+
+
+def parse_config(config: str) -> Tuple[int, int]:
+    bands, rows = config.lower().split('x')
+    return int(bands), int(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', default='8MB', help='Size of the benchmark document')
+    parser.add_argument('--questions', type=int, default=200, help='Questions asked')
+    parser.add_argument('--configs', nargs='+', default=['16x2', '32x2', '64x2', '24x3'],
+                        help='LSH settings as BANDSxROWS')
+    parser.add_argument('--skip-linear', action='store_true', help='Skip the slow linear scan')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    index = DocumentIndex(synthetic_document(size, args.seed))
+    questions = make_questions(index, args.questions, args.seed)
+    print(f"{format_size(size)} document, {len(index)} sentences, {len(questions)} questions\n")
+
+    print(f"{'method':<22} {'hit@2':>6} {'visited':>10} {'per question':>13} {'build':>9} {'memory':>9}")
+    rows = []
+    if not args.skip_linear:
+        rows.append(('linear scan', measure(lambda question: linear_scan(index, question), questions), None, None))
+    rows.append(('BM25 postings', measure(ranked_lookup(index), questions), None, None))
+    for config in args.configs:
+        bands, rows_per_band = parse_config(config)
+        start = time.perf_counter()
+        lsh = SentenceLSH(index, bands, rows_per_band)
+        build = time.perf_counter() - start
+        label = f"LSH {bands}x{rows_per_band} (t={lsh.threshold:.2f})"
+        rows.append((label, measure(ranked_lookup(lsh), questions), build, lsh.nbytes()))
+
+    for label, (hit_rate, visited, seconds), build, nbytes in rows:
+        build_text = f"{build:>7.2f} s" if build is not None else f"{'':>9}"
+        memory_text = f"{nbytes / 1e6:>6.1f} MB" if nbytes is not None else f"{'':>9}"
+        print(f"{label:<22} {hit_rate:>6.0%} {visited:>10.0f} {seconds * 1000:>10.2f} ms {build_text} {memory_text}")
+
+
+if __name__ == '__main__':
+    main()
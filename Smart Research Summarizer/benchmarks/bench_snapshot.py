@@ -0,0 +1,120 @@
+"""
+Benchmark loading a processed document from a snapshot against reprocessing it.
+
+For each document size, a synthetic TXT upload is processed once the way
+the app does it (extract_text, analyze_document, then the Challenge Me
+question bank). The resulting entry is then stored and restored as
+
+- a zlib-compressed pickle, the previous DocumentCache format,
+- a compressed and an uncompressed document snapshot (document_snapshot).
+
+Reports the stored size and the best dump and load time of each over
+--repeat runs, and the time to load and answer the benchmark questions
+(snapshots decode posting lists on first use), next to the processing
+time, after checking that every restored document has the same index,
+summary, question bank and answers.
+
+Usage:
+    python benchmarks/bench_snapshot.py [--sizes 100KB 1MB 4MB] [--repeat 5]
+"""
+import argparse
+import io
+import os
+import pickle
+import sys
+import time
+import zlib
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import document_snapshot
+from ai_assistant import AIAssistant
+from document_processor import DocumentProcessor
+from synthetic import format_size, parse_size, synthetic_text
+
+QUESTIONS = [
+    "How much do language models reduce training cost?",
+    "What is the effect of clinical trials on patient outcomes?",
+    "Which methods improve diagnostic precision?",
+]
+
+FORMATS: Dict[str, Dict[str, Callable]] = {
+    'pickle+zlib': {
+        'dump': lambda entry: zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)),
+        'load': lambda data: pickle.loads(zlib.decompress(data))
+    },
+    'snapshot': {
+        'dump': document_snapshot.dumps,
+        'load': document_snapshot.loads
+    },
+    'snapshot raw': {
+        'dump': lambda entry: document_snapshot.dumps(entry, compress=False),
+        'load': document_snapshot.loads
+    }
+}
+
+
+def best_time(func: Callable, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def process(data: bytes, assistant: AIAssistant) -> Dict:
+    """Extract and analyze an upload and prepare its question bank."""
+    upload = io.BytesIO(data)
+    upload.type = 'text/plain'
+    text = DocumentProcessor().extract_text(upload)
+    entry = {'text': text, **assistant.analyze_document(text)}
+    index = entry['index']
+    questions = assistant.generate_questions(text, key_concepts=entry['key_concepts'], index=index)
+    entry['challenge'] = {'questions': questions,
+                          'expected': [assistant.expected_content(text, question, index) for question in questions]}
+    return entry
+
+
+def answer(entry: Dict, assistant: AIAssistant) -> list:
+    return [assistant.answer_question(entry['text'], question, index=entry['index']) for question in QUESTIONS]
+
+
+def fingerprint(entry: Dict, assistant: AIAssistant) -> tuple:
+    """Everything a restored document must reproduce."""
+    index = entry['index']
+    return (entry['text'], entry['summary'], entry['key_concepts'], index.postings, list(index.offsets),
+            list(index.sentence_lengths), entry['challenge'], answer(entry, assistant))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=['100KB', '1MB', '4MB'], help='Document sizes')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    assistant = AIAssistant()
+    print(f"{'size':>8} {'format':<13} {'stored':>10} {'dump':>10} {'load':>10} {'load+ask':>10} "
+          f"{'vs process':>11}")
+    for size in map(parse_size, args.sizes):
+        data = synthetic_text(size).encode('utf-8')
+        start = time.perf_counter()
+        entry = process(data, assistant)
+        processing = time.perf_counter() - start
+        expected = fingerprint(entry, assistant)
+        print(f"{format_size(size):>8} {'process':<13} {'':>10} {'':>10} {processing * 1000:>7.1f} ms")
+
+        for name, codec in FORMATS.items():
+            stored = codec['dump'](entry)
+            if fingerprint(codec['load'](stored), assistant) != expected:
+                raise SystemExit(f"{name} restored a different document")
+            dump = best_time(lambda: codec['dump'](entry), args.repeat)
+            load = best_time(lambda: codec['load'](stored), args.repeat)
+            load_and_ask = best_time(lambda: answer(codec['load'](stored), assistant), args.repeat)
+            print(f"{'':>8} {name:<13} {format_size(len(stored)):>10} {dump * 1000:>7.1f} ms "
+                  f"{load * 1000:>7.1f} ms {load_and_ask * 1000:>7.1f} ms {processing / load:>10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark Streamlit cold start and per-rerun latency of app.py.
+
+Cold start is measured in fresh interpreters: the time to import
+Streamlit alone, and the time for the first run of the app script
+(importing the app's modules and rendering the landing page). Rerun
+latency is measured in one process with a processed document loaded, by
+re-executing the script the way Streamlit does on every interaction.
+
+Usage:
+    python benchmarks/bench_startup.py [--cold-runs 5] [--reruns 30] [--size 100KB] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(APP_DIR, 'app.py')
+
+sys.path.insert(0, APP_DIR)
+
+from synthetic import parse_size, synthetic_text
+
+# Run in a fresh interpreter; prints the two cold-start timings as JSON
+COLD_START = f"""
+import json, sys, time
+sys.path.insert(0, {APP_DIR!r})
+start = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+AppTest.from_file({APP_PATH!r}, default_timeout=60).run()
+print(json.dumps({{'streamlit_import': imported - start, 'first_run': time.perf_counter() - imported}}))
+"""
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def cold_start(runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', COLD_START], capture_output=True, text=True,
+                                check=True, cwd=APP_DIR).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: round(statistics.median(sample[key] for sample in samples), 4) for key in samples[0]}
+
+
+def reruns(count: int, size: int) -> dict:
+    from streamlit.testing.v1 import AppTest
+    from document_pipeline import DocumentStream
+    from document_service import get_service_client
+
+    app = AppTest.from_file(APP_PATH, default_timeout=60)
+    app.run()
+    client = get_service_client()
+    job_id = client.submit(app.session_state.session_id, 'extract', {
+        'stream': DocumentStream('synthetic.txt', 'text/plain'),
+        'data': synthetic_text(size).encode('utf-8'),
+        'cache_key': None
+    })
+    client.wait(job_id)
+    app.session_state.document_job = job_id
+    app.session_state.document_name = 'synthetic.txt'
+    app.session_state.document_processed = True
+    app.session_state.document_cache_key = 'synthetic'
+    app.run()
+    app.session_state.mode = 'ask_anything'
+    app.run()
+
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        app.run()
+        samples.append(time.perf_counter() - start)
+    return {
+        'median': round(statistics.median(samples), 4),
+        'p95': round(percentile(samples, 0.95), 4),
+        'max': round(max(samples), 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cold-runs', type=int, default=5, help='Fresh interpreters to start (median is reported)')
+    parser.add_argument('--reruns', type=int, default=30, help='Script reruns to time')
+    parser.add_argument('--size', default='100KB', help='Size of the document loaded for reruns')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    # Keep benchmark documents out of the real cache
+    os.environ.setdefault('SMART_RESEARCH_CACHE_DIR', tempfile.mkdtemp(prefix='bench-startup-'))
+
+    results = {'cold_start_seconds': cold_start(args.cold_runs),
+               'rerun_seconds': reruns(args.reruns, parse_size(args.size))}
+    cold = results['cold_start_seconds']
+    print(f"cold start: streamlit import {cold['streamlit_import'] * 1000:.0f} ms, "
+          f"first app run {cold['first_run'] * 1000:.0f} ms")
+    rerun = results['rerun_seconds']
+    print(f"rerun:      median {rerun['median'] * 1000:.1f} ms, p95 {rerun['p95'] * 1000:.1f} ms, "
+          f"max {rerun['max'] * 1000:.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark the extractive summarizer on large synthetic documents.
+
+Times index construction and centroid / TextRank summarization separately
+and checks that summarization stays under the one-second budget for a
+10k-sentence document.
+
+Usage:
+    python benchmarks/bench_summarizer.py [--sentences 10000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_index import DocumentIndex
+from summarizer import summarize
+
+BUDGET_SECONDS = 1.0
+
+TOPICS = ["neural networks", "clinical trials", "protein folding", "climate models",
+          "supply chains", "graph algorithms", "language models", "drug discovery"]
+VERBS = ["improves", "reduces", "predicts", "explains", "accelerates", "complicates", "measures"]
+OBJECTS = ["patient outcomes", "training cost", "error rates", "model accuracy", "energy use",
+           "sample efficiency", "diagnostic precision", "regional rainfall", "delivery times"]
+
+
+def synthetic_document(n_sentences: int, rng: random.Random) -> str:
+    """Paragraphs of templated sentences with a skewed topic distribution."""
+    sentences = []
+    for i in range(n_sentences):
+        topic = TOPICS[min(int(rng.expovariate(0.6)), len(TOPICS) - 1)]
+        sentence = (f"In study {i}, {topic} {rng.choice(VERBS)} {rng.choice(OBJECTS)} "
+                    f"by {rng.randint(2, 60)} percent compared with {rng.choice(OBJECTS)}.")
+        sentences.append(sentence)
+        if rng.random() < 0.1:
+            sentences.append("\n\n")
+    return ' '.join(sentences)
+
+
+def best_time(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sentences', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'sentences':>10} {'index s':>9} {'centroid s':>11} {'textrank s':>11}")
+    over_budget = False
+    for n_sentences in args.sentences:
+        text = synthetic_document(n_sentences, rng)
+        index_time = best_time(lambda: DocumentIndex(text), 1)
+        index = DocumentIndex(text)
+        centroid_time = best_time(lambda: summarize(index, method='centroid'), args.repeat)
+        textrank_time = best_time(lambda: summarize(index, method='textrank'), args.repeat)
+        print(f"{len(index):>10} {index_time:>9.3f} {centroid_time:>11.3f} {textrank_time:>11.3f}")
+        if len(index) <= 10000 and max(centroid_time, textrank_time) > BUDGET_SECONDS:
+            over_budget = True
+
+    if over_budget:
+        raise SystemExit(f"Summarization exceeded {BUDGET_SECONDS:.1f}s on a document of 10k sentences or fewer")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""
+Load-test app.py with many concurrent sessions in one process.
+
+Every simulated session drives the app through Streamlit's AppTest, the
+way a browser session does on one server node: all sessions share the
+process, its st.cache_resource singletons, the document service and the
+document store. Each session runs the full flow
+
+- first_run: open the app
+- upload:    choose a synthetic document in the sidebar uploader
+- process:   click "Process Document" and rerun until it is processed
+- ask:       open Ask Anything and ask --questions questions
+- challenge: open Challenge Me and generate the questions
+- evaluate:  answer every question and click "Evaluate All"
+
+and every script run is also timed on its own as a rerun. For each
+--sessions level the sessions start together (or --ramp seconds apart)
+and the report gives p50/p95/p99/max latency per action, failed actions,
+completed flows and actions per second, and the growth of the process
+resident memory per session. Documents are distinct per session unless
+--same-document is given, so uploads are not served from the cache. One
+unrecorded flow runs first, so imports and process-wide singletons are
+not counted against the first level.
+
+Runs are fully offline; caches are written to a temporary directory.
+
+Usage:
+    python benchmarks/load_test.py [--sessions 1 4 16] [--size 100KB] [--kind txt]
+        [--questions 3] [--ramp 0] [--same-document] [--output results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(APP_DIR, 'app.py')
+
+sys.path.insert(0, APP_DIR)
+
+from synthetic import format_size, parse_size, synthetic_pdf, synthetic_text
+
+ACTIONS = ['first_run', 'upload', 'process', 'ask', 'challenge', 'evaluate', 'rerun']
+QUESTIONS = [
+    "How much do language models reduce training cost?",
+    "What is the effect of clinical trials on patient outcomes?",
+    "Which methods improve diagnostic precision?",
+    "What do the results show about error rates?",
+]
+ANSWER = "Neural networks improve model accuracy and reduce error rates compared with baselines."
+MIME_TYPES = {'txt': 'text/plain', 'pdf': 'application/pdf'}
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def resident_bytes() -> int:
+    """Current resident set size of this process (peak size where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def make_document(kind: str, size: int, seed: int) -> bytes:
+    return synthetic_pdf(size, seed) if kind == 'pdf' else synthetic_text(size, seed).encode('utf-8')
+
+
+def share_app_test_runtime() -> None:
+    """
+    Let AppTest runs overlap in threads, as sessions do on a server.
+
+    AppTest installs a mock Runtime singleton when a run starts and removes
+    it when the run ends, which would pull it from under every other run
+    still in progress; fall back to one shared mock runtime instead. AppTest
+    also compiles the script on every run, which is not thread-safe; share
+    one script cache like the server does.
+    """
+    from unittest.mock import MagicMock
+
+    import streamlit.testing.v1.app_test as app_test
+    import streamlit.testing.v1.local_script_runner as local_script_runner
+
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.dataframe_source_mgr = DataframeSourceManager()
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    shared.bidi_component_registry = BidiComponentManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or shared)
+    Runtime.exists = classmethod(lambda cls: True)
+    script_cache = ScriptCache()
+    # Compile before the sessions start, so no two compile at once
+    script_cache.get_bytecode(APP_PATH)
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+
+class ActionFailed(Exception):
+    """The app showed an error or raised while performing an action."""
+
+
+class Session:
+    """One simulated browser session, recording the latency of every action and rerun."""
+
+    def __init__(self, samples: Dict[str, List[float]], lock: threading.Lock, timeout: float,
+                 poll_interval: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.samples = samples
+        self.lock = lock
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        # Action in progress, to attribute failures
+        self.action = 'first_run'
+
+    def record(self, action: str, seconds: float) -> None:
+        with self.lock:
+            self.samples[action].append(seconds)
+
+    def run(self) -> None:
+        """Rerun the script and fail on any exception or failed action it rendered."""
+        start = time.perf_counter()
+        self.app.run()
+        self.record('rerun', time.perf_counter() - start)
+        # Failed actions render "Error ..." messages; graded answers may render "Incorrect"
+        problems = ([element.value for element in self.app.exception]
+                    + [element.value for element in self.app.error if element.value.startswith('Error')])
+        if problems:
+            raise ActionFailed(str(problems[0])[:200])
+
+    def button(self, label: str):
+        for button in self.app.button:
+            if button.label == label:
+                return button
+        raise ActionFailed(f"no {label!r} button")
+
+    def click(self, label: str) -> None:
+        self.button(label).click()
+        self.run()
+
+    def timed(self, action: str, func, *args) -> None:
+        self.action = action
+        start = time.perf_counter()
+        func(*args)
+        self.record(action, time.perf_counter() - start)
+
+    def upload(self, name: str, data: bytes, mime: str) -> None:
+        self.app.sidebar.file_uploader[0].set_value((name, data, mime))
+        self.run()
+
+    def process(self) -> None:
+        """Process the upload and rerun, as the progress fragment does, until the document is loaded."""
+        self.click("Process Document")
+        deadline = time.perf_counter() + self.timeout
+        while self.app.session_state['document_handle'] is None:
+            if not self.app.session_state['document_processed']:
+                raise ActionFailed("processing failed")
+            if time.perf_counter() > deadline:
+                raise ActionFailed("processing timed out")
+            time.sleep(self.poll_interval)
+            self.run()
+
+    def ask(self, question: str) -> None:
+        self.app.text_input[0].set_value(question)
+        self.click("Get Answer")
+
+    def challenge(self) -> None:
+        self.click("🧠 Challenge Me")
+        self.click("Generate Questions")
+
+    def evaluate(self) -> None:
+        for text_area in self.app.text_area:
+            text_area.set_value(ANSWER)
+        self.click("Evaluate All")
+
+    def flow(self, name: str, data: bytes, mime: str, questions: List[str]) -> None:
+        self.timed('first_run', self.run)
+        self.timed('upload', self.upload, name, data, mime)
+        self.timed('process', self.process)
+        self.action = 'ask'
+        self.click("❓ Ask Anything")
+        for question in questions:
+            self.timed('ask', self.ask, question)
+        self.timed('challenge', self.challenge)
+        self.timed('evaluate', self.evaluate)
+
+
+def run_level(sessions: int, documents: List[bytes], kind: str, questions: List[str], ramp: float,
+              timeout: float, poll_interval: float) -> Dict:
+    """Run one flow per session concurrently and summarize the latencies."""
+    samples: Dict[str, List[float]] = defaultdict(list)
+    failures: Dict[str, int] = defaultdict(int)
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def one_session(number: int) -> bool:
+        time.sleep(number * ramp)
+        session = Session(samples, lock, timeout, poll_interval)
+        try:
+            session.flow(f"load-{number}.{kind}", documents[number % len(documents)], MIME_TYPES[kind], questions)
+            return True
+        except Exception as e:
+            with lock:
+                failures[session.action] += 1
+                errors.append(f"session {number}, {session.action}: {e}")
+            return False
+
+    rss_before = resident_bytes()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        completed = sum(executor.map(one_session, range(sessions)))
+    elapsed = time.perf_counter() - start
+    rss_after = resident_bytes()
+
+    actions = {}
+    for action in ACTIONS:
+        values = samples.get(action)
+        if values:
+            actions[action] = {
+                'count': len(values),
+                'failed': failures.get(action, 0),
+                'p50': round(percentile(values, 0.50), 4),
+                'p95': round(percentile(values, 0.95), 4),
+                'p99': round(percentile(values, 0.99), 4),
+                'max': round(max(values), 4)
+            }
+    return {
+        'sessions': sessions,
+        'completed_flows': completed,
+        'failed_flows': sessions - completed,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'flows_per_second': round(completed / elapsed, 3),
+        'actions_per_second': round(sum(len(values) for action, values in samples.items() if action != 'rerun')
+                                    / elapsed, 3),
+        'memory_growth_per_session_bytes': (rss_after - rss_before) // max(sessions, 1),
+        'actions_seconds': actions
+    }
+
+
+def print_level(result: Dict) -> None:
+    print(f"\n{result['sessions']} sessions: {result['completed_flows']} flows completed, "
+          f"{result['failed_flows']} failed in {result['seconds']:.1f} s; "
+          f"{result['flows_per_second']:.2f} flows/s, {result['actions_per_second']:.2f} actions/s, "
+          f"memory {result['memory_growth_per_session_bytes'] / 1e6:+.1f} MB per session")
+    print(f"  {'action':<10} {'count':>6} {'failed':>6} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+    for action, stats in result['actions_seconds'].items():
+        print(f"  {action:<10} {stats['count']:>6} {stats['failed']:>6} " +
+              ' '.join(f"{stats[key] * 1000:>7.0f} ms" for key in ('p50', 'p95', 'p99', 'max')))
+    for error in result['errors'][:5]:
+        print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', nargs='+', type=int, default=[1, 4, 16],
+                        help='Concurrent sessions per level, run one level after another')
+    parser.add_argument('--size', default='100KB', help='Size of the uploaded documents')
+    parser.add_argument('--kind', choices=sorted(MIME_TYPES), default='txt', help='Type of the uploaded documents')
+    parser.add_argument('--questions', type=int, default=3, help='Questions asked per session')
+    parser.add_argument('--ramp', type=float, default=0.0, help='Seconds between session starts')
+    parser.add_argument('--same-document', action='store_true',
+                        help='Upload one document in every session instead of one per session')
+    parser.add_argument('--timeout', type=float, default=300, help='Seconds allowed per script run or processing')
+    parser.add_argument('--poll-interval', type=float, default=0.2,
+                        help='Seconds between reruns while a document is processing')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    # Keep load-test documents, answers and history out of the real cache
+    os.environ.setdefault('SMART_RESEARCH_CACHE_DIR', tempfile.mkdtemp(prefix='load-test-'))
+    share_app_test_runtime()
+
+    size = parse_size(args.size)
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.questions)]
+    print(f"{format_size(size)} {args.kind} documents, {len(questions)} questions per session, "
+          f"{'one shared document' if args.same_document else 'one document per session'}")
+
+    # Warm up imports and shared resources on a document no level uploads
+    run_level(1, [make_document(args.kind, size, args.seed - 1)], args.kind, questions, 0, args.timeout,
+              args.poll_interval)
+
+    results = []
+    first_seed = args.seed
+    for sessions in args.sessions:
+        count = 1 if args.same_document else sessions
+        documents = [make_document(args.kind, size, first_seed + i) for i in range(count)]
+        # New seeds for every level, so earlier levels do not warm the document cache
+        first_seed += count
+        result = run_level(sessions, documents, args.kind, questions, args.ramp, args.timeout,
+                           args.poll_interval)
+        print_level(result)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({'size': size, 'kind': args.kind, 'questions': len(questions), 'levels': results},
+                      output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
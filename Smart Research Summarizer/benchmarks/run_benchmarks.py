@@ -0,0 +1,164 @@
+"""
+Benchmark suite for the document pipeline.
+
+Generates synthetic TXT and PDF documents (see synthetic.py) and times
+each stage separately: extract_text, clean_text, build_index,
+generate_summary, answer_question, generate_questions and
+evaluate_answer. For every stage it records the best wall time over
+--repeat runs, throughput in MB/s of document text, and peak traced
+memory (measured in a separate tracemalloc run so tracing does not skew
+the timings).
+
+Results can be saved as a JSON baseline and later runs compared against
+it; a stage that is slower or uses more memory than the baseline by more
+than --tolerance is flagged and the exit status is 1.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 1KB 100KB 1MB] [--kinds txt pdf]
+        [--save-baseline baseline.json] [--baseline baseline.json] [--tolerance 0.25]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from ai_assistant import AIAssistant
+from document_processor import DocumentProcessor, load_file
+from synthetic import ensure_document, format_size, parse_size
+
+QUESTIONS = [
+    "How much do language models reduce training cost?",
+    "What is the effect of clinical trials on patient outcomes?",
+    "Which methods improve diagnostic precision?",
+]
+ANSWER = "Neural networks improve model accuracy and reduce error rates compared with baselines."
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.data')
+
+
+def best_time(func: Callable, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func: Callable) -> int:
+    """Peak bytes allocated while running func, as traced by tracemalloc."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stages(path: str) -> Dict[str, Callable]:
+    """The benchmarked calls for one document, each reading only prepared inputs."""
+    processor = DocumentProcessor()
+    assistant = AIAssistant()
+    text = processor.extract_text(load_file(path))
+    index = assistant.build_index(text)
+    key_concepts = assistant._extract_key_concepts(text)
+    return {
+        'extract_text': lambda: processor.extract_text(load_file(path)),
+        'clean_text': lambda: processor.clean_text(text),
+        'build_index': lambda: assistant.build_index(text),
+        'generate_summary': lambda: assistant.generate_summary(text, index=index),
+        'answer_question': lambda: [assistant.answer_question(text, question, index=index)
+                                    for question in QUESTIONS],
+        'generate_questions': lambda: assistant.generate_questions(text, key_concepts=key_concepts, index=index),
+        'evaluate_answer': lambda: assistant.evaluate_answer(text, QUESTIONS[0], ANSWER, index=index),
+    }, len(text.encode('utf-8'))
+
+
+def run(kinds: List[str], sizes: List[int], repeat: int, data_dir: str, seed: int) -> Dict:
+    results = {}
+    for kind in kinds:
+        for size in sizes:
+            path = ensure_document(data_dir, kind, size, seed)
+            calls, text_bytes = stages(path)
+            for stage, func in calls.items():
+                seconds = best_time(func, repeat)
+                peak = peak_memory(func)
+                key = f"{kind}/{format_size(size)}/{stage}"
+                results[key] = {
+                    'seconds': round(seconds, 6),
+                    'mb_per_s': round(text_bytes / 1e6 / seconds, 3) if seconds else None,
+                    'peak_mb': round(peak / 1e6, 3)
+                }
+                print(f"{key:<36} {seconds * 1000:>10.2f} ms {results[key]['mb_per_s'] or 0:>10.2f} MB/s "
+                      f"{results[key]['peak_mb']:>9.2f} MB peak", flush=True)
+    return results
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Describe every stage that regressed against the baseline beyond the tolerance."""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric, label in (('seconds', 'time'), ('peak_mb', 'peak memory')):
+            if reference[metric] and result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{key}: {label} {result[metric]:.4g} vs baseline {reference[metric]:.4g} "
+                                   f"(+{(result[metric] / reference[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=['1KB', '100KB', '1MB'],
+                        help='Document sizes, e.g. 1KB 10MB 100MB')
+    parser.add_argument('--kinds', nargs='+', choices=['txt', 'pdf'], default=['txt', 'pdf'])
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='Where synthetic documents are kept')
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against this JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown or memory growth before flagging (default: 0.25 = 25%%)')
+    args = parser.parse_args()
+
+    results = run(args.kinds, [parse_size(size) for size in args.sizes], args.repeat, args.data_dir, args.seed)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump({
+                'meta': {
+                    'python': platform.python_version(),
+                    'numpy': np.__version__,
+                    'platform': platform.platform(),
+                    'cpu_count': os.cpu_count(),
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'seed': args.seed,
+                    'repeat': args.repeat
+                },
+                'results': results
+            }, baseline_file, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Synthetic research documents for benchmarks.
+
+Generates reproducible paper-like text (section headings, paragraphs of
+wrapped lines with ragged whitespace, abbreviations, numbers) of any target
+size, as TXT or as a minimal PDF that PyPDF2 can extract. Documents are
+written once per (kind, size, seed) and reused on later runs.
+
+Usage:
+    python benchmarks/synthetic.py OUT_DIR [--sizes 1KB 1MB 100MB] [--kinds txt pdf] [--seed 0]
+"""
+import argparse
+import os
+import random
+import re
+from typing import Iterator, List
+
+SECTIONS = ["Abstract", "Introduction", "Related Work", "Methods", "Experimental Setup",
+            "Results", "Discussion", "Limitations", "Conclusion"]
+TOPICS = ["neural networks", "clinical trials", "protein folding", "climate models",
+          "supply chains", "graph algorithms", "language models", "drug discovery"]
+VERBS = ["improves", "reduces", "predicts", "explains", "accelerates", "complicates", "measures"]
+OBJECTS = ["patient outcomes", "training cost", "error rates", "model accuracy", "energy use",
+           "sample efficiency", "diagnostic precision", "regional rainfall", "delivery times"]
+TEMPLATES = [
+    "In experiment {n}, {topic} {verb} {obj} by {pct} percent compared with {obj2}.",
+    "As shown in Fig. {fig}, the effect of {topic} on {obj} is significant (p < 0.0{fig}).",
+    "Smith et al. report that {topic} {verb} {obj}, e.g. under low-resource settings.",
+    "Why does {topic} affect {obj}?",
+    "We observe approx. {pct} percent lower {obj} when {topic} is combined with {obj2}.",
+]
+
+# Characters per wrapped line, like text extracted from a two-column PDF
+LINE_WIDTH = 90
+
+# Text lines per PDF page
+PDF_LINES_PER_PAGE = 50
+
+
+def parse_size(size: str) -> int:
+    """Parse '512', '1KB', '10MB' or '1GB' into bytes."""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([KMG]?B?)', size.strip().upper())
+    if not match:
+        raise ValueError(f"Invalid size: {size}")
+    unit = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2,
+            'G': 1024 ** 3, 'GB': 1024 ** 3}[match.group(2)]
+    return int(float(match.group(1)) * unit)
+
+
+def format_size(size: int) -> str:
+    """Inverse of parse_size for whole units."""
+    for unit, factor in (('GB', 1024 ** 3), ('MB', 1024 ** 2), ('KB', 1024)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return f"{size}B"
+
+
+def iter_lines(rng: random.Random) -> Iterator[str]:
+    """Endless stream of wrapped document lines, with headings and blank lines between paragraphs."""
+    section = 0
+    while True:
+        yield ''
+        yield f"{section + 1}. {SECTIONS[section % len(SECTIONS)]}"
+        section += 1
+        for _ in range(rng.randint(2, 6)):
+            sentences = []
+            for _ in range(rng.randint(3, 8)):
+                topic = TOPICS[min(int(rng.expovariate(0.6)), len(TOPICS) - 1)]
+                sentences.append(rng.choice(TEMPLATES).format(
+                    n=rng.randint(1, 500), topic=topic, verb=rng.choice(VERBS), obj=rng.choice(OBJECTS),
+                    obj2=rng.choice(OBJECTS), pct=rng.randint(2, 60), fig=rng.randint(1, 9)
+                ))
+            paragraph = ' '.join(sentences)
+            while paragraph:
+                cut = paragraph.rfind(' ', 0, LINE_WIDTH) if len(paragraph) > LINE_WIDTH else len(paragraph)
+                cut = cut if cut > 0 else len(paragraph)
+                # Ragged spacing as left behind by PDF extraction
+                yield rng.choice(['', ' ', '  ']) + paragraph[:cut] + rng.choice(['', ' ', '\t'])
+                paragraph = paragraph[cut:].lstrip()
+            yield ''
+
+
+def synthetic_lines(size: int, seed: int = 0) -> List[str]:
+    """Lines totalling roughly ``size`` bytes of UTF-8 text."""
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    for line in iter_lines(rng):
+        if total >= size:
+            break
+        lines.append(line)
+        total += len(line) + 1
+    return lines
+
+
+def synthetic_text(size: int, seed: int = 0) -> str:
+    """Plain text of roughly ``size`` bytes."""
+    return '\n'.join(synthetic_lines(size, seed))
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def synthetic_pdf(size: int, seed: int = 0) -> bytes:
+    """
+    A minimal PDF holding roughly ``size`` bytes of text, one Helvetica text block per page.
+
+    Args:
+        size: Approximate amount of page text in bytes
+        seed: Random seed
+
+    Returns:
+        PDF file bytes
+    """
+    return pdf_from_lines(synthetic_lines(size, seed))
+
+
+def pdf_from_lines(lines: List[str]) -> bytes:
+    """A minimal PDF showing ``lines`` of text, PDF_LINES_PER_PAGE per page."""
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)] or [[]]
+
+    # 1: catalog, 2: page tree, 3: font, then a page object and a content stream per page
+    kids = ' '.join(f'{4 + 2 * i} 0 R' for i in range(len(pages)))
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        f'<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>'.encode(),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for i, page in enumerate(pages):
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>'.encode())
+        body = 'BT /F1 10 Tf 40 760 Td 14 TL ' + ' '.join(f'({_pdf_escape(line)}) Tj T*' for line in page) + ' ET'
+        stream = body.encode('latin-1', 'replace')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def ensure_document(directory: str, kind: str, size: int, seed: int = 0) -> str:
+    """
+    Write a synthetic document unless it already exists.
+
+    Args:
+        directory: Output directory
+        kind: 'txt' or 'pdf'
+        size: Approximate text size in bytes
+        seed: Random seed
+
+    Returns:
+        Path of the document
+    """
+    path = os.path.join(directory, f"synthetic-{format_size(size)}-seed{seed}.{kind}")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        data = synthetic_pdf(size, seed) if kind == 'pdf' else synthetic_text(size, seed).encode('utf-8')
+        with open(path + '.tmp', 'wb') as document:
+            document.write(data)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out_dir')
+    parser.add_argument('--sizes', nargs='+', default=['1KB', '100KB', '1MB', '10MB', '100MB'])
+    parser.add_argument('--kinds', nargs='+', choices=['txt', 'pdf'], default=['txt', 'pdf'])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for kind in args.kinds:
+        for size in map(parse_size, args.sizes):
+            path = ensure_document(args.out_dir, kind, size, args.seed)
+            print(f"{path} ({os.path.getsize(path):,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
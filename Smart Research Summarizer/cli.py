@@ -0,0 +1,360 @@
+"""
+Headless command-line entry point for bulk document processing.
+
+Examples:
+    smart-research summarize papers/ -o summaries.jsonl --workers 8
+    smart-research index papers/ --recursive
+    smart-research ask papers/ -q "What dataset was used?" -q "What are the limitations?"
+    smart-research ask corpus/ --mmap-dir mapped/ -q "Which methods were compared?"
+    smart-research search papers/ -q "Which datasets were used?" --top-k 10
+    smart-research ask books/ -q "Who founded the colony?" --lsh-min-sentences 5000
+    smart-research ask papers/ -q "How was the cost lowered?" --retrieval dense
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import document_snapshot
+from ai_assistant import RETRIEVAL_METHODS, AIAssistant
+from corpus import DEFAULT_TOP_K, Corpus
+from document_cache import DEFAULT_CACHE_DIR, DocumentCache, content_hash, file_hash
+from document_processor import SUPPORTED_TYPES, DocumentProcessor, load_file, open_file
+from mapped_document import MappedDocument, write_mapped_document
+
+
+def find_documents(paths: List[str], recursive: bool = False) -> List[str]:
+    """
+    Collect the supported documents under the given files and directories.
+
+    Args:
+        paths: Files or directories
+        recursive: Whether to descend into subdirectories
+
+    Returns:
+        Sorted list of document paths
+    """
+    documents = []
+    for path in paths:
+        if os.path.isfile(path):
+            documents.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            documents.extend(os.path.join(root, name) for name in files
+                             if os.path.splitext(name)[1].lower() in SUPPORTED_TYPES)
+            if not recursive:
+                break
+    return sorted(documents)
+
+
+def analyze_file(path: str, cache_dir: Optional[str] = None) -> Dict:
+    """
+    Extract and analyze one document, reusing cached results when available.
+
+    Args:
+        path: Document path
+        cache_dir: Cache directory, or None to disable caching
+
+    Returns:
+        Dictionary with the document text and analysis results
+    """
+    upload = load_file(path)
+    cache = DocumentCache(cache_dir) if cache_dir else None
+    cache_key = content_hash(upload.getvalue())
+
+    cached = cache.get(cache_key) if cache else None
+    if cached:
+        return cached
+
+    # Each CLI worker is already a separate process, so extract serially
+    text = DocumentProcessor(max_workers=1).extract_text(upload)
+    entry = {'text': text, **AIAssistant().analyze_document(text)}
+    if cache:
+        cache.put(cache_key, entry)
+    return entry
+
+
+def map_file(path: str, mmap_dir: str) -> str:
+    """
+    Build the mapped document for a file, streaming it from disk, unless it already exists.
+
+    Args:
+        path: Document path
+        mmap_dir: Directory holding mapped documents, named by content hash
+
+    Returns:
+        Path of the mapped document
+    """
+    mapped_path = os.path.join(mmap_dir, file_hash(path) + '.srdoc')
+    if not os.path.exists(mapped_path):
+        os.makedirs(mmap_dir, exist_ok=True)
+        # Each CLI worker is already a separate process, so extract serially
+        processor = DocumentProcessor(max_workers=1)
+        with open_file(path) as local_file:
+            _, segments = processor.iter_segments(local_file)
+            write_mapped_document(mapped_path, segments)
+    return mapped_path
+
+
+def process_mapped_file(task: Dict, record: Dict) -> None:
+    """Run the 'index' or 'ask' command against a mapped document, filling in record."""
+    with MappedDocument(map_file(task['path'], task['mmap_dir'])) as document:
+        record['mapped_path'] = document.path
+        record['bytes'] = len(document.text)
+        record['sentences'] = len(document)
+        record['terms'] = len(document.vocabulary)
+        if task['command'] == 'ask':
+            assistant = AIAssistant(lsh_min_sentences=task.get('lsh_min_sentences'),
+                                    retrieval=task.get('retrieval', 'keyword'))
+            record['answers'] = []
+            for question in task['questions']:
+                answer, justification = assistant.answer_question('', question, index=document)
+                record['answers'].append({
+                    'question': question,
+                    'answer': answer,
+                    'justification': justification
+                })
+
+
+def process_loaded_file(task: Dict, record: Dict) -> None:
+    """Run a command against the in-memory analysis of a document, filling in record."""
+    entry = analyze_file(task['path'], task['cache_dir'])
+    index = entry['index']
+    record['chars'] = len(entry['text'])
+    record['sentences'] = len(index)
+    record['key_concepts'] = entry['key_concepts']
+
+    if task['command'] == 'summarize':
+        record['summary'] = entry['summary']
+    elif task['command'] == 'index':
+        record['terms'] = len(index.postings)
+    elif task['command'] == 'ask':
+        assistant = AIAssistant(lsh_min_sentences=task.get('lsh_min_sentences'),
+                                retrieval=task.get('retrieval', 'keyword'))
+        record['answers'] = []
+        for question in task['questions']:
+            answer, justification = assistant.answer_question(entry['text'], question, index=index)
+            record['answers'].append({
+                'question': question,
+                'answer': answer,
+                'justification': justification
+            })
+
+
+def process_file(task: Dict) -> Dict:
+    """
+    Run one CLI command on one document. Executed in worker processes.
+
+    Args:
+        task: Dictionary with 'command', 'path', 'cache_dir', 'questions' and
+            optionally 'mmap_dir', 'lsh_min_sentences' and 'retrieval'
+
+    Returns:
+        JSON-serializable result record
+    """
+    record = {'path': task['path'], 'command': task['command']}
+    start = time.perf_counter()
+    try:
+        if task.get('mmap_dir'):
+            process_mapped_file(task, record)
+        else:
+            process_loaded_file(task, record)
+        record['status'] = 'ok'
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def run(command: str, documents: List[str], workers: int, cache_dir: Optional[str],
+        questions: Optional[List[str]] = None, mmap_dir: Optional[str] = None,
+        lsh_min_sentences: Optional[int] = None, retrieval: str = 'keyword') -> Iterator[Dict]:
+    """
+    Process documents across a worker pool, yielding records in input order.
+
+    Args:
+        command: 'summarize', 'index' or 'ask'
+        documents: Document paths
+        workers: Number of worker processes; 1 runs in this process
+        cache_dir: Cache directory, or None to disable caching
+        questions: Questions for the 'ask' command
+        mmap_dir: Work from mapped documents in this directory instead of in-memory analysis
+        lsh_min_sentences: Answer documents with at least this many sentences by LSH lookup
+        retrieval: 'keyword' or 'dense' sentence lookup (see AIAssistant)
+
+    Yields:
+        Result records
+    """
+    tasks = [{'command': command, 'path': path, 'cache_dir': cache_dir, 'questions': questions or [],
+              'mmap_dir': mmap_dir, 'lsh_min_sentences': lsh_min_sentences, 'retrieval': retrieval}
+             for path in documents]
+    yield from pool_map(process_file, tasks, workers)
+
+
+def pool_map(func: Callable, tasks: Iterable, workers: int) -> Iterator:
+    """Map func over tasks in a process pool, in input order; 1 worker runs in this process."""
+    if workers <= 1:
+        yield from map(func, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(func, tasks, chunksize=4)
+
+
+def load_corpus_document(task: Dict) -> Tuple[Dict, Union[Dict, bytes, None]]:
+    """
+    Analyze one document for a corpus. Executed in worker processes.
+
+    Args:
+        task: Dictionary with 'path', 'cache_dir' and 'snapshot'
+
+    Returns:
+        Tuple of (status record, analysis entry with its content 'key' or,
+        if 'snapshot' is set, its document snapshot; None on error)
+    """
+    record = {'path': task['path'], 'command': 'search'}
+    try:
+        entry = analyze_file(task['path'], task['cache_dir'])
+        entry['key'] = file_hash(task['path'])
+        record['status'] = 'ok'
+        if task['snapshot']:
+            # A snapshot crosses the process boundary much faster than a pickled index
+            return record, document_snapshot.dumps(entry, compress=False)
+        return record, entry
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+        return record, None
+
+
+def search(documents: List[str], workers: int, cache_dir: Optional[str], questions: List[str],
+           top_k: int = DEFAULT_TOP_K, lsh_min_sentences: Optional[int] = None,
+           retrieval: str = 'keyword') -> Iterator[Dict]:
+    """
+    Index documents into one corpus and answer questions across all of them.
+
+    Args:
+        documents: Document paths
+        workers: Number of worker processes for extraction
+        cache_dir: Cache directory, or None to disable caching
+        questions: Questions to answer
+        top_k: Citations per answer
+        lsh_min_sentences: Answer from the corpus by LSH lookup once it has this many sentences
+        retrieval: 'keyword' or 'dense' sentence lookup (see AIAssistant)
+
+    Yields:
+        Error records for documents that could not be indexed, then one
+        record per question with the answer and its citations
+    """
+    corpus = Corpus()
+    tasks = [{'path': path, 'cache_dir': cache_dir, 'snapshot': workers > 1} for path in documents]
+    for record, entry in pool_map(load_corpus_document, tasks, workers):
+        if entry is None:
+            yield record
+            continue
+        if isinstance(entry, bytes):
+            entry = document_snapshot.loads(entry)
+        # Cite documents by path; base names can repeat across directories
+        corpus.add_document(record['path'], entry['text'], index=entry['index'], key=entry['key'])
+
+    assistant = AIAssistant(lsh_min_sentences=lsh_min_sentences, retrieval=retrieval)
+    for question in questions:
+        start = time.perf_counter()
+        record = {'command': 'search', 'question': question, **corpus.ask(question, top_k, assistant)}
+        record['status'] = 'ok'
+        record['seconds'] = round(time.perf_counter() - start, 4)
+        yield record
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='smart-research',
+        description="Summarize, index or question a directory of PDF/TXT documents without the web UI.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('paths', nargs='+', help="Documents or directories to process")
+    common.add_argument('-o', '--output', help="JSONL output file (default: stdout)")
+    common.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: CPU count)")
+    common.add_argument('-r', '--recursive', action='store_true', help="Descend into subdirectories")
+    common.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f"Analysis cache directory (default: {DEFAULT_CACHE_DIR})")
+    common.add_argument('--no-cache', action='store_true', help="Do not read or write the analysis cache")
+    common.add_argument('--mmap-dir',
+                        help="Build memory-mapped documents here and search them without loading "
+                             "the text into memory (index and ask only)")
+
+    subparsers.add_parser('summarize', parents=[common], help="Write a summary per document")
+    subparsers.add_parser('index', parents=[common], help="Build and cache the sentence index per document")
+    ask = subparsers.add_parser('ask', parents=[common], help="Answer questions against every document")
+    ask.add_argument('-q', '--question', action='append', default=[], help="Question to ask (repeatable)")
+    ask.add_argument('--questions-file', help="File with one question per line")
+    ask.add_argument('--lsh-min-sentences', type=int,
+                     help="Answer documents with at least this many sentences by approximate "
+                          "MinHash/LSH lookup instead of the exact BM25 scan")
+    ask.add_argument('--retrieval', choices=RETRIEVAL_METHODS, default='keyword',
+                     help="Match the question's words (default) or compare dense sentence vectors, "
+                          "which also finds sentences using different words")
+    search_parser = subparsers.add_parser('search', parents=[common],
+                                          help="Index every document into one corpus and answer across all of them")
+    search_parser.add_argument('-q', '--question', action='append', default=[], help="Question to ask (repeatable)")
+    search_parser.add_argument('--questions-file', help="File with one question per line")
+    search_parser.add_argument('-k', '--top-k', type=int, default=DEFAULT_TOP_K,
+                               help=f"Citations per answer (default: {DEFAULT_TOP_K})")
+    search_parser.add_argument('--lsh-min-sentences', type=int,
+                               help="Answer by approximate MinHash/LSH lookup once the corpus has "
+                                    "at least this many sentences (citations come from the same lookup)")
+    search_parser.add_argument('--retrieval', choices=RETRIEVAL_METHODS, default='keyword',
+                               help="Match the question's words (default) or compare dense sentence vectors")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    questions = list(getattr(args, 'question', []))
+    if getattr(args, 'questions_file', None):
+        with open(args.questions_file, encoding='utf-8') as questions_file:
+            questions.extend(line.strip() for line in questions_file if line.strip())
+    if args.command in ('ask', 'search') and not questions:
+        parser.error(f"{args.command} needs at least one --question or a --questions-file")
+
+    if args.command in ('summarize', 'search') and args.mmap_dir:
+        parser.error(f"{args.command} does not support --mmap-dir")
+
+    documents = find_documents(args.paths, args.recursive)
+    if not documents:
+        parser.error("no PDF or TXT documents found")
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    failures = 0
+    try:
+        if args.command == 'search':
+            records = search(documents, args.workers, cache_dir, questions, args.top_k, args.lsh_min_sentences,
+                             args.retrieval)
+        else:
+            records = run(args.command, documents, args.workers, cache_dir, questions, args.mmap_dir,
+                          getattr(args, 'lsh_min_sentences', None), getattr(args, 'retrieval', 'keyword'))
+        for record in records:
+            failures += record['status'] != 'ok'
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"Processed {len(documents)} documents, {failures} failed.", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
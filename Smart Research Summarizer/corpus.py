@@ -0,0 +1,233 @@
+"""
+Multi-document corpus with one sharded inverted index for cross-document search.
+
+Each added document contributes its sentences to the corpus-wide sentence
+table and its postings to the active shard; once a shard holds
+``shard_max_sentences`` sentences it is sealed and a new one is started,
+so adding a document never touches earlier shards or rebuilds anything.
+BM25 statistics (sentence count, average length, document frequencies)
+are kept corpus-wide, so scores are identical to a single index over
+every sentence.
+
+Corpus implements the DocumentIndex search/span/sentence interface over
+global sentence ids, so it can be passed as ``index`` to
+AIAssistant.answer_question; ``ask`` adds document-and-sentence citations.
+"""
+import heapq
+import math
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from ai_assistant import AIAssistant
+from document_index import DocumentIndex, query_terms
+
+# Sentences per shard before a new shard is started
+SHARD_MAX_SENTENCES = 100_000
+
+# Citations returned by Corpus.ask
+DEFAULT_TOP_K = 5
+
+
+class CorpusDocument:
+    """One document of a corpus: its text and sentence offsets."""
+
+    def __init__(self, doc_id: int, name: str, key: Optional[str], text: str,
+                 offsets: array, first_sentence: int):
+        self.doc_id = doc_id
+        self.name = name
+        self.key = key
+        self.text = text
+        self.offsets = offsets
+        # Global id of the document's first sentence
+        self.first_sentence = first_sentence
+
+    def __len__(self) -> int:
+        return len(self.offsets) // 2
+
+    def span(self, sentence_id: int) -> Tuple[int, int]:
+        """Character offsets (start, end) of a sentence in this document."""
+        return self.offsets[2 * sentence_id], self.offsets[2 * sentence_id + 1]
+
+    def sentence(self, sentence_id: int) -> str:
+        """Text of a sentence of this document."""
+        start, end = self.span(sentence_id)
+        return self.text[start:end]
+
+
+class Corpus:
+    """Incrementally built, sharded BM25 index over many documents."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75,
+                 shard_max_sentences: int = SHARD_MAX_SENTENCES):
+        """
+        Create an empty corpus.
+
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 length normalisation
+            shard_max_sentences: Sentences per shard before a new shard is started
+        """
+        self.k1 = k1
+        self.b = b
+        self.shard_max_sentences = shard_max_sentences
+        self.documents: List[CorpusDocument] = []
+        # term -> list of (global sentence id, term frequency), one dict per shard
+        self.shards: List[Dict[str, List[Tuple[int, int]]]] = []
+        self.sentence_lengths = array('I')
+        # Number of sentences containing each term, across all shards
+        self.document_frequency: Dict[str, int] = {}
+        self.lock = threading.RLock()
+        self._first_sentences: List[int] = []
+        self._keys: Dict[str, CorpusDocument] = {}
+        self._total_length = 0
+        self._shard_sentences = 0
+
+    def __len__(self) -> int:
+        return len(self.sentence_lengths)
+
+    @property
+    def avg_sentence_length(self) -> float:
+        return self._total_length / len(self) if len(self) else 0.0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def add_document(self, name: str, text: str, index: Optional[DocumentIndex] = None,
+                     key: Optional[str] = None) -> CorpusDocument:
+        """
+        Add a document to the active shard.
+
+        Args:
+            name: Display name used in citations
+            text: Cleaned document text
+            index: Index already built for the text; built here if omitted
+            key: Content hash; a document whose key is already present is not added twice
+
+        Returns:
+            The corpus document (the existing one for a duplicate key)
+        """
+        if index is None:
+            index = DocumentIndex(text)
+        with self.lock:
+            if key is not None and key in self._keys:
+                return self._keys[key]
+            if not self.shards or (self._shard_sentences and
+                                   self._shard_sentences + len(index) > self.shard_max_sentences):
+                self.shards.append({})
+                self._shard_sentences = 0
+
+            base = len(self)
+            document = CorpusDocument(len(self.documents), name, key, index.text, index.offsets, base)
+            shard = self.shards[-1]
+            for term, postings in index.postings.items():
+                shard.setdefault(term, []).extend((base + sentence_id, freq) for sentence_id, freq in postings)
+                self.document_frequency[term] = self.document_frequency.get(term, 0) + len(postings)
+            self.sentence_lengths.extend(index.sentence_lengths)
+            self._total_length += sum(index.sentence_lengths)
+            self._shard_sentences += len(index)
+
+            self.documents.append(document)
+            self._first_sentences.append(base)
+            if key is not None:
+                self._keys[key] = document
+            return document
+
+    def locate(self, sentence_id: int) -> Tuple[CorpusDocument, int]:
+        """Map a global sentence id to its document and the sentence id within it."""
+        document = self.documents[bisect_right(self._first_sentences, sentence_id) - 1]
+        return document, sentence_id - document.first_sentence
+
+    def span(self, sentence_id: int) -> Tuple[int, int]:
+        """Character offsets of a sentence within its own document."""
+        document, local_id = self.locate(sentence_id)
+        return document.span(local_id)
+
+    def sentence(self, sentence_id: int) -> str:
+        """Text of a sentence."""
+        document, local_id = self.locate(sentence_id)
+        return document.sentence(local_id)
+
+    def idf(self, term: str) -> float:
+        """Inverse document frequency of a term, treating sentences as documents."""
+        df = self.document_frequency.get(term, 0)
+        n = len(self)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, terms: List[str], top_k: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Score sentences across every shard for a list of query terms.
+
+        Args:
+            terms: Query terms (already tokenized)
+            top_k: Maximum number of results, or None for all candidates
+
+        Returns:
+            List of (global sentence id, score) sorted by descending score
+        """
+        with self.lock:
+            scores: Dict[int, float] = {}
+            avg_length = self.avg_sentence_length or 1.0
+            for term in set(terms):
+                if term not in self.document_frequency:
+                    continue
+                idf = self.idf(term)
+                for shard in self.shards:
+                    for sentence_id, freq in shard.get(term, ()):
+                        length_norm = 1 - self.b + self.b * self.sentence_lengths[sentence_id] / avg_length
+                        weight = idf * freq * (self.k1 + 1) / (freq + self.k1 * length_norm)
+                        scores[sentence_id] = scores.get(sentence_id, 0.0) + weight
+
+        # Ties keep corpus order
+        if top_k is None:
+            return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def top_sentences(self, terms: List[str], top_k: int = 2) -> List[int]:
+        """Return the global ids of the best matching sentences for the query terms."""
+        return [sentence_id for sentence_id, _ in self.search(terms, top_k)]
+
+    def ask(self, question: str, top_k: int = DEFAULT_TOP_K,
+            assistant: Optional[AIAssistant] = None) -> Dict:
+        """
+        Answer a question from the whole corpus.
+
+        Args:
+            question: User's question
+            top_k: Number of citations to return
+            assistant: Assistant used to compose the answer
+
+        Returns:
+            Dictionary with 'answer', 'justification' and 'citations', a list of
+            dicts with document, doc_id, sentence_id (within the document),
+            span, text and score, best first
+        """
+        assistant = assistant or AIAssistant()
+        answer, justification = assistant.answer_question('', question, index=self)
+        # Cite from the lookup the answer was built from (BM25, LSH or dense vectors)
+        citations = []
+        for sentence_id, score in assistant.retrieval_index(self).search(query_terms(question), top_k):
+            document, local_id = self.locate(sentence_id)
+            citations.append({
+                'document': document.name,
+                'doc_id': document.doc_id,
+                'sentence_id': local_id,
+                'span': document.span(local_id),
+                'text': document.sentence(local_id),
+                'score': round(score, 4)
+            })
+        if citations:
+            best = citations[0]
+            justification = f"{justification} Source: {best['document']}, sentence {best['sentence_id'] + 1}."
+        return {'answer': answer, 'justification': justification, 'citations': citations}
+
+    def stats(self) -> Dict[str, int]:
+        """Number of documents, sentences, distinct terms and shards."""
+        with self.lock:
+            return {
+                'documents': len(self.documents),
+                'sentences': len(self),
+                'terms': len(self.document_frequency),
+                'shards': len(self.shards)
+            }
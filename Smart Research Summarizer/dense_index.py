@@ -0,0 +1,232 @@
+"""
+Dense sentence vectors from random indexing, for paraphrase-tolerant lookup.
+
+``DenseIndex`` wraps any sentence index (DocumentIndex, Corpus or
+MappedDocument) and answers ``search``/``top_sentences`` by cosine
+similarity between a question vector and every sentence vector. It needs
+no model or network: vectors are learned from the document itself.
+
+Every content word gets a fixed random vector. A word's context vector
+is the sum of the random vectors of the words next to it wherever it
+occurs, so words used in the same contexts ("reduce" and "lower" before
+"cost") end up close even if they never share a sentence. A sentence vector is the
+IDF-weighted sum of its words' context vectors plus their random vectors,
+which keeps exact word matches ahead of mere relatedness. Words are
+folded like in sentence_lsh, so inflections share a vector.
+
+Sentence vectors are stored int8-quantized with one float32 scale per
+sentence in a contiguous (n, dim) matrix, a quarter of the float32
+size. Questions are scored in blocks of sentences with one matrix
+multiplication per block, for any number of questions at once.
+"""
+import math
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from document_index import tokenize
+from sentence_lsh import shingle_terms
+
+DEFAULT_DIM = 256
+DEFAULT_WINDOW = 2
+DEFAULT_MIN_SIMILARITY = 0.1
+
+# Weight of a word's own random vector next to its context vector
+DEFAULT_LEXICAL_WEIGHT = 1.0
+
+# Rows (tokens or sentences) processed per block, bounding temporary memory
+_BLOCK = 1 << 10
+
+
+def _segment_sums(out: np.ndarray, groups: np.ndarray, values: np.ndarray, rows: np.ndarray,
+                  weights: Optional[np.ndarray] = None) -> None:
+    """
+    Add weights[i] * values[rows[i]] to out[groups[i]] for every i, with groups sorted.
+
+    Blocks of rows are reduced per run of equal groups; a run split across two
+    blocks is simply added twice.
+    """
+    for start in range(0, len(groups), _BLOCK):
+        block_groups = groups[start:start + _BLOCK]
+        firsts = np.concatenate(([0], np.flatnonzero(np.diff(block_groups)) + 1))
+        block = values[rows[start:start + _BLOCK]]
+        if weights is not None:
+            block *= weights[start:start + _BLOCK, None]
+        out[block_groups[firsts]] += np.add.reduceat(block, firsts, axis=0)
+
+
+class DenseIndex:
+    """
+    Semantic sentence lookup for a sentence index.
+
+    The vectors are built once for the sentences indexed so far; call
+    ``update`` after the wrapped index grows.
+    """
+
+    def __init__(self, index, dim: int = DEFAULT_DIM, window: int = DEFAULT_WINDOW,
+                 lexical_weight: float = DEFAULT_LEXICAL_WEIGHT, min_similarity: float = DEFAULT_MIN_SIMILARITY,
+                 seed: int = 1):
+        """
+        Embed the sentences of an index.
+
+        Args:
+            index: Sentence index providing ``__len__``, ``sentence`` and ``span``
+            dim: Vector dimensions; more dimensions keep unrelated words further apart
+            window: Content words on either side counted as a word's context
+            lexical_weight: Weight of exact word matches relative to related words
+            min_similarity: Cosine similarity below which sentences are not returned
+            seed: Seed for the random word vectors
+        """
+        if dim < 1:
+            raise ValueError("dim must be positive")
+        self.index = index
+        self.dim = dim
+        self.window = window
+        self.lexical_weight = lexical_weight
+        self.min_similarity = min_similarity
+        self.seed = seed
+
+        self.vocabulary = {}
+        self.word_vectors = np.empty((0, dim), dtype=np.float32)
+        self.vectors = np.empty((0, dim), dtype=np.int8)
+        self.scales = np.empty(0, dtype=np.float32)
+        self.update()
+
+    def __len__(self) -> int:
+        return len(self.scales)
+
+    def nbytes(self) -> int:
+        """Memory held by the sentence and word vectors."""
+        return self.vectors.nbytes + self.scales.nbytes + self.word_vectors.nbytes
+
+    def span(self, sentence_id: int) -> Tuple[int, int]:
+        return self.index.span(sentence_id)
+
+    def sentence(self, sentence_id: int) -> str:
+        return self.index.sentence(sentence_id)
+
+    def update(self) -> None:
+        """Re-embed the document if the wrapped index has grown since the last build."""
+        n_sentences = len(self.index)
+        if n_sentences == len(self):
+            return
+
+        # Token ids in document order and the sentence of each token
+        vocabulary = {}
+        token_ids = []
+        lengths = np.zeros(n_sentences, dtype=np.int64)
+        for sentence_id in range(n_sentences):
+            terms = shingle_terms(tokenize(self.index.sentence(sentence_id)))
+            token_ids.extend(vocabulary.setdefault(term, len(vocabulary)) for term in terms)
+            lengths[sentence_id] = len(terms)
+        token_ids = np.array(token_ids, dtype=np.int64)
+        token_sentences = np.repeat(np.arange(n_sentences), lengths)
+
+        # Document frequencies over distinct (sentence, word) pairs
+        pairs = np.unique(token_sentences * max(len(vocabulary), 1) + token_ids)
+        df = np.bincount(pairs % max(len(vocabulary), 1), minlength=len(vocabulary))
+        idf = (np.log((n_sentences + 1) / (df + 1)) + 1).astype(np.float32)
+
+        rng = np.random.default_rng(self.seed)
+        random_vectors = rng.standard_normal((len(vocabulary), self.dim), dtype=np.float32)
+        random_vectors /= math.sqrt(self.dim)
+
+        # Context vectors: the IDF-weighted random vectors of the words within the window
+        sources, targets = [], []
+        for distance in range(1, self.window + 1):
+            same_sentence = np.flatnonzero(token_sentences[distance:] == token_sentences[:-distance])
+            sources += [same_sentence, same_sentence + distance]
+            targets += [same_sentence + distance, same_sentence]
+        sources = np.concatenate(sources) if sources else np.empty(0, dtype=np.int64)
+        targets = np.concatenate(targets) if targets else np.empty(0, dtype=np.int64)
+        order = np.argsort(token_ids[targets], kind='stable')
+        sources, targets = token_ids[sources[order]], token_ids[targets[order]]
+        context = np.zeros((len(vocabulary), self.dim), dtype=np.float32)
+        _segment_sums(context, targets, random_vectors, sources, idf[sources])
+        context /= np.maximum(np.linalg.norm(context, axis=1, keepdims=True), 1e-12)
+
+        word_vectors = (context + self.lexical_weight * random_vectors) * idf[:, None]
+        sentence_vectors = np.zeros((n_sentences, self.dim), dtype=np.float32)
+        _segment_sums(sentence_vectors, token_sentences, word_vectors, token_ids)
+
+        self.vocabulary = vocabulary
+        self.word_vectors = word_vectors
+        self.vectors, self.scales = self._quantize(sentence_vectors)
+
+    def embed(self, queries: Sequence[Iterable[str]]) -> np.ndarray:
+        """
+        Unit vectors for lists of query terms, one row per query.
+
+        Terms not found in the document are ignored; a query with none left
+        gets a zero vector.
+        """
+        matrix = np.zeros((len(queries), self.dim), dtype=np.float32)
+        for row, terms in enumerate(queries):
+            ids = [self.vocabulary[term] for term in shingle_terms(terms) if term in self.vocabulary]
+            if ids:
+                matrix[row] = self.word_vectors[ids].sum(axis=0)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        return matrix
+
+    def search_many(self, queries: Sequence[Iterable[str]],
+                    top_k: Optional[int] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Score every sentence against several queries at once.
+
+        Args:
+            queries: One list of query terms per query, e.g. from query_terms()
+            top_k: Maximum number of results per query, or None for every
+                sentence above ``min_similarity``
+
+        Returns:
+            One list of (sentence id, cosine similarity) per query, sorted by
+            descending similarity, ties in document order
+        """
+        if not len(queries):
+            return []
+        query_vectors = self.embed(queries)
+        scores = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), _BLOCK):
+            block = self.vectors[start:start + _BLOCK].astype(np.float32)
+            block_scores = query_vectors @ block.T
+            block_scores *= self.scales[start:start + _BLOCK]
+            scores[:, start:start + _BLOCK] = block_scores
+
+        results = []
+        for query_scores in scores:
+            candidates = np.flatnonzero(query_scores >= max(self.min_similarity, 1e-6))
+            if top_k is not None and len(candidates) > top_k:
+                # Keep every sentence tied with the k-th best so ties resolve in document order
+                kth = np.partition(query_scores[candidates], len(candidates) - top_k)[len(candidates) - top_k]
+                candidates = candidates[query_scores[candidates] >= kth]
+            order = np.lexsort((candidates, -query_scores[candidates]))
+            if top_k is not None:
+                order = order[:top_k]
+            results.append([(int(candidates[i]), float(query_scores[candidates[i]])) for i in order])
+        return results
+
+    def search(self, terms: Iterable[str], top_k: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Score the sentences for a list of query terms.
+
+        Args:
+            terms: Query terms, e.g. from query_terms(); folded like the sentences
+            top_k: Maximum number of results, or None for every sentence above ``min_similarity``
+
+        Returns:
+            List of (sentence id, cosine similarity) sorted by descending
+            similarity, ties in document order
+        """
+        return self.search_many([list(terms)], top_k)[0]
+
+    def top_sentences(self, terms: Iterable[str], top_k: int = 2) -> List[int]:
+        """Return the ids of the best matching sentences for the query terms."""
+        return [sentence_id for sentence_id, _ in self.search(terms, top_k)]
+
+    @staticmethod
+    def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Unit-normalize rows and store them as int8 with one scale per row."""
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        scales = np.abs(vectors).max(axis=1) / 127
+        quantized = np.rint(vectors / np.maximum(scales, 1e-12)[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
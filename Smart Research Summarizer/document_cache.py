@@ -0,0 +1,291 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import metrics
+
+DEFAULT_CACHE_DIR = os.environ.get('SMART_RESEARCH_CACHE_DIR', '.cache')
+DEFAULT_MAX_BYTES = int(os.environ.get('SMART_RESEARCH_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+DEFAULT_PAGE_MAX_BYTES = int(os.environ.get('SMART_RESEARCH_PAGE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+DEFAULT_ANSWER_MAX_BYTES = int(os.environ.get('SMART_RESEARCH_ANSWER_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+DEFAULT_CHALLENGE_MAX_BYTES = int(os.environ.get('SMART_RESEARCH_CHALLENGE_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
+# SQLite limits the number of bound parameters per statement
+_MAX_VARIABLES = 500
+
+# Bump whenever the structure of pickled cache entries changes (processed
+# documents are stored as versioned snapshots, see document_snapshot)
+FORMAT_VERSION = 2
+
+
+def content_hash(data: bytes) -> str:
+    """Return the SHA-256 hex digest of uploaded file bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: str, block_size: int = 1024 * 1024) -> str:
+    """Return content_hash of a file's bytes, reading it in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as local_file:
+        for block in iter(lambda: local_file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def page_hash(content: bytes, kind: str) -> str:
+    """Return the SHA-256 hex digest of one page's raw content, namespaced by document kind."""
+    return hashlib.sha256(kind.encode('ascii') + b':' + content).hexdigest()
+
+
+def answer_key(document_key: str, question: str) -> str:
+    """Return the SHA-256 hex digest of a question about a document, ignoring case and spacing."""
+    normalized = ' '.join(question.lower().split())
+    return hashlib.sha256(f'{document_key}:{normalized}'.encode('utf-8')).hexdigest()
+
+
+class DocumentCache:
+    """
+    Disk-backed cache of processed documents keyed by content hash.
+
+    Each entry holds the analysis results for one upload (cleaned text,
+    summary, sentence index and key concepts) as a document snapshot in a
+    SQLite table; the challenge question bank is kept in ChallengeCache. The total
+    stored size is kept under ``max_bytes`` by evicting the least recently
+    used entries.
+    """
+
+    # SQLite table holding the entries, and the cache label used in metrics
+    table = 'documents'
+    label = 'disk'
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            cache_dir: Directory holding the SQLite file
+            max_bytes: Upper bound on the total compressed payload size
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'documents.sqlite3')
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                'key TEXT PRIMARY KEY, payload BLOB NOT NULL, '
+                'size INTEGER NOT NULL, last_access REAL NOT NULL)'
+            )
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {self.table}_lru ON {self.table} (last_access)')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A short-lived connection per call keeps the cache usable from any
+        # Streamlit script thread
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached document and mark it as recently used.
+
+        Args:
+            key: Content hash of the uploaded file
+
+        Returns:
+            The cached entry, or None on a miss or unreadable entry
+        """
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up several entries at once and mark them as recently used.
+
+        Args:
+            keys: Content hashes to look up
+
+        Returns:
+            Dictionary of the keys found, mapped to their entries
+        """
+        keys = list(dict.fromkeys(keys))
+        rows = {}
+        with self._connect() as conn:
+            for first in range(0, len(keys), _MAX_VARIABLES):
+                chunk = keys[first:first + _MAX_VARIABLES]
+                placeholders = ', '.join('?' * len(chunk))
+                rows.update(conn.execute(
+                    f'SELECT key, payload FROM {self.table} WHERE key IN ({placeholders})', chunk
+                ).fetchall())
+                conn.execute(f'UPDATE {self.table} SET last_access = ? WHERE key IN ({placeholders})',
+                             (time.time(), *chunk))
+
+        entries = {}
+        for key in keys:
+            entry = self._load(rows[key]) if key in rows else None
+            if entry is None:
+                metrics.count('cache_requests_total', cache=self.label, result='miss')
+                if key in rows:
+                    # Entry written by an incompatible version; drop it and recompute
+                    self.delete(key)
+            else:
+                metrics.count('cache_requests_total', cache=self.label, result='hit')
+                entries[key] = entry
+        return entries
+
+    @staticmethod
+    def _dump(entry: Dict[str, Any]) -> bytes:
+        # Imported on first use so importing the cache does not load numpy
+        import document_snapshot
+
+        return document_snapshot.dumps(entry)
+
+    @staticmethod
+    def _load(payload: bytes) -> Optional[Dict[str, Any]]:
+        import document_snapshot
+
+        try:
+            return document_snapshot.loads(payload)
+        except Exception:
+            return None
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """
+        Store a processed document, evicting old entries if over budget.
+
+        Args:
+            key: Content hash of the uploaded file
+            entry: Analysis results to cache
+        """
+        self.put_many({key: entry})
+
+    def put_many(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Store several entries in one transaction, evicting old entries if over budget.
+
+        Args:
+            entries: Content hashes mapped to the entries to cache
+        """
+        rows = []
+        now = time.time()
+        for key, entry in entries.items():
+            payload = self._dump(entry)
+            if len(payload) <= self.max_bytes:
+                rows.append((key, payload, len(payload), now))
+        if not rows:
+            return
+
+        with self._connect() as conn:
+            conn.executemany(
+                f'INSERT OR REPLACE INTO {self.table} (key, payload, size, last_access) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            self._evict(conn)
+
+    def delete(self, key: str) -> None:
+        """Remove a single entry."""
+        with self._connect() as conn:
+            conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._connect() as conn:
+            conn.execute(f'DELETE FROM {self.table}')
+
+    def total_size(self) -> int:
+        """Total compressed size of all entries in bytes."""
+        with self._connect() as conn:
+            return conn.execute(f'SELECT COALESCE(SUM(size), 0) FROM {self.table}').fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least recently used entries until the size budget is met."""
+        total = conn.execute(f'SELECT COALESCE(SUM(size), 0) FROM {self.table}').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in conn.execute(f'SELECT key, size FROM {self.table} ORDER BY last_access').fetchall():
+            conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+def _dump_pickle(entry: Any) -> bytes:
+    """Serialize a cache entry as a versioned, zlib-compressed pickle."""
+    return zlib.compress(pickle.dumps((FORMAT_VERSION, entry), protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _load_pickle(payload: bytes) -> Optional[Any]:
+    """Inverse of _dump_pickle; None for unreadable or outdated payloads."""
+    try:
+        version, entry = pickle.loads(zlib.decompress(payload))
+        if version == FORMAT_VERSION:
+            return entry
+    except Exception:
+        pass
+    return None
+
+
+class PageCache(DocumentCache):
+    """
+    Disk-backed cache of single pages keyed by the hash of their raw content.
+
+    Each entry holds a page's cleaned text and the token counts of the
+    sentences that lie wholly inside it, so a revised upload only extracts
+    and tokenizes the pages that changed. Shares the SQLite file of
+    DocumentCache with its own table and size budget.
+    """
+
+    table = 'pages'
+    label = 'pages'
+    _dump = staticmethod(_dump_pickle)
+    _load = staticmethod(_load_pickle)
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_PAGE_MAX_BYTES):
+        super().__init__(cache_dir, max_bytes)
+
+
+class AnswerCache(DocumentCache):
+    """
+    Disk-backed cache of answered questions keyed by ``answer_key``.
+
+    Each entry holds the answer and justification given for one question
+    about one processed document, so asking it again (in any session) skips
+    retrieval. Shares the SQLite file of DocumentCache with its own table
+    and size budget.
+    """
+
+    table = 'answers'
+    label = 'answers'
+    _dump = staticmethod(_dump_pickle)
+    _load = staticmethod(_load_pickle)
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_ANSWER_MAX_BYTES):
+        super().__init__(cache_dir, max_bytes)
+
+
+class ChallengeCache(DocumentCache):
+    """
+    Disk-backed cache of prepared Challenge Me question banks keyed by document content hash.
+
+    Each entry holds the questions and expected answer content prepared
+    for one processed document. Keeping them apart from the document entry
+    means preparing a challenge never rewrites the document snapshot.
+    Shares the SQLite file of DocumentCache with its own table and size
+    budget.
+    """
+
+    table = 'challenges'
+    label = 'challenges'
+    _dump = staticmethod(_dump_pickle)
+    _load = staticmethod(_load_pickle)
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CHALLENGE_MAX_BYTES):
+        super().__init__(cache_dir, max_bytes)
@@ -0,0 +1,432 @@
+import math
+import re
+import sys
+from array import array
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, MutableMapping, Optional, Tuple
+
+# Words that carry no content in a question ("what is ...", "how does ...")
+QUESTION_WORDS = {'what', 'where', 'when', 'why', 'how', 'which', 'who'}
+
+# Abbreviations whose trailing period does not end a sentence
+ABBREVIATIONS = {
+    'al.', 'approx.', 'cf.', 'ch.', 'dr.', 'e.g.', 'eq.', 'eqs.', 'et.', 'etc.', 'fig.', 'figs.',
+    'i.e.', 'inc.', 'jr.', 'ltd.', 'mr.', 'mrs.', 'ms.', 'no.', 'nos.', 'pp.', 'prof.', 'ref.',
+    'refs.', 'sec.', 'sr.', 'st.', 'tab.', 'viz.', 'vol.', 'vs.'
+}
+
+# Lines up to this long with no terminal punctuation are treated as headings
+HEADING_MAX_CHARS = 80
+
+# Terminal punctuation (with closing quotes/brackets) before whitespace, or a line break
+_CANDIDATE = re.compile(r'[.!?]+[\'"’”)\]]*(?=\s|$)|\n')
+_NON_SPACE = re.compile(r'\S')
+_INITIALS = re.compile(r'(?:[a-z]\.)+')
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Approximate size of one (sentence id, tf) posting: the tuple plus the sentence id int
+POSTING_BYTES = sys.getsizeof((0, 0)) + sys.getsizeof(1 << 20)
+
+
+def _is_period_boundary(text: str, start: int, match) -> bool:
+    """Decide whether a run of terminal punctuation ends the sentence."""
+    punct = match.group()
+    if '!' in punct or '?' in punct:
+        return True
+
+    # "approx. three", "et al. showed": a lowercase continuation is not a new sentence
+    following = _NON_SPACE.search(text, match.end())
+    if following is not None and following.group().islower():
+        return False
+
+    word_start = max(start - 1, text.rfind(' ', start, match.start()), text.rfind('\n', start, match.start())) + 1
+    word = text[word_start:match.start() + 1].lower().lstrip('(["\'‘“')
+    return word not in ABBREVIATIONS and not _INITIALS.fullmatch(word)
+
+
+def _is_line_boundary(text: str, start: int, at_line_start: bool, newline: int) -> bool:
+    """Decide whether a line break ends the sentence (paragraph break or heading)."""
+    following = _NON_SPACE.search(text, newline + 1)
+    if following is None:
+        # Nothing after it yet; the trailing sentence is closed by the caller
+        return False
+    if '\n' in text[newline + 1:following.start()]:
+        return True
+
+    line_break = text.rfind('\n', start, newline)
+    if line_break == -1 and not at_line_start:
+        # The sentence started part-way through this line
+        return False
+    line = text[max(line_break + 1, start):newline].strip()
+    return (0 < len(line) <= HEADING_MAX_CHARS
+            and line[-1] not in '.!?,;:-'
+            and (line[0].isupper() or line[0].isdigit())
+            and (following.group().isupper() or following.group().isdigit()))
+
+
+def iter_sentence_spans(text: str, at_line_start: bool = True) -> Iterator[Tuple[int, int, bool]]:
+    """
+    Segment text into sentences.
+
+    Sentences end at '.', '!' or '?' (plus closing quotes or brackets)
+    followed by whitespace, except after known abbreviations, initials, or
+    when the next word is lowercase. Paragraph breaks and heading-like
+    lines also end a sentence. Every decision looks only at the text
+    before the boundary and the first non-space character after it, so
+    segmenting a document in chunks gives the same spans as segmenting it
+    whole, as long as the last span of each chunk is held back.
+
+    Args:
+        text: Text to segment
+        at_line_start: Whether ``text`` begins at the start of a line
+
+    Yields:
+        Tuples of (start, end, starts_line) with whitespace trimmed from both ends
+    """
+    first = _NON_SPACE.search(text)
+    if first is None:
+        return
+    start = first.start()
+    at_line_start = at_line_start or '\n' in text[:start]
+
+    for match in _CANDIDATE.finditer(text, start):
+        if match.start() < start:
+            continue
+        if match.group() == '\n':
+            if not _is_line_boundary(text, start, at_line_start, match.start()):
+                continue
+            end = match.start()
+        else:
+            if not _is_period_boundary(text, start, match):
+                continue
+            end = match.end()
+
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        following = _NON_SPACE.search(text, end)
+        yield start, end, at_line_start
+        if following is None:
+            return
+        at_line_start = '\n' in text[end:following.start()]
+        start = following.start()
+
+    end = len(text)
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    yield start, end, at_line_start
+
+
+def segment_sentences(text: str) -> array:
+    """
+    Segment text into sentence spans.
+
+    Args:
+        text: Document text
+
+    Returns:
+        Flat array of [start0, end0, start1, end1, ...] character offsets
+    """
+    offsets = array('Q')
+    for start, end, _ in iter_sentence_spans(text):
+        offsets.append(start)
+        offsets.append(end)
+    return offsets
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into alphanumeric word tokens."""
+    return _TOKEN.findall(text.lower())
+
+
+def query_terms(question: str, extra_stop_words: Iterable[str] = ()) -> List[str]:
+    """
+    Extract the content terms of a question.
+
+    Args:
+        question: Question text
+        extra_stop_words: Additional words to ignore
+
+    Returns:
+        Unique terms longer than three characters, in question order
+    """
+    stop_words = QUESTION_WORDS.union(extra_stop_words)
+    terms = []
+    for term in tokenize(question):
+        if len(term) > 3 and term not in stop_words and term not in terms:
+            terms.append(term)
+    return terms
+
+
+class DocumentIndex:
+    """
+    Sentence segmentation and inverted index with BM25 scoring, built once per document.
+
+    Sentences are stored as a flat array of (start, end) character offsets
+    into the document text, so callers can slice them on demand and cite
+    exact spans. The index can also be grown incrementally with ``append``
+    as a document streams in; the last sentence of each chunk is held back
+    until more text arrives or ``flush`` is called. Appending a chunk can
+    also produce a segment record of the sentences and postings it added,
+    which ``replay`` applies later (e.g. for the same page in a revised
+    upload) without segmenting or tokenizing the chunk again.
+    """
+
+    def __init__(self, text: str = '', k1: float = 1.5, b: float = 0.75):
+        """
+        Build the index for a document.
+
+        Args:
+            text: Cleaned document text; may be empty for a streamed document
+            k1: BM25 term frequency saturation
+            b: BM25 length normalisation
+        """
+        self.k1 = k1
+        self.b = b
+        # Flat [start0, end0, start1, end1, ...] sentence offsets
+        self.offsets = array('Q')
+        self.sentence_lengths = array('I')
+        # term -> list of (sentence id, term frequency), sentence ids ascending
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._total_length = 0
+        self._chunks: List[str] = []
+        self._pending = ''
+        self._pending_start = 0
+        self._pending_line_start = True
+
+        if text:
+            self.append(text)
+            self.flush()
+
+    @classmethod
+    def restore(cls, text: str, offsets: array, sentence_lengths: array,
+                postings: MutableMapping[str, List[Tuple[int, int]]], k1: float = 1.5,
+                b: float = 0.75) -> 'DocumentIndex':
+        """
+        Recreate a flushed index from its parts (e.g. read from a snapshot) without tokenizing the text.
+
+        Args:
+            text: Indexed text
+            offsets: Flat [start0, end0, ...] sentence offsets
+            sentence_lengths: Tokens per sentence
+            postings: term -> list of (sentence id, term frequency), a dict or
+                a mapping that behaves like one
+            k1: BM25 term frequency saturation
+            b: BM25 length normalisation
+        """
+        index = cls(k1=k1, b=b)
+        index.offsets = offsets
+        index.sentence_lengths = sentence_lengths
+        index.postings = postings
+        index._total_length = sum(sentence_lengths)
+        index._chunks = [text] if text else []
+        index._pending_start = len(text)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.sentence_lengths)
+
+    @property
+    def text(self) -> str:
+        """The indexed text (everything appended so far)."""
+        if len(self._chunks) > 1:
+            self._chunks = [''.join(self._chunks)]
+        return self._chunks[0] if self._chunks else ''
+
+    @property
+    def avg_sentence_length(self) -> float:
+        return self._total_length / len(self) if len(self) else 0.0
+
+    def nbytes(self) -> int:
+        """Approximate memory footprint of the index, including its text."""
+        size = sys.getsizeof(self.text)
+        size += self.offsets.itemsize * len(self.offsets)
+        size += self.sentence_lengths.itemsize * len(self.sentence_lengths)
+        if hasattr(self.postings, 'nbytes'):
+            # Postings restored from a snapshot, mostly still packed (see document_snapshot)
+            return size + self.postings.nbytes()
+        size += sys.getsizeof(self.postings)
+        for term, postings in self.postings.items():
+            size += sys.getsizeof(term) + sys.getsizeof(postings) + POSTING_BYTES * len(postings)
+        return size
+
+    def span(self, sentence_id: int) -> Tuple[int, int]:
+        """Character offsets (start, end) of a sentence in the text."""
+        return self.offsets[2 * sentence_id], self.offsets[2 * sentence_id + 1]
+
+    def sentence(self, sentence_id: int) -> str:
+        """Text of a sentence."""
+        start, end = self.span(sentence_id)
+        return self.text[start:end]
+
+    def sentences(self) -> Iterator[str]:
+        """Iterate over the text of every sentence in order."""
+        text = self.text
+        offsets = self.offsets
+        for i in range(0, len(offsets), 2):
+            yield text[offsets[i]:offsets[i + 1]]
+
+    def append(self, text: str, record: bool = False) -> Optional[Dict]:
+        """
+        Index the complete sentences in a new chunk of text.
+
+        Args:
+            text: Next chunk of the document, continuing the previous one
+            record: Whether to return a segment record for ``replay``
+
+        Returns:
+            The segment record if ``record`` is set, otherwise None. It holds
+            the held-back text and line-start flag the chunk was indexed
+            after, the chunk length, sentence offsets relative to the start of
+            the held-back text, sentence lengths, per-term flat arrays of
+            (relative sentence id, tf), and where the new held-back text starts.
+        """
+        segment = {
+            'pending': self._pending,
+            'line_start': self._pending_line_start,
+            'length': len(text),
+            'offsets': array('Q'),
+            'lengths': array('I'),
+            'postings': {},
+            'held_start': 0,
+            'held_line_start': self._pending_line_start
+        } if record else None
+
+        self._chunks.append(text)
+        buffer = self._pending + text
+        spans = list(iter_sentence_spans(buffer, self._pending_line_start))
+        if not spans:
+            self._pending = buffer
+            return segment
+
+        # The last sentence may continue in the next chunk
+        held_start, _, held_line_start = spans.pop()
+        self._add_spans(buffer, self._pending_start, spans, segment)
+        self._pending = buffer[held_start:]
+        self._pending_start += held_start
+        self._pending_line_start = held_line_start
+        if segment is not None:
+            segment['held_start'] = held_start
+            segment['held_line_start'] = held_line_start
+        return segment
+
+    def replay(self, text: str, segment: Dict) -> bool:
+        """
+        Append a chunk using a segment record made by ``append``.
+
+        The record only applies when the chunk follows the same held-back
+        text as when it was recorded; sentence boundaries then fall in the
+        same places, so the recorded sentences and postings are added
+        directly.
+
+        Args:
+            text: Next chunk of the document, identical to the recorded chunk
+            segment: Segment record returned by ``append(text, record=True)``
+
+        Returns:
+            Whether the record applied; if not, nothing was appended
+        """
+        if (len(text) != segment['length'] or self._pending != segment['pending']
+                or self._pending_line_start != segment['line_start']):
+            return False
+
+        first_sentence = len(self)
+        base = self._pending_start
+        self._chunks.append(text)
+        self.offsets.extend([base + offset for offset in segment['offsets']])
+        self.sentence_lengths.extend(segment['lengths'])
+        self._total_length += sum(segment['lengths'])
+        for term, flat in segment['postings'].items():
+            sentence_ids = map(first_sentence.__add__, flat[0::2])
+            self.postings.setdefault(term, []).extend(zip(sentence_ids, flat[1::2]))
+
+        held_start = segment['held_start']
+        self._pending = (self._pending + text)[held_start:]
+        self._pending_start += held_start
+        self._pending_line_start = segment['held_line_start']
+        return True
+
+    def flush(self) -> None:
+        """Index the held-back trailing sentence and trim trailing whitespace from the text."""
+        spans = list(iter_sentence_spans(self._pending, self._pending_line_start))
+        self._add_spans(self._pending, self._pending_start, spans)
+        self._pending_start += len(self._pending)
+        self._pending = ''
+        if self._chunks:
+            self._chunks = [self.text.rstrip()]
+
+    def _add_spans(self, buffer: str, base: int, spans: List[Tuple[int, int, bool]],
+                   segment: Optional[Dict] = None) -> None:
+        first_sentence = len(self)
+        terms = set()
+        for start, end, _ in spans:
+            sentence_id = len(self)
+            tokens = tokenize(buffer[start:end])
+            self.offsets.append(base + start)
+            self.offsets.append(base + end)
+            self.sentence_lengths.append(len(tokens))
+            self._total_length += len(tokens)
+
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, freq in counts.items():
+                self.postings.setdefault(term, []).append((sentence_id, freq))
+            if segment is not None:
+                terms.update(counts)
+
+        if segment is not None:
+            self._record_sentences(segment, base, first_sentence, terms)
+
+    def _record_sentences(self, segment: Dict, base: int, first_sentence: int, terms: set) -> None:
+        """Copy the sentences from first_sentence on, and their postings, into a segment record."""
+        segment['offsets'] = array('Q', [offset - base for offset in self.offsets[2 * first_sentence:]])
+        segment['lengths'] = self.sentence_lengths[first_sentence:]
+        for term in terms:
+            # Posting lists are in sentence order, so the new postings are a tail
+            postings = self.postings[term]
+            tail = len(postings)
+            while tail and postings[tail - 1][0] >= first_sentence:
+                tail -= 1
+            flat = array('I', chain.from_iterable(postings[tail:]))
+            flat[0::2] = array('I', [sentence_id - first_sentence for sentence_id in flat[0::2]])
+            segment['postings'][term] = flat
+
+    def idf(self, term: str) -> float:
+        """Inverse document frequency of a term, treating sentences as documents."""
+        df = len(self.postings.get(term, ()))
+        n = len(self)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, terms: List[str], top_k: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Score the candidate sentences for a list of query terms.
+
+        Only sentences appearing in at least one posting list are visited.
+
+        Args:
+            terms: Query terms (already tokenized)
+            top_k: Maximum number of results, or None for all candidates
+
+        Returns:
+            List of (sentence id, score) sorted by descending score
+        """
+        scores: Dict[int, float] = {}
+        avg_length = self.avg_sentence_length or 1.0
+
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for sentence_id, freq in postings:
+                length_norm = 1 - self.b + self.b * self.sentence_lengths[sentence_id] / avg_length
+                weight = idf * freq * (self.k1 + 1) / (freq + self.k1 * length_norm)
+                scores[sentence_id] = scores.get(sentence_id, 0.0) + weight
+
+        # Ties keep document order
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:top_k] if top_k is not None else ranked
+
+    def top_sentences(self, terms: List[str], top_k: int = 2) -> List[int]:
+        """Return the ids of the best matching sentences for the query terms."""
+        return [sentence_id for sentence_id, _ in self.search(terms, top_k)]
@@ -0,0 +1,168 @@
+import io
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import metrics
+from ai_assistant import AIAssistant
+from document_cache import PageCache
+from document_index import DocumentIndex
+from document_processor import DocumentProcessor
+
+# Minimum time between summary refreshes while a document streams in
+SUMMARY_REFRESH_SECONDS = 1.0
+
+# Minimum growth of the ingested text between summary refreshes; each
+# refresh scores every sentence so far, so geometric growth keeps the
+# total refresh work linear in the document size
+SUMMARY_REFRESH_GROWTH = 2.0
+
+
+class DocumentStream:
+    """
+    A document that is being extracted and indexed in the background.
+
+    Pages flow through page -> cleaned lines -> sentences -> index updates,
+    so only the pages currently being extracted are held in raw form. The
+    partial text, index and summary can be read while ingestion continues;
+    readers must hold ``lock`` (see ``snapshot``) because the index is
+    mutated by the ingest thread.
+    """
+
+    def __init__(self, name: str, file_type: str):
+        self.name = name
+        self.file_type = file_type
+        self.total_pages = 0
+        self.pages_processed = 0
+        self.summary = ''
+        self.analysis: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.done = False
+        self.index = DocumentIndex()
+        self.lock = threading.Lock()
+        self._text: Optional[str] = None
+        self._length = 0
+
+    def text(self) -> str:
+        """Text ingested so far (the final document text once done)."""
+        if self._text is None:
+            return self.index.text.strip()
+        return self._text
+
+    @property
+    def length(self) -> int:
+        """Characters of cleaned text ingested so far."""
+        return self._length
+
+    @contextmanager
+    def snapshot(self) -> Iterator[Tuple[str, DocumentIndex]]:
+        """Hold the stream still and yield its current text and index."""
+        with self.lock:
+            yield self.text(), self.index
+
+    def add_segment(self, segment: str, record: Optional[Dict] = None,
+                    recording: bool = False) -> Optional[Dict]:
+        """
+        Append one cleaned page or block and index its complete sentences.
+        
+        Args:
+            segment: Next page or block of cleaned text
+            record: Segment record from an earlier upload of the same page, replayed if it still applies
+            recording: Whether to record the segment when it is indexed from scratch
+            
+        Returns:
+            The new segment record, if one was made
+        """
+        with self.lock:
+            if not self._length:
+                # Sentence offsets are relative to the stripped document text
+                segment = segment.lstrip()
+            self.pages_processed += 1
+            if not segment:
+                return None
+            self._length += len(segment)
+            if record is not None and self.index.replay(segment, record):
+                return None
+            return self.index.append(segment, record=recording)
+    
+    def finish(self, text: str, analysis: Dict) -> None:
+        """Publish the final text and analysis."""
+        with self.lock:
+            self.index = analysis['index']
+            self._text = text
+            self.summary = analysis['summary']
+            self.analysis = analysis
+            self.pages_processed = self.total_pages = max(self.total_pages, self.pages_processed)
+            self.done = True
+
+
+def ingest(stream: DocumentStream, data: bytes,
+           processor: Optional[DocumentProcessor] = None,
+           assistant: Optional[AIAssistant] = None,
+           page_cache: Optional[PageCache] = None) -> None:
+    """
+    Run the streaming pipeline for one upload, updating ``stream`` as pages complete.
+
+    With a page cache, pages (or TXT blocks) seen in an earlier upload, such
+    as a previous revision of the same report, are not extracted again and
+    their cached sentences and postings are replayed into the index; only
+    changed pages (and a page following a changed one) are segmented and
+    tokenized, and their records are cached afterwards. The summary is then
+    scored from the updated index postings.
+
+    Args:
+        stream: Stream to populate
+        data: Uploaded file bytes
+        processor: Document processor to extract pages with
+        assistant: Assistant used for the summary and key concepts
+        page_cache: Cache of earlier pages to reuse and extend
+    """
+    processor = processor or DocumentProcessor()
+    assistant = assistant or AIAssistant()
+    try:
+        with metrics.stage('ingest'):
+            upload = io.BytesIO(data)
+            upload.type = stream.file_type
+            # Validation counts, taken while the pages are cleaned
+            stats: Dict = {}
+            if page_cache is not None:
+                total_pages, pages = processor.iter_page_segments(upload, page_cache, stats)
+            else:
+                total_pages, segments = processor.iter_segments(upload, stats)
+                pages = ((None, segment, None) for segment in segments)
+            stream.total_pages = total_pages
+
+            # Page cache entries to write for pages that were indexed from scratch
+            new_pages: Dict[str, Dict] = {}
+            last_refresh = time.monotonic()
+            refreshed_length = 0
+            for key, segment, entry in pages:
+                record = stream.add_segment(segment, entry['record'] if entry else None,
+                                            recording=key is not None)
+                if key is not None and (entry is None or record is not None):
+                    new_pages[key] = {'text': segment, 'record': record}
+                # Keep a summary of the partial document available, scored from the streamed index
+                if (time.monotonic() - last_refresh >= SUMMARY_REFRESH_SECONDS
+                        and stream.length >= SUMMARY_REFRESH_GROWTH * refreshed_length):
+                    with stream.lock:
+                        stream.summary = assistant.generate_summary(stream.text(), index=stream.index)
+                        refreshed_length = stream.length
+                    last_refresh = time.monotonic()
+
+            with stream.lock:
+                stream.index.flush()
+                raw_text = stream.index.text
+            text = processor.finalize_text(stream.file_type, raw_text, stats)
+            # Keep the streamed index unless finalizing replaced the text
+            index = stream.index if text == raw_text else None
+            analysis = assistant.analyze_document(text, index=index)
+            if new_pages and index is not None:
+                page_cache.put_many(new_pages)
+        metrics.count('documents_total', type=stream.file_type)
+        metrics.count('chars_total', len(text))
+        stream.finish(text, analysis)
+    except Exception as e:
+        stream.error = f"Error extracting text: {str(e)}"
+        stream.done = True
+
@@ -1,75 +1,449 @@
-import streamlit as st
+import codecs
 import io
-from typing import Optional
+import multiprocessing
+import os
+import string
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import re
-import PyPDF2
+import metrics
+from document_cache import PageCache, page_hash
+
+# File extensions the processor understands, with their MIME types
+SUPPORTED_TYPES = {
+    '.pdf': "application/pdf",
+    '.txt': "text/plain"
+}
+
+# PDFs with fewer pages than this are extracted serially; pool startup
+# costs more than it saves on small files
+PARALLEL_MIN_PAGES = 32
+
+# TXT files are read this many bytes at a time
+TXT_BLOCK_BYTES = 256 * 1024
+
+# TXT blocks are content-defined: a block of at least TXT_MIN_BLOCK_CHARS
+# ends before the first non-blank line whose CRC-32 is 0 modulo
+# TXT_ANCHOR_MODULUS, so an edit only changes the blocks around it. Blocks
+# with no such line are cut at a line break after TXT_MAX_BLOCK_CHARS.
+TXT_MIN_BLOCK_CHARS = 32 * 1024
+TXT_MAX_BLOCK_CHARS = 1024 * 1024
+TXT_ANCHOR_MODULUS = 256
+
+# TXT blocks looked up in the page cache per query
+TXT_LOOKUP_BATCH = 16
+
+# One hashed page or block: (page hash, cleaned segment, cached page entry or None)
+PageSegment = Tuple[str, str, Optional[Dict]]
+
+class DocumentProcessingError(Exception):
+    """Raised when a document cannot be read or its type is not supported."""
+
+def load_file(path: str) -> io.BytesIO:
+    """
+    Open a local file as an in-memory upload, like Streamlit's UploadedFile.
+    
+    Args:
+        path: Path to a PDF or TXT file
+        
+    Returns:
+        BytesIO with ``name`` and MIME ``type`` attributes
+    """
+    with open(path, 'rb') as local_file:
+        upload = io.BytesIO(local_file.read())
+    upload.name = os.path.basename(path)
+    upload.type = SUPPORTED_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+    return upload
+
+def open_file(path: str):
+    """
+    Open a local file for streaming through iter_segments without reading it into memory.
+    
+    Args:
+        path: Path to a PDF or TXT file
+        
+    Returns:
+        Binary file object with a MIME ``type`` attribute; the caller closes it
+    """
+    local_file = open(path, 'rb')
+    local_file.type = SUPPORTED_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+    return local_file
+
+# ASCII letters and digits, deleted with bytes.translate to count them
+_ASCII_ALNUM = (string.ascii_letters + string.digits).encode('ascii')
+# Unicode \w is isalnum() or '_', so this matches exactly the non-ASCII alnum characters
+_NON_ASCII_ALNUM = re.compile(r'[^\W_\x00-\x7f]')
+
+def _clean_lines(text: str) -> List[str]:
+    """
+    Normalize line breaks, collapse whitespace and drop near-empty lines.
+    
+    str.split() and str.strip() use the same whitespace definition as the
+    regex \\s class, so ' '.join(line.split()) equals stripping the line and
+    collapsing \\s+ runs. A stripped line is longer than one character
+    exactly when its collapsed form is.
+    """
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return [line for line in map(' '.join, map(str.split, lines)) if len(line) > 1]
+
+def _find_txt_cut(text: str, start: int) -> int:
+    """
+    Find where the content-defined TXT block starting at ``start`` ends.
+    
+    Returns:
+        Offset just after the line break that ends the block, or -1 if
+        ``text`` does not reach the block's end yet
+    """
+    position = text.find('\n', start + TXT_MIN_BLOCK_CHARS - 1)
+    while position != -1:
+        line_end = text.find('\n', position + 1)
+        if line_end == -1:
+            return -1
+        line = text[position + 1:line_end]
+        if line.strip() and not zlib.crc32(line.encode('utf-8', 'surrogatepass')) % TXT_ANCHOR_MODULUS:
+            return position + 1
+        position = line_end
+    return -1
+
+def _pdf_page_content(page) -> bytes:
+    """Decoded content stream of a PDF page, which determines its extracted text."""
+    contents = page.get_contents()
+    return contents.get_data() if contents is not None else b''
+
+def _page_runs(page_numbers: List[int], max_length: int) -> List[Tuple[int, int]]:
+    """Split ascending page numbers into [start, end) ranges of consecutive pages, at most max_length long."""
+    runs: List[Tuple[int, int]] = []
+    for page_num in page_numbers:
+        if runs and runs[-1][1] == page_num and page_num - runs[-1][0] < max_length:
+            runs[-1] = (runs[-1][0], page_num + 1)
+        else:
+            runs.append((page_num, page_num + 1))
+    return runs
+
+def _count_alnum(text: str) -> int:
+    """Count alphanumeric characters, with the ASCII part counted in C via bytes.translate."""
+    data = text.encode('utf-8', 'surrogatepass')
+    # Non-ASCII characters encode to bytes >= 0x80, so only ASCII alnum is deleted
+    count = len(data) - len(data.translate(None, _ASCII_ALNUM))
+    if len(data) != len(text):
+        count += len(_NON_ASCII_ALNUM.findall(text))
+    return count
+
+def _is_meaningful(chars: int, alnum_chars: int) -> bool:
+    """Whether stripped text with these counts passes validate_document."""
+    return chars >= 50 and alnum_chars > 20
 
 class DocumentProcessor:
     """Handles document text extraction from PDF and TXT files."""
     
-    def extract_text(self, uploaded_file) -> Optional[str]:
+    def __init__(self, max_workers: Optional[int] = None, parallel_min_pages: int = PARALLEL_MIN_PAGES):
+        """
+        Initialize the processor.
+        
+        Args:
+            max_workers: Worker processes for PDF extraction; defaults to the CPU count,
+                and 1 disables parallel extraction
+            parallel_min_pages: Minimum page count before the process pool is used
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_min_pages = parallel_min_pages
+    
+    @metrics.timed('extract_text')
+    def extract_text(self, uploaded_file) -> str:
         """
         Extract text from uploaded PDF or TXT file.
         
         Args:
-            uploaded_file: Streamlit uploaded file object
+            uploaded_file: Streamlit uploaded file object, or any binary file
+                object with a MIME ``type`` attribute (see load_file)
             
         Returns:
-            Extracted text as string or None if extraction fails
+            Extracted text as string
+            
+        Raises:
+            DocumentProcessingError: If the file type is unsupported or extraction fails
         """
+        if uploaded_file.type not in SUPPORTED_TYPES.values():
+            raise DocumentProcessingError(f"Unsupported file type: {uploaded_file.type}")
         try:
             if uploaded_file.type == "application/pdf":
-                return self._extract_pdf_text(uploaded_file)
-            elif uploaded_file.type == "text/plain":
-                return self._extract_txt_text(uploaded_file)
+                text = self._extract_pdf_text(uploaded_file)
             else:
-                st.error(f"Unsupported file type: {uploaded_file.type}")
-                return None
+                text = self._extract_txt_text(uploaded_file)
         except Exception as e:
-            st.error(f"Error extracting text: {str(e)}")
-            return None
+            raise DocumentProcessingError(f"Error extracting text: {str(e)}") from e
+        metrics.count('documents_total', type=uploaded_file.type)
+        metrics.count('chars_total', len(text))
+        return text
     
-    def _extract_pdf_text(self, pdf_file) -> str:
-        """Extract text from PDF file using PyPDF2."""
-        try:
-            # Create a PDF reader object
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            # Extract text from all pages
-            text_parts = []
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text = page.extract_text()
-                if text.strip():  # Only add non-empty text
-                    text_parts.append(text)
-            
-            if not text_parts:
-                return "Unable to extract readable text from this PDF. The PDF might be scanned or have complex formatting. Please try uploading a TXT file instead."
+    def iter_segments(self, uploaded_file, stats: Optional[Dict] = None) -> Tuple[int, Iterator[str]]:
+        """
+        Stream a document as cleaned text segments, one page (or block) at a time.
+        
+        Concatenating every segment and stripping the result gives the same
+        text as extract_text, before the PDF readability checks.
+        
+        Args:
+            uploaded_file: Streamlit uploaded file object
+            stats: Dictionary whose 'alnum_chars' collects the alphanumeric
+                characters of the PDF pages as they are cleaned, for finalize_text
             
-            # Join all text parts
-            full_text = '\n'.join(text_parts)
+        Returns:
+            Tuple of (total page or block count, iterator of text segments)
+        """
+        if uploaded_file.type == "application/pdf":
+            total_pages, pages = self._iter_pdf_pages(uploaded_file)
+            return total_pages, self._clean_pages(pages, stats)
+        elif uploaded_file.type == "text/plain":
+            return self._iter_txt_blocks(uploaded_file)
+        raise DocumentProcessingError(f"Unsupported file type: {uploaded_file.type}")
+    
+    def iter_page_segments(self, uploaded_file, page_cache: PageCache,
+                           stats: Optional[Dict] = None) -> Tuple[int, Iterator[PageSegment]]:
+        """
+        Stream a document like iter_segments, hashing every page and reusing cached pages.
+        
+        PDF pages are hashed from their content streams and only pages missing
+        from ``page_cache`` are extracted. TXT blocks are hashed from their
+        text. Empty pages are yielded as empty segments, so concatenating the
+        segments still gives the iter_segments text.
+        
+        Args:
+            uploaded_file: Streamlit uploaded file object
+            page_cache: Cache of earlier pages to look up
+            stats: Dictionary collecting the PDF pages' 'alnum_chars', as in iter_segments
             
-            # Clean up the extracted text
-            cleaned_text = self.clean_text(full_text)
+        Returns:
+            Tuple of (total page or block count, iterator of (page hash, segment,
+            cached page entry or None))
+        """
+        if uploaded_file.type == "application/pdf":
+            return self._iter_cached_pdf_pages(uploaded_file, page_cache, stats)
+        elif uploaded_file.type == "text/plain":
+            total_blocks, blocks = self._iter_txt_blocks(uploaded_file)
             
-            # Validate the extracted text
-            if not self.validate_document(cleaned_text):
-                return "The extracted text appears to be incomplete or corrupted. Please try uploading a TXT file instead."
+            def hashed_blocks() -> Iterator[PageSegment]:
+                # Look blocks up a batch at a time to save cache round trips
+                while True:
+                    batch = list(islice(blocks, TXT_LOOKUP_BATCH))
+                    if not batch:
+                        return
+                    keys = [page_hash(block.encode('utf-8', 'surrogatepass'), 'txt') for block in batch]
+                    cached = page_cache.get_many(keys)
+                    for key, block in zip(keys, batch):
+                        yield key, block, cached.get(key)
             
-            return cleaned_text
+            return total_blocks, hashed_blocks()
+        raise DocumentProcessingError(f"Unsupported file type: {uploaded_file.type}")
+    
+    def finalize_text(self, file_type: str, text: str, stats: Optional[Dict] = None) -> str:
+        """
+        Turn concatenated segments into the final document text.
+        
+        Args:
+            file_type: MIME type of the uploaded file
+            text: Concatenated output of iter_segments
+            stats: The stats collected by iter_segments while cleaning the
+                segments; a PDF's text is scanned again to validate it if omitted
             
+        Returns:
+            Document text, or a message explaining why a PDF was unreadable
+        """
+        text = text.strip()
+        if file_type != "application/pdf":
+            return text
+        
+        if not text:
+            return "Unable to extract readable text from this PDF. The PDF might be scanned or have complex formatting. Please try uploading a TXT file instead."
+        
+        # Validate the extracted text with the counts taken while cleaning it
+        if stats is None:
+            valid = self.validate_document(text)
+        else:
+            valid = _is_meaningful(len(text), stats.get('alnum_chars', 0))
+        if not valid:
+            return "The extracted text appears to be incomplete or corrupted. Please try uploading a TXT file instead."
+        
+        return text
+    
+    def _extract_pdf_text(self, pdf_file) -> str:
+        """Extract text from PDF file using PyPDF2."""
+        try:
+            _, pages = self._iter_pdf_pages(pdf_file)
+            stats = {}
+            text = ''.join(self._clean_pages(pages, stats))
+            return self.finalize_text("application/pdf", text, stats)
         except Exception as e:
             raise Exception(f"Error reading PDF: {str(e)}. Please try uploading a TXT file instead.")
     
+    def _clean_pages(self, pages: Iterable[str], stats: Optional[Dict] = None) -> Iterator[str]:
+        """Clean raw page text one page at a time, skipping empty pages."""
+        for page_text in pages:
+            segment = self._clean_page(page_text, stats)
+            if segment:
+                yield segment
+    
+    def _clean_page(self, page_text: str, stats: Optional[Dict] = None) -> str:
+        """
+        Clean one page into its segment: the cleaned lines plus a line break, or '' if empty.
+        
+        The page's alphanumeric characters are added to ``stats['alnum_chars']``
+        if given, counted in the same pass as the cleaning.
+        """
+        cleaned, page_stats = self.clean_text_with_stats(page_text)
+        if stats is not None:
+            stats['alnum_chars'] = stats.get('alnum_chars', 0) + page_stats['alnum_chars']
+        return cleaned + '\n' if cleaned else ''
+    
+    def _iter_pdf_pages(self, pdf_file) -> Tuple[int, Iterator[str]]:
+        """Open a PDF and return its page count and a lazy iterator of raw page text."""
+        # Imported on first use so TXT-only sessions never load PyPDF2
+        import PyPDF2
+        
+        # Create a PDF reader object
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        page_count = len(pdf_reader.pages)
+        return page_count, self._extract_page_numbers(pdf_reader, pdf_file, list(range(page_count)))
+    
+    def _iter_cached_pdf_pages(self, pdf_file, page_cache: PageCache,
+                               stats: Optional[Dict] = None) -> Tuple[int, Iterator[PageSegment]]:
+        """Open a PDF, look every page up in the cache and lazily extract the rest."""
+        import PyPDF2
+        
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        keys = [page_hash(_pdf_page_content(page), 'pdf') for page in pdf_reader.pages]
+        cached = page_cache.get_many(keys)
+        missing = [page_num for page_num, key in enumerate(keys) if key not in cached]
+        
+        def pages() -> Iterator[PageSegment]:
+            extracted = self._extract_page_numbers(pdf_reader, pdf_file, missing)
+            for key in keys:
+                entry = cached.get(key)
+                if entry is not None:
+                    if stats is not None:
+                        # Cached pages are not cleaned again, so this is their only scan
+                        stats['alnum_chars'] = stats.get('alnum_chars', 0) + _count_alnum(entry['text'])
+                    yield key, entry['text'], entry
+                else:
+                    yield key, self._clean_page(next(extracted), stats), None
+        
+        return len(keys), pages()
+    
+    def _extract_page_numbers(self, pdf_reader, pdf_file, page_numbers: List[int]) -> Iterator[str]:
+        """Extract the raw text of the given pages in order, in parallel for many pages."""
+        if self.max_workers > 1 and len(page_numbers) >= self.parallel_min_pages:
+            return self._iter_pages_parallel(pdf_file, page_numbers)
+        return self._extract_pages(pdf_reader.pages[page_num] for page_num in page_numbers)
+    
+    def _extract_pages(self, pages) -> Iterator[str]:
+        """Extract page text one page at a time, recording per-page timings."""
+        for page in pages:
+            start = time.perf_counter()
+            text = page.extract_text()
+            metrics.observe('page_seconds', time.perf_counter() - start)
+            metrics.count('pages_total')
+            yield text
+    
+    def _iter_pages_parallel(self, pdf_file, page_numbers: List[int]) -> Iterator[str]:
+        """
+        Extract page text across a process pool, yielding pages in order.
+        
+        The upload is written once to a temporary file that each worker
+        memory-maps, so only page ranges are sent to the workers. At most
+        two page ranges per worker are in flight, which bounds how many
+        extracted pages wait in memory for the consumer.
+        
+        Args:
+            pdf_file: PDF file object
+            page_numbers: Ascending numbers of the pages to extract
+            
+        Yields:
+            Text of every requested page, in page order
+        """
+        from pdf_workers import init_pdf_worker, extract_page_range
+        
+        workers = min(self.max_workers, len(page_numbers))
+        # A few chunks per worker keeps the pool busy when page cost varies
+        chunk_size = max(1, -(-len(page_numbers) // (workers * 4)))
+        page_ranges = iter(_page_runs(page_numbers, chunk_size))
+        
+        pdf_file.seek(0)
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
+            temp_pdf.write(pdf_file.read())
+        
+        try:
+            # spawn avoids forking the Streamlit server's threads
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_pdf_worker,
+                initargs=(temp_pdf.name,)
+            ) as executor:
+                in_flight = deque(executor.submit(extract_page_range, page_range)
+                                  for page_range in islice(page_ranges, workers * 2))
+                while in_flight:
+                    chunk = in_flight.popleft().result()
+                    next_range = next(page_ranges, None)
+                    if next_range is not None:
+                        in_flight.append(executor.submit(extract_page_range, next_range))
+                    for text, seconds in chunk:
+                        metrics.observe('page_seconds', seconds)
+                        metrics.count('pages_total')
+                        yield text
+        finally:
+            os.unlink(temp_pdf.name)
+    
     def _extract_txt_text(self, txt_file) -> str:
         """Extract text from TXT file."""
         try:
-            # Read the text file
-            text = txt_file.read().decode('utf-8')
-            return text.strip()
+            # Decode block by block so the raw bytes and the text are never both in memory
+            _, blocks = self._iter_txt_blocks(txt_file)
+            return ''.join(blocks).strip()
         except Exception as e:
             raise Exception(f"Error reading TXT file: {str(e)}")
     
+    def _iter_txt_blocks(self, txt_file) -> Tuple[int, Iterator[str]]:
+        """Return an estimated block count and a lazy iterator of decoded, content-defined TXT blocks."""
+        txt_file.seek(0, io.SEEK_END)
+        size = txt_file.tell()
+        txt_file.seek(0)
+        # Blocks end a little past their minimum size on average
+        total_blocks = max(1, -(-size // (2 * TXT_MIN_BLOCK_CHARS)))
+        
+        def blocks() -> Iterator[str]:
+            # Incremental decoding keeps multi-byte characters split across
+            # read boundaries intact
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            carry = ''
+            while True:
+                data = txt_file.read(TXT_BLOCK_BYTES)
+                text = carry + decoder.decode(data, final=not data)
+                start = 0
+                cut = _find_txt_cut(text, start)
+                while cut != -1:
+                    yield text[start:cut]
+                    start = cut
+                    cut = _find_txt_cut(text, start)
+                if not data:
+                    if start < len(text):
+                        yield text[start:]
+                    return
+                if len(text) - start > TXT_MAX_BLOCK_CHARS:
+                    # No anchor line; fall back to the last complete line
+                    cut = text.rfind('\n', start) + 1
+                    if cut:
+                        yield text[start:cut]
+                        start = cut
+                carry = text[start:]
+        
+        return total_blocks, blocks()
+    
+    @metrics.timed('validate_document')
     def validate_document(self, text: str) -> bool:
         """
         Validate if the extracted text is meaningful.
@@ -84,13 +458,42 @@ class DocumentProcessor:
             return False
         
         # Check if text contains meaningful content (not just whitespace/special chars)
-        meaningful_chars = sum(1 for c in text if c.isalnum())
-        return meaningful_chars > 20
+        return _count_alnum(text) > 20
+    
+    @metrics.timed('clean_text')
+    def clean_text_with_stats(self, text: str) -> Tuple[str, Dict]:
+        """
+        Clean text and compute its validation stats in a single pass.
+        
+        Produces exactly the same text as clean_text.
+        
+        Args:
+            text: Raw extracted text
+            
+        Returns:
+            Tuple of (cleaned text, stats) where stats holds 'chars', 'lines',
+            'alnum_chars' and 'is_valid' (the validate_document result)
+        """
+        lines = _clean_lines(text) if text else []
+        cleaned_text = '\n'.join(lines)
+        alnum_chars = _count_alnum(cleaned_text)
+        stats = {
+            'chars': len(cleaned_text),
+            'lines': len(lines),
+            'alnum_chars': alnum_chars,
+            'is_valid': _is_meaningful(len(cleaned_text), alnum_chars)
+        }
+        return cleaned_text, stats
     
+    @metrics.timed('clean_text')
     def clean_text(self, text: str) -> str:
         """
         Clean and preprocess the extracted text.
         
+        Line breaks are normalized, each line is stripped with internal
+        whitespace runs collapsed to one space, and lines of one character
+        or less are dropped.
+        
         Args:
             text: Raw extracted text
             
@@ -100,27 +503,4 @@ class DocumentProcessor:
         if not text:
             return ""
         
-        # Remove excessive whitespace and normalize line breaks
-        text = re.sub(r'\r\n|\r|\n', '\n', text)
-        
-        # Split into lines and clean each line
-        lines = text.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if line and len(line) > 1:  # Only keep non-empty lines with content
-                # Remove excessive spaces within the line
-                line = re.sub(r'\s+', ' ', line)
-                cleaned_lines.append(line)
-        
-        # Join lines back together
-        cleaned_text = '\n'.join(cleaned_lines)
-        
-        # Remove any remaining multiple spaces
-        cleaned_text = re.sub(r' +', ' ', cleaned_text)
-        
-        # Remove excessive line breaks (more than 2 consecutive)
-        cleaned_text = re.sub(r'\n{3,}', '\n\n', cleaned_text)
-        
-        return cleaned_text.strip()
+        return '\n'.join(_clean_lines(text))
@@ -0,0 +1,456 @@
+"""
+Asyncio job service for document extraction, summarization and Q&A.
+
+Jobs are admitted into a bounded queue and run on a thread pool with a
+global concurrency limit and a per-user limit, so a burst of uploads
+cannot take over the machine. Callers poll job status and collect
+results by job id, and can cancel jobs they no longer need.
+
+Streamlit script threads use LocalServiceClient, which runs the service
+on a private event loop thread and exposes a blocking, thread-safe API.
+The same client can drive the service in-process from scripts and tests.
+"""
+import asyncio
+import functools
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ai_assistant import AIAssistant
+from corpus import DEFAULT_TOP_K
+from document_cache import ChallengeCache, DocumentCache, PageCache, content_hash
+from document_pipeline import DocumentStream, ingest
+from document_processor import DocumentProcessingError, DocumentProcessor
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# Defaults, overridable through the environment
+DEFAULT_MAX_PENDING = int(os.environ.get('SMART_RESEARCH_MAX_PENDING_JOBS', 64))
+DEFAULT_MAX_CONCURRENT = int(os.environ.get('SMART_RESEARCH_MAX_CONCURRENT_JOBS', os.cpu_count() or 2))
+DEFAULT_PER_USER_PENDING = int(os.environ.get('SMART_RESEARCH_PER_USER_PENDING_JOBS', 8))
+DEFAULT_PER_USER_CONCURRENT = int(os.environ.get('SMART_RESEARCH_PER_USER_CONCURRENT_JOBS', 2))
+
+# Finished jobs are forgotten after this long
+RESULT_TTL_SECONDS = 600
+
+
+class ServiceBusy(Exception):
+    """Raised when the job queue (global or per user) is full."""
+
+
+class JobCancelled(Exception):
+    """Raised by a handler that stops early because its job was cancelled."""
+
+
+class Job:
+    """A unit of work submitted to the service."""
+
+    def __init__(self, user_id: str, kind: str, payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.kind = kind
+        self.payload = payload
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        # Live progress for 'extract' jobs: the DocumentStream being populated
+        self.progress: Optional[DocumentStream] = payload.get('stream') if kind == 'extract' else None
+        # Set by cancel(); long-running handlers check it between steps
+        self.cancelled = threading.Event()
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status snapshot without payload or result."""
+        info = {
+            'id': self.id,
+            'user_id': self.user_id,
+            'kind': self.kind,
+            'status': self.status,
+            'error': self.error,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if self.progress is not None:
+            info['pages_processed'] = self.progress.pages_processed
+            info['total_pages'] = self.progress.total_pages
+        return info
+
+
+@functools.lru_cache(maxsize=None)
+def _shared(factory: Callable) -> Any:
+    """One assistant, processor or cache per process, reused by every job."""
+    return factory()
+
+
+def _run_extract(job: Job) -> Dict:
+    """
+    Extract, index and analyze an upload.
+
+    The payload has the upload 'data', the 'stream' to populate (a
+    DocumentStream created by the caller, so the partial document can be
+    read while the job runs) and an optional 'cache_key' for the result.
+    """
+    payload = job.payload
+    stream = payload['stream']
+    ingest(stream, payload['data'], processor=_shared(DocumentProcessor), assistant=_shared(AIAssistant),
+           page_cache=_shared(PageCache))
+    if stream.error:
+        raise DocumentProcessingError(stream.error)
+    if not stream.text():
+        raise DocumentProcessingError("Could not extract text from the document.")
+
+    entry = {'text': stream.text(), **stream.analysis}
+    if payload.get('cache_key'):
+        _shared(DocumentCache).put(payload['cache_key'], entry)
+    return entry
+
+
+def _run_summarize(job: Job) -> str:
+    """Summarize text; payload has text and optional index."""
+    payload = job.payload
+    return _shared(AIAssistant).generate_summary(payload['text'], index=payload.get('index'))
+
+
+def _run_ask(job: Job) -> Dict:
+    """
+    Answer a question; payload has question and either text/index or a
+    DocumentStream that is still being ingested.
+    """
+    payload = job.payload
+    assistant = _shared(AIAssistant)
+    stream = payload.get('stream')
+    if stream is not None:
+        with stream.snapshot() as (text, index):
+            answer, justification = assistant.answer_question(text, payload['question'], index=index)
+    else:
+        answer, justification = assistant.answer_question(
+            payload['text'], payload['question'], index=payload.get('index')
+        )
+    return {'answer': answer, 'justification': justification}
+
+
+def _run_corpus_add(job: Job) -> Dict:
+    """
+    Extract and index uploads into a corpus; payload has the 'corpus' and
+    'files', a list of (name, MIME type, bytes).
+    """
+    payload = job.payload
+    corpus = payload['corpus']
+    cache = _shared(DocumentCache)
+    processor = _shared(DocumentProcessor)
+    assistant = _shared(AIAssistant)
+    added, errors = [], []
+    for name, file_type, data in payload['files']:
+        key = content_hash(data)
+        if key in corpus:
+            continue
+        try:
+            entry = cache.get(key)
+            if entry is None:
+                upload = io.BytesIO(data)
+                upload.type = file_type
+                text = processor.extract_text(upload)
+                entry = {'text': text, **assistant.analyze_document(text)}
+                cache.put(key, entry)
+            corpus.add_document(name, entry['text'], index=entry['index'], key=key)
+            added.append(name)
+        except Exception as e:
+            errors.append(f"{name}: {str(e)}")
+    return {'added': added, 'errors': errors}
+
+
+def _run_corpus_ask(job: Job) -> Dict:
+    """Answer a question across a corpus; payload has 'corpus', 'question' and optional 'top_k'."""
+    payload = job.payload
+    return payload['corpus'].ask(payload['question'], payload.get('top_k', DEFAULT_TOP_K),
+                                 assistant=_shared(AIAssistant))
+
+
+def _run_prepare_challenge(job: Job) -> Dict:
+    """
+    Precompute the Challenge Me question bank for a stored document; payload has 'document'.
+
+    Runs speculatively once a document is processed, so switching to
+    Challenge Me and grading answers need no further retrieval. The result
+    is kept on the shared StoredDocument as its 'challenge' and in
+    ChallengeCache, so it survives restarts; a document loaded from disk
+    takes its challenge from there instead of preparing it again.
+    """
+    document = job.payload['document']
+    if document.key:
+        challenge = _shared(ChallengeCache).get(document.key)
+        if challenge is not None:
+            document.challenge = challenge
+            return challenge
+    assistant = _shared(AIAssistant)
+    questions = assistant.generate_questions(document.text, key_concepts=document.key_concepts,
+                                             index=document.index)
+    expected = []
+    for question in questions:
+        if job.cancelled.is_set():
+            raise JobCancelled()
+        expected.append(assistant.expected_content(document.text, question, document.index))
+    document.challenge = {'questions': questions, 'expected': expected}
+    if document.key:
+        _shared(ChallengeCache).put(document.key, document.challenge)
+    return document.challenge
+
+
+HANDLERS: Dict[str, Callable[[Job], Any]] = {
+    'extract': _run_extract,
+    'summarize': _run_summarize,
+    'ask': _run_ask,
+    'corpus_add': _run_corpus_add,
+    'corpus_ask': _run_corpus_ask,
+    'prepare_challenge': _run_prepare_challenge
+}
+
+
+class DocumentService:
+    """
+    Bounded job queue with global and per-user concurrency limits.
+
+    All coroutine methods must run on the service's event loop.
+    """
+
+    def __init__(self, max_pending: int = DEFAULT_MAX_PENDING,
+                 max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 per_user_pending: int = DEFAULT_PER_USER_PENDING,
+                 per_user_concurrent: int = DEFAULT_PER_USER_CONCURRENT,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Create the service.
+
+        Args:
+            max_pending: Jobs admitted but not finished, across all users
+            max_concurrent: Jobs running at once, across all users
+            per_user_pending: Jobs admitted but not finished, per user
+            per_user_concurrent: Jobs running at once, per user
+            executor: Executor for the blocking work; defaults to a thread pool
+                sized to max_concurrent
+        """
+        self.max_pending = max_pending
+        self.per_user_pending = per_user_pending
+        self.per_user_concurrent = per_user_concurrent
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_concurrent,
+                                                       thread_name_prefix='document-service')
+        self.jobs: Dict[str, Job] = {}
+        self._global_slots = asyncio.Semaphore(max_concurrent)
+        self._user_slots: Dict[str, asyncio.Semaphore] = {}
+        self._pending: Dict[str, int] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._tasks = set()
+
+    @property
+    def pending(self) -> int:
+        """Jobs admitted and not yet finished."""
+        return sum(self._pending.values())
+
+    async def submit(self, user_id: str, kind: str, payload: Dict[str, Any]) -> str:
+        """
+        Admit a job into the queue.
+
+        Args:
+            user_id: Submitting user or session
+            kind: One of HANDLERS ('extract', 'summarize', 'ask', 'corpus_add', 'corpus_ask',
+                'prepare_challenge')
+            payload: Job arguments
+
+        Returns:
+            Job id
+
+        Raises:
+            ValueError: If the job kind is unknown
+            ServiceBusy: If the global or per-user queue is full
+        """
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self._prune()
+        if self.pending >= self.max_pending:
+            raise ServiceBusy("The server is busy. Please try again shortly.")
+        if self._pending.get(user_id, 0) >= self.per_user_pending:
+            raise ServiceBusy("You have too many jobs in progress. Please wait for them to finish.")
+
+        job = Job(user_id, kind, payload)
+        self.jobs[job.id] = job
+        self._events[job.id] = asyncio.Event()
+        self._pending[user_id] = self._pending.get(user_id, 0) + 1
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job.id
+
+    async def _run(self, job: Job) -> None:
+        user_slots = self._user_slots.setdefault(job.user_id, asyncio.Semaphore(self.per_user_concurrent))
+        try:
+            # Take the user's slot first so one user's backlog never holds global slots idle
+            async with user_slots, self._global_slots:
+                if job.cancelled.is_set():
+                    raise JobCancelled()
+                job.status = RUNNING
+                job.started_at = time.time()
+                loop = asyncio.get_running_loop()
+                job.result = await loop.run_in_executor(self.executor, HANDLERS[job.kind], job)
+                job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            job.payload = None
+            self._pending[job.user_id] -= 1
+            if not self._pending[job.user_id]:
+                del self._pending[job.user_id]
+                self._user_slots.pop(job.user_id, None)
+            self._events[job.id].set()
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than RESULT_TTL_SECONDS."""
+        cutoff = time.time() - RESULT_TTL_SECONDS
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+            del self._events[job_id]
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status snapshot of a job, or None if unknown."""
+        job = self.jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Ask a job to stop. A queued job never starts; a running one stops at
+        its handler's next check (handlers that never check run to completion).
+
+        Returns:
+            Whether the job was still unfinished
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancelled.set()
+        return True
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Job:
+        """
+        Wait for a job to finish.
+
+        Raises:
+            KeyError: If the job is unknown
+            asyncio.TimeoutError: If it does not finish within timeout
+        """
+        await asyncio.wait_for(self._events[job_id].wait(), timeout)
+        return self.jobs[job_id]
+
+    async def shutdown(self) -> None:
+        """Wait for running jobs and stop the executor."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+
+
+class LocalServiceClient:
+    """
+    Thread-safe, blocking client for a DocumentService running in this process.
+
+    The service lives on a dedicated event loop thread; every call is
+    forwarded with asyncio.run_coroutine_threadsafe.
+    """
+
+    def __init__(self, **service_options):
+        """
+        Start the event loop thread and the service.
+
+        Args:
+            **service_options: Keyword arguments for DocumentService
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='document-service-loop',
+                                        daemon=True)
+        self._thread.start()
+        self.service: DocumentService = self._call(self._create_service(service_options))
+
+    @staticmethod
+    async def _create_service(options: Dict[str, Any]) -> DocumentService:
+        return DocumentService(**options)
+
+    def _call(self, coroutine, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    def submit(self, user_id: str, kind: str, payload: Dict[str, Any]) -> str:
+        """Submit a job; raises ServiceBusy when the queue is full."""
+        return self._call(self.service.submit(user_id, kind, payload))
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status snapshot of a job, or None if unknown."""
+        return self._call(self._status(job_id))
+
+    async def _status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.service.status(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Ask a job to stop; returns whether it was still unfinished."""
+        return self._call(self._cancel(job_id))
+
+    async def _cancel(self, job_id: str) -> bool:
+        return self.service.cancel(job_id)
+
+    def job(self, job_id: str) -> Optional[Job]:
+        """The job object itself, for in-process access to progress and results."""
+        return self.service.jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Job:
+        """Block until a job finishes; raises TimeoutError after timeout seconds."""
+        return self._call(self.service.wait(job_id, timeout))
+
+    def run(self, user_id: str, kind: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """
+        Submit a job, wait for it and return its result.
+
+        Raises:
+            ServiceBusy: If the queue is full
+            RuntimeError: If the job failed or was cancelled
+        """
+        job = self.wait(self.submit(user_id, kind, payload), timeout)
+        if job.status == FAILED:
+            raise RuntimeError(job.error)
+        if job.status == CANCELLED:
+            raise RuntimeError("The job was cancelled.")
+        return job.result
+
+    def close(self) -> None:
+        """Finish running jobs and stop the event loop thread."""
+        self._call(self.service.shutdown())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_default_client: Optional[LocalServiceClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_service_client() -> LocalServiceClient:
+    """Process-wide client shared by every Streamlit session."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = LocalServiceClient()
+        return _default_client
@@ -0,0 +1,299 @@
+"""
+Versioned binary snapshots of processed documents.
+
+A snapshot holds everything analyze_document computes for an upload (the
+cleaned text, sentence offsets and lengths, the vocabulary and postings
+of the sentence index, the summary and key concepts) and, once prepared,
+the Challenge Me question bank. Loading one rebuilds the DocumentIndex
+from flat arrays instead of extracting, segmenting and tokenizing the
+document again, so worker processes and restarts get a processed
+document back in milliseconds. Posting lists stay packed until a term is
+first looked up (see SnapshotPostings).
+
+Layout (little-endian, every section 8-byte aligned):
+    header | checksum | body
+
+    body = text (UTF-8) | sentence offsets (uint64 start/end pairs) |
+           sentence lengths (uint32) | vocabulary (newline-separated UTF-8) |
+           posting offsets (uint64, n_terms + 1) |
+           posting sentences (uint32) | posting tfs (uint32) | metadata (JSON)
+
+Posting lists are stored term by term in vocabulary order. Within a list,
+the sentence ids are ascending and stored as gaps from the previous id,
+which makes the body compress much better. The body may be
+zlib-compressed as a whole. The checksum is a CRC-32 of the header and
+the body as stored, verified before anything is decoded.
+"""
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from itertools import chain
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from document_index import POSTING_BYTES, DocumentIndex
+
+MAGIC = b'SRSNAP\x00\x00'
+FORMAT_VERSION = 1
+
+# Header flags
+COMPRESSED = 1
+
+# magic, version, flags, counts, body size, BM25 parameters, then (offset, length) of every section
+_HEADER = struct.Struct('<8sII5Q2d16Q')
+_CHECKSUM = struct.Struct('<I4x')
+
+# Section names, in body order
+_SECTIONS = ('text', 'offsets', 'sentence_lengths', 'vocabulary', 'posting_offsets', 'posting_sentences',
+             'posting_tfs', 'metadata')
+
+
+def _array(typecode: str, data: memoryview) -> array:
+    """Copy a little-endian section into an array of the given type."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class SnapshotPostings(MutableMapping):
+    """
+    Posting lists of a restored index, decoded term by term on first use.
+
+    Behaves like the term -> [(sentence id, tf), ...] dict of DocumentIndex.
+    Building every posting tuple up front would dominate loading a snapshot,
+    while a question only reads the lists of its few terms. Decoded lists
+    are kept, so later lookups (and appends to them) see the same list.
+    """
+
+    def __init__(self, vocabulary: List[str], bounds: List[int], sentence_ids: np.ndarray, tfs: np.ndarray):
+        """
+        Args:
+            vocabulary: Terms in storage order
+            bounds: Posting list i is positions bounds[i]:bounds[i + 1]
+            sentence_ids: Sentence id of every posting
+            tfs: Term frequency of every posting
+        """
+        self._terms: Dict[str, int] = dict(zip(vocabulary, range(len(vocabulary))))
+        self._bounds = bounds
+        self.sentence_ids = sentence_ids
+        self.tfs = tfs
+        self._decoded: Dict[str, List[Tuple[int, int]]] = {}
+        self._modified = False
+
+    def __getitem__(self, term: str) -> List[Tuple[int, int]]:
+        postings = self._decoded.get(term)
+        if postings is None:
+            position = self._terms[term]
+            start, end = self._bounds[position], self._bounds[position + 1]
+            postings = list(zip(self.sentence_ids[start:end].tolist(), self.tfs[start:end].tolist()))
+            # Concurrent readers may decode the same list; all of them keep the first
+            postings = self._decoded.setdefault(term, postings)
+        return postings
+
+    def __setitem__(self, term: str, postings: List[Tuple[int, int]]) -> None:
+        self._terms.setdefault(term, -1)
+        self._decoded[term] = postings
+        self._modified = True
+
+    def __delitem__(self, term: str) -> None:
+        del self._terms[term]
+        self._decoded.pop(term, None)
+        self._modified = True
+
+    def __contains__(self, term: object) -> bool:
+        return term in self._terms
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._terms)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def packed(self) -> Optional[Tuple[List[str], List[int], np.ndarray, np.ndarray]]:
+        """
+        The stored (vocabulary, bounds, sentence ids, tfs), or None once any
+        list was replaced, removed or appended to.
+        """
+        if self._modified:
+            return None
+        for term, postings in list(self._decoded.items()):
+            position = self._terms[term]
+            if len(postings) != self._bounds[position + 1] - self._bounds[position]:
+                return None
+        return list(self._terms), self._bounds, self.sentence_ids, self.tfs
+
+    def nbytes(self) -> int:
+        """Approximate memory held: the packed arrays, the term table and every decoded list."""
+        size = self.sentence_ids.nbytes + self.tfs.nbytes + sys.getsizeof(self._terms)
+        size += sys.getsizeof(self._bounds) + sum(map(sys.getsizeof, self._terms))
+        for postings in list(self._decoded.values()):
+            size += sys.getsizeof(postings) + POSTING_BYTES * len(postings)
+        return size
+
+
+def _flatten_postings(postings) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Concatenate posting lists in vocabulary order.
+
+    Returns:
+        Tuple of (vocabulary, posting offsets with n_terms + 1 entries,
+        sentence ids, tfs), arrays as int64
+    """
+    packed = postings.packed() if isinstance(postings, SnapshotPostings) else None
+    if packed is not None:
+        # Unchanged since loaded: reuse the arrays instead of decoding every list
+        vocabulary, bounds, sentence_ids, tfs = packed
+        return vocabulary, np.array(bounds, dtype=np.int64), sentence_ids.astype(np.int64), tfs.astype(np.int64)
+
+    vocabulary = list(postings)
+    lists = [postings[term] for term in vocabulary]
+    posting_offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, lists), dtype=np.int64, count=len(lists)), out=posting_offsets[1:])
+    flat = np.fromiter(chain.from_iterable(chain.from_iterable(lists)), dtype=np.int64,
+                       count=2 * int(posting_offsets[-1]))
+    return vocabulary, posting_offsets, flat[0::2], flat[1::2]
+
+
+def dumps(entry: Dict[str, Any], compress: bool = True) -> bytes:
+    """
+    Encode a processed document as a snapshot.
+
+    Args:
+        entry: Analysis results with 'text', 'index', 'summary' and
+            'key_concepts', and optionally the prepared 'challenge'
+        compress: Whether to zlib-compress the body
+
+    Returns:
+        The snapshot bytes
+    """
+    index: DocumentIndex = entry['index']
+    vocabulary, posting_offsets, sentence_ids, tfs = _flatten_postings(index.postings)
+    gaps = np.diff(sentence_ids, prepend=0)
+    starts = posting_offsets[:-1][np.diff(posting_offsets) > 0]
+    gaps[starts] = sentence_ids[starts]
+
+    metadata = {key: value for key, value in entry.items() if key not in ('text', 'index', 'challenge')}
+    if entry['text'] != index.text:
+        metadata['text'] = entry['text']
+    challenge = entry.get('challenge')
+    if challenge is not None:
+        metadata['challenge'] = {
+            'questions': challenge['questions'],
+            'expected': [[list(relevant_ids), sorted(words)] for relevant_ids, words in challenge['expected']]
+        }
+
+    sections = {
+        'text': index.text.encode('utf-8'),
+        'offsets': np.asarray(index.offsets, dtype='<u8').tobytes(),
+        'sentence_lengths': np.asarray(index.sentence_lengths, dtype='<u4').tobytes(),
+        'vocabulary': '\n'.join(vocabulary).encode('utf-8'),
+        'posting_offsets': posting_offsets.astype('<u8').tobytes(),
+        'posting_sentences': gaps.astype('<u4').tobytes(),
+        'posting_tfs': tfs.astype('<u4').tobytes(),
+        'metadata': json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+    }
+    parts, positions, position = [], [], 0
+    for name in _SECTIONS:
+        data = sections[name]
+        positions += [position, len(data)]
+        padding = -len(data) % 8
+        parts += [data, b'\x00' * padding]
+        position += len(data) + padding
+    body = b''.join(parts)
+    raw_size = len(body)
+    if compress:
+        body = zlib.compress(body, 1)
+
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, COMPRESSED if compress else 0, len(index), len(vocabulary),
+                          int(posting_offsets[-1]), index._total_length, raw_size, index.k1, index.b, *positions)
+    checksum = zlib.crc32(body, zlib.crc32(header))
+    return header + _CHECKSUM.pack(checksum) + body
+
+
+def loads(data: bytes) -> Dict[str, Any]:
+    """
+    Decode a snapshot made by ``dumps``.
+
+    Args:
+        data: Snapshot bytes
+
+    Returns:
+        The analysis results, with a restored DocumentIndex as 'index'
+
+    Raises:
+        ValueError: If the data is not a snapshot of this version or fails its checksum
+    """
+    header_end = _HEADER.size + _CHECKSUM.size
+    if len(data) < header_end:
+        raise ValueError("Not a document snapshot")
+    fields = _HEADER.unpack_from(data)
+    magic, version, flags, n_sentences, n_terms, n_postings, _, raw_size, k1, b = fields[:10]
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"Not a version {FORMAT_VERSION} document snapshot")
+    body = memoryview(data)[header_end:]
+    (checksum,) = _CHECKSUM.unpack_from(data, _HEADER.size)
+    if zlib.crc32(body, zlib.crc32(memoryview(data)[:_HEADER.size])) != checksum:
+        raise ValueError("Document snapshot checksum mismatch")
+    if flags & COMPRESSED:
+        body = zlib.decompress(body)
+    if len(body) != raw_size:
+        raise ValueError("Document snapshot is truncated")
+
+    positions = fields[10:]
+    sections = {name: memoryview(body)[positions[2 * i]:positions[2 * i] + positions[2 * i + 1]]
+                for i, name in enumerate(_SECTIONS)}
+    text = str(sections['text'], 'utf-8')
+    offsets = _array('Q', sections['offsets'])
+    sentence_lengths = _array('I', sections['sentence_lengths'])
+    vocabulary = str(sections['vocabulary'], 'utf-8').split('\n') if n_terms else []
+    bounds = np.frombuffer(sections['posting_offsets'], dtype='<u8', count=n_terms + 1).astype(np.int64)
+    # Undo the gap encoding: a running sum, restarted at the first posting of every term
+    sentence_ids = np.cumsum(np.frombuffer(sections['posting_sentences'], dtype='<u4', count=n_postings),
+                             dtype=np.int64)
+    starts = bounds[:-1][np.diff(bounds) > 0]
+    restarts = np.zeros(n_postings, dtype=np.int64)
+    restarts[starts[1:]] = np.diff(sentence_ids[starts[1:] - 1], prepend=0)
+    sentence_ids -= np.cumsum(restarts)
+    tfs = np.frombuffer(sections['posting_tfs'], dtype='<u4', count=n_postings)
+    postings = SnapshotPostings(vocabulary, bounds.tolist(), sentence_ids.astype(np.uint32), tfs.copy())
+
+    index = DocumentIndex.restore(text, offsets, sentence_lengths, postings, k1=k1, b=b)
+    entry = json.loads(str(sections['metadata'], 'utf-8'))
+    entry.setdefault('text', index.text)
+    entry['index'] = index
+    challenge = entry.get('challenge')
+    if challenge is not None:
+        challenge['expected'] = [(relevant_ids, set(words)) for relevant_ids, words in challenge['expected']]
+    return entry
+
+
+def save(path: str, entry: Dict[str, Any], compress: bool = True) -> str:
+    """
+    Write a snapshot file atomically.
+
+    Args:
+        path: Snapshot path
+        entry: Analysis results (see ``dumps``)
+        compress: Whether to zlib-compress the body
+
+    Returns:
+        The path
+    """
+    data = dumps(entry, compress)
+    with open(path + '.tmp', 'wb') as snapshot_file:
+        snapshot_file.write(data)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def load(path: str) -> Dict[str, Any]:
+    """Read a snapshot file written by ``save``; raises ValueError if it is not a valid snapshot."""
+    with open(path, 'rb') as snapshot_file:
+        return loads(snapshot_file.read())
@@ -0,0 +1,176 @@
+"""
+Process-wide store of processed documents shared by every session.
+
+Documents are keyed by the content hash of the upload, so ten users who
+open the same report share one copy of its text, sentence offsets and
+index. Sessions hold a DocumentHandle; the store counts references and
+evicts unreferenced documents, least recently used first, once the total
+size exceeds the memory budget. Documents in use are never evicted, so
+the budget can be exceeded temporarily while many sessions are active.
+"""
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import metrics
+from document_index import DocumentIndex
+
+DEFAULT_MAX_BYTES = int(os.environ.get('SMART_RESEARCH_STORE_MAX_BYTES', 1024 * 1024 * 1024))
+
+
+class StoredDocument:
+    """One processed document: text, summary, index, key concepts and (once prepared) challenge."""
+
+    def __init__(self, key: str, entry: Dict[str, Any]):
+        self.key = key
+        self.index: DocumentIndex = entry['index']
+        # Share the index's copy of the text when they match
+        self.text: str = self.index.text if self.index.text == entry['text'] else entry['text']
+        self.summary: str = entry['summary']
+        self.key_concepts: List[str] = entry['key_concepts']
+        # Challenge Me questions and expected answer content, precomputed after processing
+        self.challenge: Optional[Dict[str, Any]] = entry.get('challenge')
+        self.refcount = 0
+        self.nbytes = self.index.nbytes() + sys.getsizeof(self.summary)
+        if self.text is not self.index.text:
+            self.nbytes += sys.getsizeof(self.text)
+
+
+class DocumentStore:
+    """Reference-counted, memory-bounded LRU store of StoredDocuments."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Create an empty store.
+
+        Args:
+            max_bytes: Memory budget for unreferenced documents to be evicted against
+        """
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._documents: 'OrderedDict[str, StoredDocument]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._documents
+
+    def acquire(self, key: str) -> Optional['DocumentHandle']:
+        """
+        Take a reference to a stored document.
+
+        Args:
+            key: Content hash of the upload
+
+        Returns:
+            A handle to the document, or None if it is not in the store
+        """
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                metrics.count('cache_requests_total', cache='memory', result='miss')
+                return None
+            metrics.count('cache_requests_total', cache='memory', result='hit')
+            document.refcount += 1
+            self._documents.move_to_end(key)
+        return DocumentHandle(self, document)
+
+    def add(self, key: str, entry: Dict[str, Any]) -> 'DocumentHandle':
+        """
+        Store a processed document and take a reference to it.
+
+        If the document is already stored, the existing copy is shared.
+
+        Args:
+            key: Content hash of the upload
+            entry: Dictionary with 'text', 'summary', 'index' and 'key_concepts'
+
+        Returns:
+            A handle to the stored document
+        """
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                document = StoredDocument(key, entry)
+                self._documents[key] = document
+                self.total_bytes += document.nbytes
+            document.refcount += 1
+            self._documents.move_to_end(key)
+            self._evict()
+        return DocumentHandle(self, document)
+
+    def release(self, key: str) -> None:
+        """Drop one reference to a document, evicting if over budget."""
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None or document.refcount == 0:
+                return
+            document.refcount -= 1
+            self._evict()
+
+    def _evict(self) -> None:
+        """Evict unreferenced documents, least recently used first, until under budget."""
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key in [key for key, document in self._documents.items() if document.refcount == 0]:
+            self.total_bytes -= self._documents.pop(key).nbytes
+            if self.total_bytes <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        """Number of documents, how many are referenced, and their total size."""
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'referenced': sum(1 for document in self._documents.values() if document.refcount),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+
+class DocumentHandle:
+    """
+    A session's reference to a stored document.
+
+    Call ``release`` when the session is done with the document. If a
+    session is discarded without releasing, the reference is dropped when
+    the handle is garbage collected.
+    """
+
+    def __init__(self, store: DocumentStore, document: StoredDocument):
+        self.key = document.key
+        self._document: Optional[StoredDocument] = document
+        self._finalizer = weakref.finalize(self, store.release, document.key)
+
+    @property
+    def document(self) -> StoredDocument:
+        if self._document is None:
+            raise ValueError("Document handle has been released")
+        return self._document
+
+    @property
+    def released(self) -> bool:
+        return self._document is None
+
+    def release(self) -> None:
+        """Drop the reference; safe to call more than once."""
+        self._document = None
+        self._finalizer()
+
+
+_default_store: Optional[DocumentStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_document_store() -> DocumentStore:
+    """Process-wide store shared by every Streamlit session."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = DocumentStore()
+        return _default_store
@@ -0,0 +1,116 @@
+"""
+Compact interned token representation of a document for keyword analytics.
+
+The document is tokenized once with the shared word tokenizer; every
+distinct word is interned in a vocabulary and the document is kept as an
+``array('I')`` of token ids. Term frequencies are then a single
+``np.bincount`` over that array, and keywords, key concepts and question
+topics are all read from the same counts.
+"""
+import sys
+from array import array
+from typing import Dict, FrozenSet, List
+
+from document_index import tokenize
+
+# Words never picked as keywords or key concepts
+STOP_WORDS = frozenset({
+    'a', 'about', 'after', 'also', 'an', 'and', 'any', 'are', 'at', 'back', 'be', 'because', 'been',
+    'being', 'but', 'by', 'can', 'could', 'day', 'did', 'do', 'does', 'each', 'even', 'first', 'for',
+    'from', 'give', 'had', 'has', 'have', 'in', 'into', 'is', 'just', 'know', 'life', 'many', 'may',
+    'might', 'most', 'must', 'new', 'of', 'on', 'only', 'or', 'over', 'said', 'should', 'some',
+    'than', 'that', 'the', 'their', 'there', 'these', 'they', 'think', 'this', 'those', 'time', 'to',
+    'us', 'very', 'want', 'was', 'way', 'were', 'what', 'which', 'will', 'with', 'work', 'would'
+})
+
+
+class DocumentTokens:
+    """
+    Token ids of a document over an interned vocabulary.
+
+    Term ids are assigned in order of first occurrence, so ties in
+    frequency rank resolve to the word seen first in the document.
+    """
+
+    def __init__(self, text: str = ''):
+        """
+        Tokenize a document.
+
+        Args:
+            text: Document text; more can be added later with ``append``
+        """
+        # term -> term id
+        self.vocabulary: Dict[str, int] = {}
+        self.ids = array('I')
+        self._counts = None
+
+        if text:
+            self.append(text)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def terms(self) -> List[str]:
+        """Vocabulary terms indexed by term id."""
+        return list(self.vocabulary)
+
+    def nbytes(self) -> int:
+        """Approximate memory footprint of the token ids and vocabulary."""
+        size = self.ids.itemsize * len(self.ids) + sys.getsizeof(self.vocabulary)
+        for term, term_id in self.vocabulary.items():
+            size += sys.getsizeof(term) + sys.getsizeof(term_id)
+        return size
+
+    def append(self, text: str) -> None:
+        """
+        Tokenize another chunk of the document.
+
+        Args:
+            text: Next chunk of text, split on a word boundary
+        """
+        vocabulary = self.vocabulary
+        tokens = tokenize(text)
+        # Intern each distinct token once, then map ids without a Python-level loop
+        for token in dict.fromkeys(tokens):
+            if token not in vocabulary:
+                vocabulary[token] = len(vocabulary)
+        self.ids.extend(map(vocabulary.__getitem__, tokens))
+        self._counts = None
+
+    def counts(self):
+        """Frequency of every term, as a NumPy array indexed by term id."""
+        if self._counts is None:
+            import numpy as np
+
+            ids = np.frombuffer(self.ids, dtype=self.ids.typecode)
+            self._counts = np.bincount(ids, minlength=len(self.vocabulary))
+        return self._counts
+
+    def top_terms(self, limit: int, min_length: int = 4, min_count: int = 1,
+                  stop_words: FrozenSet[str] = STOP_WORDS) -> List[str]:
+        """
+        Most frequent alphabetic terms of the document.
+
+        Args:
+            limit: Maximum number of terms to return
+            min_length: Shortest term considered
+            min_count: Fewest occurrences for a term to be returned
+            stop_words: Terms never returned
+
+        Returns:
+            Terms by descending frequency, ties in document order
+        """
+        if not self.vocabulary or limit <= 0:
+            return []
+        import numpy as np
+
+        eligible = np.fromiter(
+            (len(term) >= min_length and term.isalpha() and term not in stop_words for term in self.vocabulary),
+            dtype=bool, count=len(self.vocabulary)
+        )
+        counts = np.where(eligible, self.counts(), 0)
+        ranked = np.argsort(-counts, kind='stable')[:limit]
+        terms = self.terms
+        return [terms[term_id] for term_id in ranked if counts[term_id] >= max(min_count, 1)]
+
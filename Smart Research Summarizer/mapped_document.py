@@ -0,0 +1,326 @@
+"""
+Compact on-disk document format opened with mmap.
+
+A mapped document file holds the UTF-8 text, the sentence byte offsets,
+the token ids of every sentence, a compressed (CSR) inverted index and
+the vocabulary. MappedDocument maps the file instead of reading it, so
+BM25 search only touches the posting lists of the query terms and
+sentences are decoded one at a time from memoryview slices. It offers
+the same search/span/sentence interface as DocumentIndex and can be
+passed as ``index`` to AIAssistant.answer_question and evaluate_answers.
+
+Layout (little-endian, every section 8-byte aligned):
+    header | text | sentence offsets (uint64 start/end pairs) |
+    token offsets (uint64, n_sentences + 1) | token ids (uint32) |
+    posting offsets (uint64, n_terms + 1) | posting sentence ids (uint32) |
+    posting term frequencies (uint32) | vocabulary (newline-separated UTF-8)
+"""
+import math
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from document_index import iter_sentence_spans, tokenize
+
+MAGIC = b'SRDOC\x00\x00\x00'
+FORMAT_VERSION = 1
+
+# magic, version, then counts and (offset, length) of every section
+_HEADER = struct.Struct('<8sI4x4Q16Q')
+
+# Token ids are copied from the scratch file in blocks of this many bytes
+_COPY_BYTES = 16 * 1024 * 1024
+
+# Section names, in file order
+_SECTIONS = ('text', 'offsets', 'token_offsets', 'token_ids', 'posting_offsets',
+             'posting_sentences', 'posting_tfs', 'vocabulary')
+
+
+def _align(handle) -> int:
+    """Pad the file to the next 8-byte boundary and return the position."""
+    position = handle.tell()
+    padding = -position % 8
+    if padding:
+        handle.write(b'\x00' * padding)
+    return position + padding
+
+
+class _Writer:
+    """Segments and tokenizes streamed text, writing the text section as it goes."""
+
+    def __init__(self, handle, token_file):
+        self.handle = handle
+        self.token_file = token_file
+        self.vocabulary: Dict[str, int] = {}
+        self.offsets = array('Q')
+        self.token_offsets = array('Q', [0])
+        # One (term id, sentence id, tf) triple per posting, sorted by term at the end
+        self.posting_terms = array('I')
+        self.posting_sentences = array('I')
+        self.posting_tfs = array('I')
+        self.text_start = handle.tell()
+        self._pending = ''
+        self._pending_line_start = True
+        self._started = False
+
+    def append(self, text: str) -> None:
+        if not self._started:
+            # Offsets are relative to the stripped document text
+            text = text.lstrip()
+            self._started = bool(text)
+        buffer = self._pending + text
+        spans = list(iter_sentence_spans(buffer, self._pending_line_start))
+        if not spans:
+            self._pending = buffer
+            return
+        # The last sentence may continue in the next chunk
+        held_start, _, self._pending_line_start = spans.pop()
+        self._write(buffer[:held_start], spans)
+        self._pending = buffer[held_start:]
+
+    def finish(self) -> None:
+        buffer = self._pending.rstrip()
+        self._write(buffer, list(iter_sentence_spans(buffer, self._pending_line_start)))
+        self._pending = ''
+
+    def _write(self, buffer: str, spans: List[Tuple[int, int, bool]]) -> None:
+        base = self.handle.tell() - self.text_start
+        position = 0
+        byte_position = base
+        first_token = self.token_offsets[-1]
+        token_ids = array('I')
+        for start, end, _ in spans:
+            byte_position += len(buffer[position:start].encode('utf-8', 'surrogatepass'))
+            sentence = buffer[start:end]
+            byte_end = byte_position + len(sentence.encode('utf-8', 'surrogatepass'))
+            self.offsets.append(byte_position)
+            self.offsets.append(byte_end)
+            position, byte_position = end, byte_end
+
+            sentence_id = len(self.token_offsets) - 1
+            counts: Dict[int, int] = {}
+            for token in tokenize(sentence):
+                term_id = self.vocabulary.setdefault(token, len(self.vocabulary))
+                token_ids.append(term_id)
+                counts[term_id] = counts.get(term_id, 0) + 1
+            for term_id, freq in counts.items():
+                self.posting_terms.append(term_id)
+                self.posting_sentences.append(sentence_id)
+                self.posting_tfs.append(freq)
+            self.token_offsets.append(first_token + len(token_ids))
+        self.handle.write(buffer.encode('utf-8', 'surrogatepass'))
+        token_ids.tofile(self.token_file)
+
+
+def write_mapped_document(path: str, segments: Iterable[str]) -> str:
+    """
+    Write streamed document text to a mapped document file.
+
+    Only the current segment, the sentence offsets and the posting triples
+    are held in memory; the text and token ids go straight to disk.
+
+    Args:
+        path: Destination file; written atomically
+        segments: Document text in pieces, e.g. DocumentProcessor.iter_segments output
+
+    Returns:
+        The path written
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    handle = tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False)
+    try:
+        with handle, tempfile.TemporaryFile() as token_file:
+            handle.write(b'\x00' * _HEADER.size)
+            writer = _Writer(handle, token_file)
+            for segment in segments:
+                writer.append(segment)
+            writer.finish()
+
+            sections = {'text': (writer.text_start, handle.tell() - writer.text_start)}
+
+            def write_section(name: str, data: bytes) -> None:
+                start = _align(handle)
+                handle.write(data)
+                sections[name] = (start, handle.tell() - start)
+
+            write_section('offsets', writer.offsets.tobytes())
+            write_section('token_offsets', writer.token_offsets.tobytes())
+
+            start = _align(handle)
+            token_file.seek(0)
+            while True:
+                block = token_file.read(_COPY_BYTES)
+                if not block:
+                    break
+                handle.write(block)
+            sections['token_ids'] = (start, handle.tell() - start)
+
+            # Group postings by term; the stable sort keeps sentence ids ascending
+            terms = np.frombuffer(writer.posting_terms, dtype=np.uint32)
+            order = np.argsort(terms, kind='stable')
+            n_terms = len(writer.vocabulary)
+            posting_offsets = np.zeros(n_terms + 1, dtype=np.uint64)
+            posting_offsets[1:] = np.cumsum(np.bincount(terms, minlength=n_terms))
+            write_section('posting_offsets', posting_offsets.tobytes())
+            posting_sentences = np.frombuffer(writer.posting_sentences, dtype=np.uint32)[order]
+            write_section('posting_sentences', posting_sentences.tobytes())
+            write_section('posting_tfs', np.frombuffer(writer.posting_tfs, dtype=np.uint32)[order].tobytes())
+            write_section('vocabulary', '\n'.join(writer.vocabulary).encode('utf-8'))
+
+            counts = (len(writer.offsets) // 2, writer.token_offsets[-1], n_terms, len(order))
+            handle.seek(0)
+            handle.write(_HEADER.pack(MAGIC, FORMAT_VERSION, *counts,
+                                      *[value for name in _SECTIONS for value in sections[name]]))
+        # NamedTemporaryFile creates the file owner-only
+        os.chmod(handle.name, 0o644)
+        os.replace(handle.name, path)
+    except BaseException:
+        os.unlink(handle.name)
+        raise
+    return path
+
+
+class MappedDocument:
+    """
+    Read-only view of a mapped document file.
+
+    Offsets are byte offsets into the UTF-8 text. Use as a context manager
+    or call ``close`` to unmap the file.
+    """
+
+    # Unit of the span offsets, as named in answer citations
+    span_unit = 'bytes'
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        """
+        Map a document file.
+
+        Args:
+            path: File written by write_mapped_document
+            k1: BM25 term frequency saturation
+            b: BM25 length normalisation
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        with open(path, 'rb') as handle:
+            header = _HEADER.unpack(handle.read(_HEADER.size))
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_sentences, n_tokens, n_terms, n_postings = header[:6]
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} mapped document")
+        sections = dict(zip(_SECTIONS, zip(header[6::2], header[7::2])))
+
+        def section_array(name: str, dtype, count: int) -> np.ndarray:
+            if not count:
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(path, dtype=dtype, mode='r', offset=sections[name][0], shape=(count,))
+
+        text_start, text_length = sections['text']
+        self._buffer = memoryview(self._mmap)
+        self.text = self._buffer[text_start:text_start + text_length]
+        self.offsets = section_array('offsets', np.uint64, 2 * n_sentences)
+        self.token_offsets = section_array('token_offsets', np.uint64, n_sentences + 1)
+        self.token_ids = section_array('token_ids', np.uint32, n_tokens)
+        self.posting_offsets = section_array('posting_offsets', np.uint64, n_terms + 1)
+        self.posting_sentences = section_array('posting_sentences', np.uint32, n_postings)
+        self.posting_tfs = section_array('posting_tfs', np.uint32, n_postings)
+
+        vocabulary_start, vocabulary_length = sections['vocabulary']
+        terms = bytes(self._buffer[vocabulary_start:vocabulary_start + vocabulary_length]).decode('utf-8')
+        self.vocabulary: Dict[str, int] = (
+            {term: term_id for term_id, term in enumerate(terms.split('\n'))} if n_terms else {}
+        )
+        self.avg_sentence_length = n_tokens / n_sentences if n_sentences else 0.0
+        self._n_sentences = n_sentences
+
+    def __len__(self) -> int:
+        return self._n_sentences
+
+    def __enter__(self) -> 'MappedDocument':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the memoryviews and unmap the file."""
+        self.text.release()
+        self._buffer.release()
+        self._mmap.close()
+
+    def span(self, sentence_id: int) -> Tuple[int, int]:
+        """Byte offsets (start, end) of a sentence in the text."""
+        return int(self.offsets[2 * sentence_id]), int(self.offsets[2 * sentence_id + 1])
+
+    def sentence_bytes(self, sentence_id: int) -> memoryview:
+        """UTF-8 bytes of a sentence, as a zero-copy slice of the mapped file."""
+        start, end = self.span(sentence_id)
+        return self.text[start:end]
+
+    def sentence(self, sentence_id: int) -> str:
+        """Text of a sentence, decoded on demand."""
+        return str(self.sentence_bytes(sentence_id), 'utf-8', 'surrogatepass')
+
+    def sentences(self) -> Iterator[str]:
+        """Iterate over the text of every sentence in order."""
+        for sentence_id in range(len(self)):
+            yield self.sentence(sentence_id)
+
+    def sentence_tokens(self, sentence_id: int) -> np.ndarray:
+        """Token ids of a sentence, as a view into the mapped file."""
+        return self.token_ids[self.token_offsets[sentence_id]:self.token_offsets[sentence_id + 1]]
+
+    def idf(self, term: str) -> float:
+        """Inverse document frequency of a term, treating sentences as documents."""
+        term_id = self.vocabulary.get(term)
+        df = 0 if term_id is None else int(self.posting_offsets[term_id + 1] - self.posting_offsets[term_id])
+        n = len(self)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, terms: List[str], top_k: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Score the candidate sentences for a list of query terms with BM25.
+
+        Only the posting lists of the query terms are read from the file.
+
+        Args:
+            terms: Query terms (already tokenized)
+            top_k: Maximum number of results, or None for all candidates
+
+        Returns:
+            List of (sentence id, score) sorted by descending score, ties in document order
+        """
+        sentence_ids = []
+        weights = []
+        avg_length = self.avg_sentence_length or 1.0
+        for term in set(terms):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.posting_offsets[term_id], self.posting_offsets[term_id + 1]
+            sentences = self.posting_sentences[start:end].astype(np.int64)
+            freqs = self.posting_tfs[start:end].astype(np.float64)
+            lengths = (self.token_offsets[sentences + 1] - self.token_offsets[sentences]).astype(np.float64)
+            length_norm = 1 - self.b + self.b * lengths / avg_length
+            sentence_ids.append(sentences)
+            weights.append(self.idf(term) * freqs * (self.k1 + 1) / (freqs + self.k1 * length_norm))
+        if not sentence_ids:
+            return []
+
+        candidates, inverse = np.unique(np.concatenate(sentence_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(weights))
+        order = np.lexsort((candidates, -scores))
+        if top_k is not None:
+            order = order[:top_k]
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+    def top_sentences(self, terms: List[str], top_k: int = 2) -> List[int]:
+        """Return the ids of the best matching sentences for the query terms."""
+        return [sentence_id for sentence_id, _ in self.search(terms, top_k)]
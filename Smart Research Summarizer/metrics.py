@@ -0,0 +1,206 @@
+"""
+Lightweight in-process instrumentation for the processing hot paths.
+
+Stages are timed with the ``stage`` context manager or the ``timed``
+decorator into per-stage histograms; counters track pages, characters,
+sentences and cache lookups. Everything is kept in one process-wide
+registry that can be exported as Prometheus text or JSON.
+
+Instrumentation is on unless SMART_RESEARCH_METRICS is set to 0. When it
+is off, ``stage`` returns a shared no-op context manager and the other
+calls return immediately, so the remaining cost is one flag check.
+"""
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Prefix of every exported metric name
+NAMESPACE = 'smart_research'
+
+# Histogram bucket upper bounds in seconds
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Metric name -> (type, help text)
+METRICS = {
+    'stage_seconds': ('histogram', "Time spent in each processing stage"),
+    'page_seconds': ('histogram', "Time to extract the text of one PDF page"),
+    'pages_total': ('counter', "PDF pages extracted"),
+    'chars_total': ('counter', "Characters of cleaned document text"),
+    'sentences_total': ('counter', "Sentences indexed"),
+    'documents_total': ('counter', "Documents extracted, by MIME type"),
+    'cache_requests_total': ('counter', "Cache lookups, by cache and result"),
+}
+
+_NO_OP = nullcontext()
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values."""
+
+    def __init__(self, buckets: Tuple[float, ...] = TIME_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the overflow (+Inf) bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile, or None if empty or in the overflow bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for upper, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return upper
+        return None
+
+
+class Registry:
+    """Thread-safe collection of labelled counters and histograms."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+
+    def count(self, name: str, value: float = 1, **labels: str) -> None:
+        """Add ``value`` to a counter."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Record one observation in a histogram."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def stage(self, name: str):
+        """Context manager timing a block into the stage_seconds histogram."""
+        if not self.enabled:
+            return _NO_OP
+        return self._timer(name)
+
+    @contextmanager
+    def _timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=name)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def cache_hit_rates(self) -> Dict[str, float]:
+        """Hit rate per cache, from the cache_requests_total counter."""
+        totals: Dict[str, List[float]] = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                if name != 'cache_requests_total':
+                    continue
+                labels = dict(labels)
+                hits_and_total = totals.setdefault(labels.get('cache', ''), [0.0, 0.0])
+                hits_and_total[1] += value
+                if labels.get('result') == 'hit':
+                    hits_and_total[0] += value
+        return {cache: round(hits / total, 4) for cache, (hits, total) in totals.items() if total}
+
+    def to_dict(self) -> Dict:
+        """Snapshot of every metric as JSON-serializable data."""
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = [{
+                'name': name,
+                'labels': dict(labels),
+                'count': histogram.count,
+                'sum': round(histogram.sum, 6),
+                'mean': round(histogram.sum / histogram.count, 6),
+                'p50': histogram.quantile(0.5),
+                'p95': histogram.quantile(0.95),
+                'buckets': dict(zip([str(upper) for upper in histogram.buckets] + ['+Inf'], histogram.counts))
+            } for (name, labels), histogram in sorted(self._histograms.items())]
+        return {'enabled': self.enabled, 'counters': counters, 'histograms': histograms,
+                'cache_hit_rates': self.cache_hit_rates()}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Export in the Prometheus text exposition format."""
+        def label_text(labels: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in METRICS.items():
+                full_name = f'{NAMESPACE}_{name}'
+                if kind == 'counter':
+                    series = [(labels, value) for (metric, labels), value in sorted(self._counters.items())
+                              if metric == name]
+                else:
+                    series = [(labels, histogram) for (metric, labels), histogram in sorted(self._histograms.items())
+                              if metric == name]
+                if not series:
+                    continue
+                lines.append(f'# HELP {full_name} {help_text}')
+                lines.append(f'# TYPE {full_name} {kind}')
+                for labels, value in series:
+                    if kind == 'counter':
+                        lines.append(f'{full_name}{label_text(labels)} {value:g}')
+                        continue
+                    cumulative = 0
+                    for upper, count in zip(list(value.buckets) + ['+Inf'], value.counts):
+                        cumulative += count
+                        lines.append(f'{full_name}_bucket{label_text(labels, (("le", str(upper)),))} {cumulative}')
+                    lines.append(f'{full_name}_sum{label_text(labels)} {value.sum:.6f}')
+                    lines.append(f'{full_name}_count{label_text(labels)} {value.count}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry(enabled=os.environ.get('SMART_RESEARCH_METRICS', '1') != '0')
+
+count = REGISTRY.count
+observe = REGISTRY.observe
+stage = REGISTRY.stage
+
+
+def timed(name: str) -> Callable:
+    """Decorator timing every call of a function as processing stage ``name``."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return func(*args, **kwargs)
+            with REGISTRY._timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,30 @@
+"""
+Worker-side helpers for parallel PDF extraction.
+
+Kept separate from document_processor so spawned workers only import
+PyPDF2, not Streamlit.
+"""
+import mmap
+import time
+from typing import List, Tuple
+import PyPDF2
+
+# Per-process PDF reader, opened once by init_pdf_worker
+_reader = None
+
+def init_pdf_worker(pdf_path: str) -> None:
+    """Open the shared PDF file once per worker process via mmap."""
+    global _reader
+    with open(pdf_path, 'rb') as pdf_file:
+        mapped = mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ)
+    _reader = PyPDF2.PdfReader(mapped)
+
+def extract_page_range(page_range: Tuple[int, int]) -> List[Tuple[str, float]]:
+    """Extract pages [start, end) with this worker's reader, returning (text, seconds) per page."""
+    start, end = page_range
+    pages = []
+    for page_num in range(start, end):
+        page_start = time.perf_counter()
+        text = _reader.pages[page_num].extract_text()
+        pages.append((text, time.perf_counter() - page_start))
+    return pages
@@ -0,0 +1,153 @@
+"""
+Per-session question and answer history with a bounded memory footprint.
+
+The most recent ``window`` entries are kept in memory; older ones are
+spilled to a SQLite file in the cache directory and only read back when
+the UI pages through them. Sessions that ended without clearing their
+history are expired as a whole once they have not written or read their
+rows for ``max_idle`` seconds; an active session never loses entries.
+"""
+import os
+import sqlite3
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List
+
+from document_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_WINDOW = int(os.environ.get('SMART_RESEARCH_HISTORY_WINDOW', 20))
+DEFAULT_MAX_IDLE_SECONDS = 7 * 24 * 3600
+
+
+class QAHistory:
+    """
+    Numbered Q&A entries of one session, newest first when paged.
+
+    Entries are dictionaries with 'number' (1 for the first question),
+    'question', 'answer' and 'justification'.
+    """
+
+    def __init__(self, session_id: str, cache_dir: str = DEFAULT_CACHE_DIR, window: int = DEFAULT_WINDOW,
+                 max_idle: float = DEFAULT_MAX_IDLE_SECONDS):
+        """
+        Create an empty history; the SQLite file is only opened once entries spill.
+
+        Args:
+            session_id: Session the entries belong to
+            cache_dir: Directory holding the SQLite file
+            window: Entries kept in memory
+            max_idle: Seconds after its last use of the file at which another session's rows are dropped
+        """
+        self.session_id = session_id
+        self.path = os.path.join(cache_dir, 'history.sqlite3')
+        self.window = max(window, 1)
+        self.max_idle = max_idle
+        self._recent: Deque[Dict] = deque()
+        self._count = 0
+        # Entries numbered up to this are on disk
+        self._spilled = 0
+        self._opened = False
+
+    def __len__(self) -> int:
+        return self._count
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                if not self._opened:
+                    conn.execute(
+                        'CREATE TABLE IF NOT EXISTS qa_history ('
+                        'session TEXT NOT NULL, number INTEGER NOT NULL, question TEXT NOT NULL, '
+                        'answer TEXT NOT NULL, justification TEXT NOT NULL, created REAL NOT NULL, '
+                        'PRIMARY KEY (session, number))'
+                    )
+                    conn.execute(
+                        'CREATE TABLE IF NOT EXISTS qa_sessions (session TEXT PRIMARY KEY, last_used REAL NOT NULL)'
+                    )
+                    # Expire whole sessions that stopped using their rows, never single entries
+                    cutoff = time.time() - self.max_idle
+                    conn.execute('DELETE FROM qa_history WHERE session IN '
+                                 '(SELECT session FROM qa_sessions WHERE last_used < ? AND session != ?)',
+                                 (cutoff, self.session_id))
+                    conn.execute('DELETE FROM qa_sessions WHERE last_used < ? AND session != ?',
+                                 (cutoff, self.session_id))
+                    self._opened = True
+                conn.execute('INSERT OR REPLACE INTO qa_sessions (session, last_used) VALUES (?, ?)',
+                             (self.session_id, time.time()))
+                yield conn
+        finally:
+            conn.close()
+
+    def append(self, question: str, answer: str, justification: str) -> Dict:
+        """
+        Record an answered question, spilling the oldest in-memory entry if the window is full.
+
+        Returns:
+            The new entry
+        """
+        self._count += 1
+        entry = {'number': self._count, 'question': question, 'answer': answer, 'justification': justification}
+        self._recent.append(entry)
+        if len(self._recent) > self.window:
+            self._spill(len(self._recent) - self.window)
+        return entry
+
+    def _spill(self, count: int) -> None:
+        """Move the oldest in-memory entries to disk."""
+        entries = [self._recent.popleft() for _ in range(count)]
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO qa_history (session, number, question, answer, justification, created) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(self.session_id, entry['number'], entry['question'], entry['answer'], entry['justification'], now)
+                 for entry in entries]
+            )
+        self._spilled = entries[-1]['number']
+
+    def page_count(self, page_size: int) -> int:
+        """Number of pages of ``page_size`` entries."""
+        return -(-self._count // page_size)
+
+    def page(self, page: int, page_size: int) -> List[Dict]:
+        """
+        One page of entries, newest first; only spilled entries on the page are read from disk.
+
+        Args:
+            page: Page number, 0 for the newest entries
+            page_size: Entries per page
+
+        Returns:
+            The entries of the page, possibly empty
+        """
+        last = self._count - page * page_size
+        first = max(last - page_size + 1, 1)
+        if last < 1:
+            return []
+
+        offset = self._spilled + 1
+        entries = [self._recent[number - offset] for number in range(last, max(first, offset) - 1, -1)]
+        if first <= self._spilled:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    'SELECT number, question, answer, justification FROM qa_history '
+                    'WHERE session = ? AND number BETWEEN ? AND ? ORDER BY number DESC',
+                    (self.session_id, first, min(last, self._spilled))
+                ).fetchall()
+            entries.extend({'number': number, 'question': question, 'answer': answer, 'justification': justification}
+                           for number, question, answer, justification in rows)
+        return entries
+
+    def clear(self) -> None:
+        """Forget every entry, in memory and on disk."""
+        if self._spilled:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM qa_history WHERE session = ?', (self.session_id,))
+                conn.execute('DELETE FROM qa_sessions WHERE session = ?', (self.session_id,))
+        self._recent.clear()
+        self._count = 0
+        self._spilled = 0
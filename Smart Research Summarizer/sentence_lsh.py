@@ -0,0 +1,250 @@
+"""
+MinHash locality-sensitive hashing over sentence word shingles.
+
+``SentenceLSH`` wraps any sentence index (DocumentIndex, Corpus or
+MappedDocument) and answers ``search``/``top_sentences`` approximately:
+every sentence gets a MinHash signature of its content-word shingles,
+signatures are cut into bands, and a query only visits the sentences that
+share at least one band bucket with it. Candidates are ranked by the
+estimated fraction of the query's shingles found in the sentence.
+
+Words are folded by stripping one common inflectional suffix (and a final
+"e") before hashing, so "improves", "improved" and "improvement" share a
+shingle. Shingles found in most sentences are ignored like stop words.
+
+The bands/rows split sets the precision/recall trade-off: a sentence
+becomes a candidate with probability ``1 - (1 - J**rows)**bands`` for a
+Jaccard similarity J, so more bands (or fewer rows) raise recall and
+candidate count, and fewer bands (or more rows) raise precision.
+"""
+import zlib
+from collections import Counter
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from document_index import QUESTION_WORDS, tokenize
+from document_tokens import STOP_WORDS
+
+DEFAULT_BANDS = 32
+DEFAULT_ROWS = 2
+DEFAULT_MAX_DF = 0.05
+
+# Suffixes stripped when folding words, longest first
+SUFFIXES = ('ations', 'ating', 'ation', 'ments', 'ated', 'ates', 'ings', 'ment', 'ate', 'ies', 'ing',
+            'ed', 'es', 'ly', 's')
+
+# Shortest stem left after stripping a suffix
+MIN_STEM_CHARS = 4
+
+# Shingle hashes processed per block while computing signatures
+_SIGNATURE_BLOCK = 1 << 14
+
+# Permutations are (a * x + b) mod a Mersenne prime, kept below 2**32
+_PRIME = (1 << 31) - 1
+_EMPTY = np.uint32(_PRIME)
+
+
+def fold(term: str) -> str:
+    """Strip one inflectional suffix and a final 'e' ("improves" -> "improv", "studies" -> "study")."""
+    for suffix in SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= MIN_STEM_CHARS:
+            # "class", "focus", "analysis" are not plurals
+            if suffix == 's' and term[-2] in 'isu':
+                break
+            term = term[:-len(suffix)] + ('y' if suffix == 'ies' else '')
+            break
+    return term[:-1] if term.endswith('e') and len(term) > MIN_STEM_CHARS else term
+
+
+def shingle_terms(terms: Iterable[str]) -> List[str]:
+    """Folded content words: longer than three characters, no question or stop words."""
+    return [fold(term) for term in terms
+            if len(term) > 3 and term not in QUESTION_WORDS and term not in STOP_WORDS]
+
+
+class SentenceLSH:
+    """
+    Approximate nearest-sentence lookup for a sentence index.
+
+    The LSH tables are built once for the sentences indexed so far; call
+    ``update`` after the wrapped index grows.
+    """
+
+    def __init__(self, index, bands: int = DEFAULT_BANDS, rows: int = DEFAULT_ROWS,
+                 shingle_size: int = 1, max_df: float = DEFAULT_MAX_DF, min_similarity: float = 0.0,
+                 seed: int = 1):
+        """
+        Build the LSH tables for an index.
+
+        Args:
+            index: Sentence index providing ``__len__``, ``sentence`` and ``span``
+            bands: Signature bands; a sentence is a candidate if any band matches
+            rows: Signature rows per band
+            shingle_size: Consecutive content words per shingle; questions
+                rarely repeat the document's word order, so 1 suits question lookup
+            max_df: Shingles found in more than this fraction of the sentences are
+                ignored; like stop words they put most sentences in one bucket
+            min_similarity: Estimated Jaccard similarity below which candidates are dropped
+            seed: Seed for the MinHash permutations
+        """
+        if bands < 1 or rows < 1 or shingle_size < 1:
+            raise ValueError("bands, rows and shingle_size must be positive")
+        self.index = index
+        self.bands = bands
+        self.rows = rows
+        self.shingle_size = shingle_size
+        self.max_df = max_df
+        self.min_similarity = min_similarity
+
+        rng = np.random.default_rng(seed)
+        num_perm = bands * rows
+        self._a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        # Odd multipliers combining the rows of a band into one bucket key
+        self._band_mix = rng.integers(1, 1 << 63, size=(rows, 1), dtype=np.uint64) | np.uint64(1)
+
+        self._hashes: Dict[str, int] = {}
+        self._frequent: Set[int] = set()
+        self.signatures = np.empty((num_perm, 0), dtype=np.uint32)
+        self.shingle_counts = np.empty(0, dtype=np.uint32)
+        self._band_keys: List[np.ndarray] = []
+        self._band_ids: List[np.ndarray] = []
+        self.update()
+
+    def __len__(self) -> int:
+        return len(self.shingle_counts)
+
+    @property
+    def threshold(self) -> float:
+        """Jaccard similarity at which a sentence is a candidate with probability ~1/2."""
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def nbytes(self) -> int:
+        """Memory held by the signatures and band tables."""
+        return (self.signatures.nbytes + self.shingle_counts.nbytes
+                + sum(keys.nbytes + ids.nbytes for keys, ids in zip(self._band_keys, self._band_ids)))
+
+    def span(self, sentence_id: int) -> Tuple[int, int]:
+        return self.index.span(sentence_id)
+
+    def sentence(self, sentence_id: int) -> str:
+        return self.index.sentence(sentence_id)
+
+    def update(self) -> None:
+        """Rebuild the tables if the wrapped index has grown since the last build."""
+        n_sentences = len(self.index)
+        if n_sentences == len(self):
+            return
+        shingle_sets = [self._shingle_hashes(shingle_terms(tokenize(self.index.sentence(sentence_id))))
+                        for sentence_id in range(n_sentences)]
+
+        # Document frequencies decide which shingles are too common to hash
+        df = Counter(chain.from_iterable(shingle_sets))
+        max_count = max(self.max_df * n_sentences, 1)
+        self._frequent = {value for value, count in df.items() if count > max_count}
+        if self._frequent:
+            shingle_sets = [shingles - self._frequent for shingles in shingle_sets]
+
+        self.signatures = self._signatures(shingle_sets)
+        self.shingle_counts = np.fromiter(map(len, shingle_sets), dtype=np.uint32, count=n_sentences)
+        self._build_bands()
+
+    def search(self, terms: Iterable[str], top_k: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Score the candidate sentences for a list of query terms.
+
+        Only sentences sharing a band bucket with the query are visited.
+
+        Args:
+            terms: Query terms, e.g. from query_terms(); folded like the sentences
+            top_k: Maximum number of results, or None for all candidates
+
+        Returns:
+            List of (sentence id, estimated share of the query found in the
+            sentence) sorted by descending score, ties in document order
+        """
+        query = self._shingle_hashes(shingle_terms(terms)) - self._frequent
+        if not query or not len(self):
+            return []
+        signature = self._signatures([query])[:, 0]
+        keys = self._keys(signature[:, None])[:, 0]
+
+        candidates = []
+        for band_keys, band_ids, key in zip(self._band_keys, self._band_ids, keys):
+            lo = np.searchsorted(band_keys, key, side='left')
+            hi = np.searchsorted(band_keys, key, side='right')
+            candidates.append(band_ids[lo:hi])
+        candidates = np.unique(np.concatenate(candidates))
+        if not len(candidates):
+            return []
+
+        jaccard = (self.signatures[:, candidates] == signature[:, None]).mean(axis=0)
+        keep = (jaccard > 0) & (jaccard >= self.min_similarity)
+        candidates, jaccard = candidates[keep], jaccard[keep]
+        # |Q & S| = J * (|Q| + |S|) / (1 + J), as a share of the query
+        sizes = self.shingle_counts[candidates]
+        scores = np.minimum(jaccard * (len(query) + sizes) / ((1 + jaccard) * len(query)), 1.0)
+
+        order = np.lexsort((candidates, -scores))
+        if top_k is not None:
+            order = order[:top_k]
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+    def top_sentences(self, terms: Iterable[str], top_k: int = 2) -> List[int]:
+        """Return the ids of the best matching sentences for the query terms."""
+        return [sentence_id for sentence_id, _ in self.search(terms, top_k)]
+
+    def _shingle_hashes(self, terms: List[str]) -> set:
+        """Distinct 31-bit hashes of the word shingles of a term sequence."""
+        hashes = self._hashes
+        k = self.shingle_size
+        shingles = set()
+        for i in range(max(len(terms) - k + 1, 0)):
+            shingle = terms[i] if k == 1 else ' '.join(terms[i:i + k])
+            value = hashes.get(shingle)
+            if value is None:
+                value = hashes[shingle] = zlib.crc32(shingle.encode('utf-8')) % _PRIME
+            shingles.add(value)
+        return shingles
+
+    def _signatures(self, shingle_sets: List[set]) -> np.ndarray:
+        """MinHash signatures, one column per shingle set; empty sets get an unmatched sentinel."""
+        signatures = np.full((len(self._a), len(shingle_sets)), _EMPTY, dtype=np.uint32)
+        sizes = np.fromiter(map(len, shingle_sets), dtype=np.int64, count=len(shingle_sets))
+        filled = np.flatnonzero(sizes)
+        if not len(filled):
+            return signatures
+        values = np.fromiter((value for shingles in shingle_sets for value in shingles),
+                             dtype=np.uint64, count=int(sizes.sum()))
+        ends = np.cumsum(sizes[filled])
+
+        # Blocks of whole sentences keep the permuted (num_perm, block) matrix small
+        first = 0
+        while first < len(filled):
+            start = ends[first - 1] if first else 0
+            last = max(int(np.searchsorted(ends, start + _SIGNATURE_BLOCK, side='right')), first + 1)
+            stop = ends[last - 1]
+            permuted = (self._a * values[start:stop] + self._b) % np.uint64(_PRIME)
+            starts = np.concatenate(([0], ends[first:last - 1] - start))
+            signatures[:, filled[first:last]] = np.minimum.reduceat(permuted, starts, axis=1)
+            first = last
+        return signatures
+
+    def _keys(self, signatures: np.ndarray) -> np.ndarray:
+        """Bucket key of every band for each signature column, shape (bands, n)."""
+        rows = signatures.astype(np.uint64).reshape(self.bands, self.rows, -1)
+        return (rows * self._band_mix).sum(axis=1, dtype=np.uint64)
+
+    def _build_bands(self) -> None:
+        """Sort every band's bucket keys so lookups are a binary search."""
+        # Sentences without shingles never become candidates
+        sentence_ids = np.flatnonzero(self.shingle_counts).astype(np.uint32)
+        keys = self._keys(self.signatures[:, sentence_ids])
+        self._band_keys = []
+        self._band_ids = []
+        for band_keys in keys:
+            order = np.argsort(band_keys, kind='stable')
+            self._band_keys.append(band_keys[order])
+            self._band_ids.append(sentence_ids[order])
@@ -0,0 +1,138 @@
+import math
+from itertools import chain
+from typing import List, Tuple
+
+import numpy as np
+
+from document_index import DocumentIndex
+
+# Summary limits
+MAX_SUMMARY_WORDS = 150
+MAX_SUMMARY_SENTENCES = 5
+
+# Sentences with fewer tokens than this (headings, captions) are never picked
+MIN_SENTENCE_TOKENS = 5
+
+# Only this many top-ranked sentences per summary slot are considered
+CANDIDATES_PER_SENTENCE = 20
+
+# TextRank damping factor and power-iteration settings
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+
+
+def term_sentence_matrix(index: DocumentIndex) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build the sparse TF-IDF sentence x term matrix from the index postings.
+
+    The matrix is returned in coordinate form with L2-normalized rows, using
+    sublinear term frequency (1 + log tf) and smoothed idf.
+
+    Args:
+        index: Document index
+
+    Returns:
+        Tuple of (row ids, column ids, values) arrays
+    """
+    n_sentences = len(index)
+    posting_lists = index.postings.values()
+    counts = np.fromiter(map(len, posting_lists), dtype=np.int64, count=len(index.postings))
+    n_entries = int(counts.sum())
+    # Every (sentence id, tf) pair of every posting list, flattened in one pass
+    entries = np.fromiter(chain.from_iterable(chain.from_iterable(posting_lists)),
+                          dtype=np.int64, count=2 * n_entries).reshape(-1, 2)
+    rows = entries[:, 0]
+    tfs = entries[:, 1].astype(np.float64)
+    cols = np.repeat(np.arange(len(counts)), counts)
+    idf = np.fromiter((math.log((1 + n_sentences) / (1 + count)) + 1 for count in counts.tolist()),
+                      dtype=np.float64, count=len(counts))
+
+    values = (1 + np.log(tfs)) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=n_sentences))
+    values /= np.where(norms > 0, norms, 1.0)[rows]
+    return rows, cols, values
+
+
+def centroid_scores(rows: np.ndarray, cols: np.ndarray, values: np.ndarray,
+                    n_sentences: int, n_terms: int) -> np.ndarray:
+    """Cosine similarity of every sentence to the document centroid."""
+    centroid = np.bincount(cols, weights=values, minlength=n_terms) / max(n_sentences, 1)
+    centroid_norm = np.linalg.norm(centroid) or 1.0
+    return np.bincount(rows, weights=values * centroid[cols], minlength=n_sentences) / centroid_norm
+
+
+def textrank_scores(rows: np.ndarray, cols: np.ndarray, values: np.ndarray,
+                    n_sentences: int, n_terms: int) -> np.ndarray:
+    """
+    TextRank over the cosine-similarity graph of sentences.
+
+    The similarity matrix S = X X^T (minus its diagonal) is never formed;
+    each power iteration computes S r as X (X^T r), which costs two passes
+    over the non-zero entries instead of n_sentences^2.
+    """
+    def similarity_times(vector: np.ndarray) -> np.ndarray:
+        term_weights = np.bincount(cols, weights=values * vector[rows], minlength=n_terms)
+        product = np.bincount(rows, weights=values * term_weights[cols], minlength=n_sentences)
+        # Remove self-similarity (rows are unit length, so S_ii is 1 for non-empty rows)
+        return product - self_similarity * vector
+
+    self_similarity = np.bincount(rows, weights=values * values, minlength=n_sentences)
+    degree = similarity_times(np.ones(n_sentences))
+    degree = np.where(degree > 0, degree, 1.0)
+
+    scores = np.full(n_sentences, 1.0 / n_sentences)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) / n_sentences + DAMPING * similarity_times(scores / degree)
+        converged = np.abs(updated - scores).sum() < TOLERANCE
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def summarize(index: DocumentIndex, method: str = 'centroid',
+              max_words: int = MAX_SUMMARY_WORDS,
+              max_sentences: int = MAX_SUMMARY_SENTENCES) -> str:
+    """
+    Build an extractive summary from the highest scoring sentences.
+
+    Args:
+        index: Document index
+        method: 'centroid' or 'textrank'
+        max_words: Word limit for the summary
+        max_sentences: Maximum number of sentences to include
+
+    Returns:
+        Selected sentences in document order, truncated to max_words
+    """
+    n_sentences = len(index)
+    rows, cols, values = term_sentence_matrix(index)
+    score = textrank_scores if method == 'textrank' else centroid_scores
+    scores = score(rows, cols, values, n_sentences, len(index.postings))
+
+    # Skip fragments, unless the document has nothing but short sentences
+    long_enough = np.asarray(index.sentence_lengths) >= MIN_SENTENCE_TOKENS
+    if long_enough.any():
+        scores = np.where(long_enough, scores, -np.inf)
+
+    # Greedily take the best sentences that fit the word budget
+    selected: List[int] = []
+    words = 0
+    ranked = np.argsort(-scores, kind='stable')[:max_sentences * CANDIDATES_PER_SENTENCE]
+    for sentence_id in ranked:
+        if len(selected) >= max_sentences or words >= max_words or not np.isfinite(scores[sentence_id]):
+            break
+        sentence_words = len(index.sentence(int(sentence_id)).split())
+        if selected and words + sentence_words > max_words:
+            continue
+        selected.append(int(sentence_id))
+        words += sentence_words
+
+    summary = ' '.join(index.sentence(sentence_id) for sentence_id in sorted(selected))
+
+    # Ensure it's under the word limit
+    summary_words = summary.split()
+    if len(summary_words) > max_words:
+        summary = ' '.join(summary_words[:max_words]) + "..."
+    return summary
@@ -0,0 +1,201 @@
+"""
+Tests for DocumentService, driven through the in-process LocalServiceClient.
+
+Besides the real 'summarize' and 'ask' handlers, the tests register small
+handlers that block until released, so queueing, concurrency limits and
+cancellation can be observed deterministically.
+"""
+import threading
+import time
+
+import pytest
+
+import document_service
+from document_service import CANCELLED, DONE, FAILED, JobCancelled, LocalServiceClient, ServiceBusy
+
+TEXT = ("Neural networks reduce training cost by forty percent. Clinical trials measure patient outcomes. "
+        "Protein folding models predict structures from sequences. Climate models explain energy use.")
+
+TIMEOUT = 10
+
+
+class Gate:
+    """Handlers that block until released, recording how many run at once."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.started = threading.Semaphore(0)
+        self.running = 0
+        self.max_running = 0
+        self.running_by_user = {}
+        self.max_running_by_user = {}
+
+    def blocking(self, job):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            running = self.running_by_user[job.user_id] = self.running_by_user.get(job.user_id, 0) + 1
+            self.max_running_by_user[job.user_id] = max(self.max_running_by_user.get(job.user_id, 0), running)
+        self.started.release()
+        try:
+            self.release.wait(TIMEOUT)
+            return job.payload.get('value')
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.running_by_user[job.user_id] -= 1
+
+    def cooperative(self, job):
+        """Stops at its next check once cancelled, like prepare_challenge."""
+        self.started.release()
+        while not self.release.is_set():
+            if job.cancelled.is_set():
+                raise JobCancelled()
+            time.sleep(0.01)
+        return 'completed'
+
+    def wait_started(self, count: int = 1) -> None:
+        for _ in range(count):
+            assert self.started.acquire(timeout=TIMEOUT)
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    gate = Gate()
+    monkeypatch.setitem(document_service.HANDLERS, 'block', gate.blocking)
+    monkeypatch.setitem(document_service.HANDLERS, 'cooperate', gate.cooperative)
+    monkeypatch.setitem(document_service.HANDLERS, 'fail', lambda job: 1 / 0)
+    yield gate
+    gate.release.set()
+
+
+@pytest.fixture
+def make_client():
+    clients = []
+
+    def make(**options):
+        client = LocalServiceClient(**options)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_submit_wait_and_status(make_client):
+    client = make_client()
+    job_id = client.submit('alice', 'summarize', {'text': TEXT})
+
+    job = client.wait(job_id, timeout=TIMEOUT)
+    assert job.status == DONE
+    # An extractive summary: some of the document's own sentences
+    assert job.result and set(job.result.split()) <= set(TEXT.split())
+    status = client.status(job_id)
+    assert status['status'] == DONE
+    assert status['user_id'] == 'alice'
+    assert status['kind'] == 'summarize'
+    assert status['started_at'] <= status['finished_at']
+    assert client.status('unknown') is None
+
+
+def test_run_returns_the_answer(make_client):
+    result = make_client().run('alice', 'ask', {'text': TEXT, 'question': "What reduces training cost?"},
+                               timeout=TIMEOUT)
+    assert 'Neural networks' in result['answer']
+    assert result['justification']
+
+
+def test_failed_job_reports_error(make_client, gate):
+    client = make_client()
+    job = client.wait(client.submit('alice', 'fail', {}), timeout=TIMEOUT)
+    assert job.status == FAILED
+    assert 'division by zero' in job.error
+    with pytest.raises(RuntimeError):
+        client.run('alice', 'fail', {}, timeout=TIMEOUT)
+
+
+def test_unknown_kind_is_rejected(make_client):
+    with pytest.raises(ValueError):
+        make_client().submit('alice', 'no-such-kind', {})
+
+
+def test_cancel_running_job_stops_cooperatively(make_client, gate):
+    client = make_client()
+    job_id = client.submit('alice', 'cooperate', {})
+    gate.wait_started()
+
+    assert client.cancel(job_id)
+    job = client.wait(job_id, timeout=TIMEOUT)
+    assert job.status == CANCELLED
+    assert job.result is None
+    # Finished jobs cannot be cancelled again
+    assert not client.cancel(job_id)
+
+
+def test_cancel_queued_job_never_starts(make_client, gate):
+    client = make_client(max_concurrent=1)
+    running = client.submit('alice', 'block', {})
+    gate.wait_started()
+    queued = client.submit('bob', 'block', {})
+    assert client.status(queued)['status'] == 'queued'
+
+    assert client.cancel(queued)
+    gate.release.set()
+    assert client.wait(running, timeout=TIMEOUT).status == DONE
+    job = client.wait(queued, timeout=TIMEOUT)
+    assert job.status == CANCELLED
+    assert job.started_at is None
+
+
+def test_global_concurrency_limit(make_client, gate):
+    client = make_client(max_concurrent=2, per_user_concurrent=4)
+    job_ids = [client.submit(f'user-{i}', 'block', {'value': i}) for i in range(5)]
+    gate.wait_started(2)
+    time.sleep(0.1)
+    assert gate.running == 2
+    assert sorted(client.status(job_id)['status'] for job_id in job_ids).count('queued') == 3
+
+    gate.release.set()
+    assert [client.wait(job_id, timeout=TIMEOUT).result for job_id in job_ids] == list(range(5))
+    assert gate.max_running == 2
+
+
+def test_per_user_concurrency_limit(make_client, gate):
+    client = make_client(max_concurrent=4, per_user_concurrent=1)
+    alice = [client.submit('alice', 'block', {}) for _ in range(3)]
+    bob = client.submit('bob', 'block', {})
+    # One job of alice's and bob's job run; alice's others wait for her slot
+    gate.wait_started(2)
+    time.sleep(0.1)
+    assert gate.running_by_user == {'alice': 1, 'bob': 1}
+
+    gate.release.set()
+    for job_id in alice + [bob]:
+        assert client.wait(job_id, timeout=TIMEOUT).status == DONE
+    assert gate.max_running_by_user == {'alice': 1, 'bob': 1}
+
+
+def test_global_queue_full_raises_service_busy(make_client, gate):
+    client = make_client(max_pending=2, max_concurrent=1)
+    job_ids = [client.submit('alice', 'block', {}), client.submit('bob', 'block', {})]
+    with pytest.raises(ServiceBusy):
+        client.submit('carol', 'block', {})
+
+    gate.release.set()
+    for job_id in job_ids:
+        client.wait(job_id, timeout=TIMEOUT)
+    # Finished jobs free their places in the queue
+    assert client.wait(client.submit('carol', 'block', {}), timeout=TIMEOUT).status == DONE
+
+
+def test_per_user_queue_full_raises_service_busy(make_client, gate):
+    client = make_client(per_user_pending=2)
+    client.submit('alice', 'block', {})
+    client.submit('alice', 'block', {})
+    with pytest.raises(ServiceBusy):
+        client.submit('alice', 'block', {})
+    # Other users are still admitted
+    assert client.submit('bob', 'block', {})
+    assert client.service.pending == 3
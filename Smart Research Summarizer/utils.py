@@ -1,16 +1,27 @@
 import streamlit as st
-from typing import Dict, Any
+import uuid
+from typing import Dict, Any, Optional
+import metrics
+from document_tokens import DocumentTokens
+from qa_history import QAHistory
 
 def initialize_session_state():
     """Initialize session state variables."""
     session_vars = {
-        'document_text': None,
+        'session_id': uuid.uuid4().hex,
         'document_name': None,
         'document_processed': False,
-        'document_summary': None,
+        # Handle into the shared document store (text, summary, index, key concepts)
+        'document_handle': None,
+        'document_job': None,
+        'document_cache_key': None,
+        # Corpus of many documents for cross-document search
+        'corpus': None,
         'mode': None,
-        'qa_history': [],
         'challenge_questions': None,
+        # Background job precomputing the challenge, and the expected content per question
+        'challenge_job': None,
+        'challenge_expected': None,
         'user_answers': [],
         'evaluations': []
     }
@@ -18,9 +29,19 @@ def initialize_session_state():
     for var, default_value in session_vars.items():
         if var not in st.session_state:
             st.session_state[var] = default_value
+    
+    # Recent Q&A in memory, older entries spilled to disk
+    if 'qa_history' not in st.session_state:
+        st.session_state.qa_history = QAHistory(st.session_state.session_id)
 
 def reset_session_state():
-    """Reset all session state variables."""
+    """Reset all session state variables, releasing the session's stored document."""
+    handle = st.session_state.get('document_handle')
+    if handle is not None:
+        handle.release()
+    history = st.session_state.get('qa_history')
+    if history is not None:
+        history.clear()
     for key in list(st.session_state.keys()):
         del st.session_state[key]
     initialize_session_state()
@@ -31,8 +52,31 @@ def get_session_state_summary() -> Dict[str, Any]:
         'document_processed': st.session_state.get('document_processed', False),
         'document_name': st.session_state.get('document_name', 'None'),
         'mode': st.session_state.get('mode', 'None'),
-        'qa_history_count': len(st.session_state.get('qa_history', [])),
-        'has_challenge_questions': st.session_state.get('challenge_questions') is not None
+        'qa_history_count': len(st.session_state.get('qa_history', ())),
+        'has_challenge_questions': st.session_state.get('challenge_questions') is not None,
+        'metrics': get_metrics_summary()
+    }
+
+def get_metrics_summary() -> Dict[str, Any]:
+    """Per-stage timings, counters and cache hit rates from the process-wide metrics registry."""
+    snapshot = metrics.REGISTRY.to_dict()
+    stages = {}
+    for histogram in snapshot['histograms']:
+        if histogram['name'] == 'stage_seconds':
+            stages[histogram['labels']['stage']] = {
+                'calls': histogram['count'],
+                'mean_seconds': histogram['mean'],
+                'p95_seconds': histogram['p95']
+            }
+    counters = {}
+    for counter in snapshot['counters']:
+        labels = ','.join(f"{key}={value}" for key, value in counter['labels'].items())
+        counters[f"{counter['name']}{{{labels}}}" if labels else counter['name']] = counter['value']
+    return {
+        'enabled': snapshot['enabled'],
+        'stages': stages,
+        'counters': counters,
+        'cache_hit_rates': snapshot['cache_hit_rates']
     }
 
 def clean_text_for_display(text: str, max_length: int = 200) -> str:
@@ -85,33 +129,22 @@ def validate_input(text: str, min_length: int = 5, max_length: int = 1000) -> bo
     text_length = len(text.strip())
     return min_length <= text_length <= max_length
 
-def extract_keywords(text: str, max_keywords: int = 5) -> list:
+def extract_keywords(text: str, max_keywords: int = 5, tokens: Optional[DocumentTokens] = None) -> list:
     """
     Extract key words from text for basic analysis.
     
     Args:
         text: Input text
         max_keywords: Maximum number of keywords to return
+        tokens: Precomputed tokens of the text; tokenized on the fly if omitted
         
     Returns:
         List of keywords
     """
-    if not text:
-        return []
-    
-    # Simple keyword extraction
-    words = text.lower().split()
-    
-    # Remove common stop words
-    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those'}
-    
-    # Filter and count words
-    word_count = {}
-    for word in words:
-        word = word.strip('.,!?;:"()[]{}')
-        if len(word) > 3 and word not in stop_words:
-            word_count[word] = word_count.get(word, 0) + 1
+    if tokens is None:
+        if not text:
+            return []
+        tokens = DocumentTokens(text)
     
-    # Sort by frequency and return top keywords
-    sorted_words = sorted(word_count.items(), key=lambda x: x[1], reverse=True)
-    return [word for word, count in sorted_words[:max_keywords]]
+    # Most frequent words longer than three letters, skipping common stop words
+    return tokens.top_terms(max_keywords, min_length=4)